@@ -0,0 +1,39 @@
+#!/bin/sh
+# Warm pool standby, started by the console (gui/warm_pool.py) on idle nodes.
+#
+# Prepares the environment once, reports ready, then waits for the console to
+# hand over a job through the node directory on the shared filesystem:
+#   ready    - written here, holds WARM_POOL_STANDBY_ID once preparation is done
+#   job.env  - written by the console, exports for the job
+#   job.sh   - written by the console last, its appearance starts the job
+set -u
+
+NODE_DIR=${WARM_POOL_NODE_DIR:?WARM_POOL_NODE_DIR not set}
+STANDBY_ID=${WARM_POOL_STANDBY_ID:?WARM_POOL_STANDBY_ID not set}
+POLL_SECONDS=${WARM_POOL_POLL_SECONDS:-1}
+
+mkdir -p "${NODE_DIR}"
+
+if [ -n "${WARM_POOL_PREPARE_CMD:-}" ]; then
+    echo "Standby ${STANDBY_ID} preparing: ${WARM_POOL_PREPARE_CMD}"
+    sh -c "${WARM_POOL_PREPARE_CMD}" || { echo "Standby preparation failed"; exit 1; }
+fi
+
+echo "${STANDBY_ID}" > "${NODE_DIR}/ready.tmp"
+mv "${NODE_DIR}/ready.tmp" "${NODE_DIR}/ready"
+echo "Standby ${STANDBY_ID} ready at $(date), waiting for ${NODE_DIR}/job.sh"
+
+while [ ! -f "${NODE_DIR}/job.sh" ]; do
+    sleep "${POLL_SECONDS}"
+done
+
+rm -f "${NODE_DIR}/ready"
+mv "${NODE_DIR}/job.sh" "${NODE_DIR}/job.running.sh"
+date +%s > "${NODE_DIR}/job.started"
+echo "Standby ${STANDBY_ID} starting job at $(date)"
+
+if [ -f "${NODE_DIR}/job.env" ]; then
+    . "${NODE_DIR}/job.env"
+fi
+
+exec /bin/sh "${NODE_DIR}/job.running.sh"
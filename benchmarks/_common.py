@@ -0,0 +1,77 @@
+"""
+Shared setup of the benchmark scripts: puts gui/ on sys.path, fills in placeholder
+AWS settings and stubs the HTTP layer of boto3 clients, so every script runs offline.
+"""
+import os
+import sys
+import io
+import json
+import time
+import statistics
+import contextlib
+from typing import Callable, Dict, List
+
+GUI_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gui')
+sys.path.insert(0, GUI_DIR)
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+os.environ.setdefault('CLUSTER_NAME', 'bench-cluster')
+
+from botocore.awsrequest import AWSResponse
+
+
+class _Body:
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def stream(self, **kwargs):
+        yield self._data
+
+
+def stub_http(client, responder: Callable[[str, Dict], Dict], latency: float = 0.0) -> None:
+    """
+    Answer every request of `client` locally: responder(operation, params) returns the
+    JSON body. Serialization, parsing and retries still run, only the socket is skipped;
+    `latency` seconds are slept per request to stand in for the network round trip.
+    """
+    def before_send(request, **kwargs):
+        target = request.headers['X-Amz-Target']
+        operation = (target.decode() if isinstance(target, bytes) else target).split('.')[-1]
+        params = json.loads(request.body or b'{}')
+        if latency:
+            time.sleep(latency)
+        body = json.dumps(responder(operation, params)).encode('utf-8')
+        return AWSResponse(request.url, 200, {'Content-Type': 'application/x-amz-json-1.1'}, _Body(body))
+
+    client.meta.events.register('before-send', before_send)
+
+
+def timed(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Run `fn` `repeat` times, returns median / p95 / mean wall time in milliseconds."""
+    samples: List[float] = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started_at) * 1000)
+    samples.sort()
+    return {
+        'median_ms': statistics.median(samples),
+        'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        'mean_ms': statistics.fmean(samples),
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow the managers' print logging while a measurement runs."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def report(title: str, rows: List[List[str]]) -> None:
+    widths = [max(len(str(row[i])) for row in rows) for i in range(len(rows[0]))]
+    print(f"\n{title}")
+    for row in rows:
+        print('  ' + '  '.join(str(cell).ljust(width) for cell, width in zip(row, widths)))
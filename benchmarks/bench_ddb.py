@@ -0,0 +1,154 @@
+"""
+DynamoDBHandler scan and batch paths against an in-memory stand-in of the
+DynamoDB JSON API (a stubbed HTTP layer, not DynamoDB Local): a paginated scan
+against a 4 segment parallel scan, per-item puts against batch writes with a share
+of UnprocessedItems returned, and the per-call cost of building a boto3 resource
+against the handler's shared client.
+
+    python benchmarks/bench_ddb.py [--items 20000] [--latency 0.01]
+"""
+import argparse
+import bisect
+import threading
+import time
+import zlib
+
+from _common import stub_http, timed, quiet, report
+
+import boto3
+from client_manager import ClientManager
+from ddb_handler import DynamoDBHandler
+
+TABLE = 'bench-tasks'
+# items per scan page, about what the 1 MB page limit returns for task rows
+SCAN_PAGE_ITEMS = 1000
+
+
+class FakeTable:
+    """Items of one table in DynamoDB JSON, answering the operations the handler uses."""
+
+    def __init__(self, unprocessed_every: int = 0, latency: float = 0.0):
+        self.items = {}
+        self.latency = latency
+        self.unprocessed_every = unprocessed_every
+        self.write_requests = 0
+        self.segment_keys = {}
+        self.lock = threading.Lock()
+
+    def respond(self, operation, params):
+        if self.latency:
+            time.sleep(self.latency)
+        if operation == 'Scan':
+            return self._scan(params)
+        if operation == 'BatchWriteItem':
+            return self._batch_write(params)
+        if operation == 'PutItem':
+            with self.lock:
+                self.items[params['Item']['task_id']['S']] = params['Item']
+            return {}
+        if operation == 'GetItem':
+            item = self.items.get(params['Key']['task_id']['S'])
+            return {'Item': item} if item else {}
+        raise ValueError(operation)
+
+    def _segment_keys(self, segment, total_segments):
+        ## the stand-in's own indexing is cached, so the timings are the handler's and the client's
+        cache_key = (len(self.items), segment, total_segments)
+        if cache_key not in self.segment_keys:
+            self.segment_keys[cache_key] = [
+                key for key in sorted(self.items)
+                if total_segments is None or zlib.crc32(key.encode()) % total_segments == segment
+            ]
+        return self.segment_keys[cache_key]
+
+    def _scan(self, params):
+        keys = self._segment_keys(params.get('Segment'), params.get('TotalSegments'))
+        start = 0
+        if 'ExclusiveStartKey' in params:
+            start = bisect.bisect_right(keys, params['ExclusiveStartKey']['task_id']['S'])
+        page = keys[start:start + params.get('Limit', SCAN_PAGE_ITEMS)]
+        response = {'Items': [self.items[key] for key in page], 'Count': len(page), 'ScannedCount': len(page)}
+        if start + len(page) < len(keys):
+            response['LastEvaluatedKey'] = {'task_id': {'S': page[-1]}}
+        return response
+
+    def _batch_write(self, params):
+        (table_name, requests), = params['RequestItems'].items()
+        unprocessed = []
+        with self.lock:
+            for request in requests:
+                self.write_requests += 1
+                if self.unprocessed_every and self.write_requests % self.unprocessed_every == 0:
+                    unprocessed.append(request)
+                    continue
+                item = request['PutRequest']['Item']
+                self.items[item['task_id']['S']] = item
+        return {'UnprocessedItems': {table_name: unprocessed} if unprocessed else {}}
+
+
+def task_row(i: int) -> dict:
+    return {'task_id': f"task-{i:06d}", 'job_id': f"job-{i // 16:05d}", 'rank': i % 16,
+            'status': 'STOPPED', 'node_name': f"node{i % 1000:04d}", 'exit_code': 0}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    table = FakeTable(unprocessed_every=10, latency=args.latency)
+    stub_http(ClientManager.get_client('dynamodb'), table.respond)
+
+    rows = [['operation', 'median ms']]
+    writes = [task_row(i) for i in range(args.items)]
+    put_sample = writes[:500]
+    with quiet():
+        put_each = timed(lambda: [DynamoDBHandler.write_item(TABLE, item) for item in put_sample], 1)
+        batch = timed(lambda: DynamoDBHandler.batch_write_items(TABLE, put_sample), args.repeat)
+        assert DynamoDBHandler.batch_write_items(TABLE, writes)
+    assert len(table.items) == args.items
+    rows.append(['500 items, write_item each', f"{put_each['median_ms']:.1f}"])
+    rows.append(['500 items, batch_write_items (1 in 10 unprocessed)', f"{batch['median_ms']:.1f}"])
+
+    scan = timed(lambda: sum(1 for _ in DynamoDBHandler.iter_scan(TABLE)), args.repeat)
+    parallel = timed(lambda: sum(1 for _ in DynamoDBHandler.parallel_scan(TABLE, total_segments=4)), args.repeat)
+    assert sum(1 for _ in DynamoDBHandler.parallel_scan(TABLE, total_segments=4)) == args.items
+    rows.append([f"{args.items} items, iter_scan", f"{scan['median_ms']:.1f}"])
+    rows.append([f"{args.items} items, parallel_scan 4 segments", f"{parallel['median_ms']:.1f}"])
+    report(f"DynamoDB stand-in, {args.latency * 1000:.0f} ms simulated round trip", rows)
+
+    ## per-call overhead, no round trip: a boto3 resource built per call (or per thread, as a
+    ## thread-local cache does on short-lived threads) against the handler's shared client
+    table.unprocessed_every = 0
+    table.latency = 0.0
+    key = {'task_id': 'task-000001'}
+
+    def get_with_new_resource(session=boto3):
+        resource = session.resource('dynamodb')
+        stub_http(resource.meta.client, table.respond)
+        return resource.Table(TABLE).get_item(Key=key)
+
+    def on_fresh_thread(fn):
+        worker = threading.Thread(target=fn)
+        worker.start()
+        worker.join()
+
+    overhead = {
+        'get_item, new boto3.resource per call': get_with_new_resource,
+        'get_item, DynamoDBHandler': lambda: DynamoDBHandler.get_item(TABLE, key),
+        ## what the removed thread-local cache built on each new thread
+        'fresh thread, get_item, new session resource': lambda: on_fresh_thread(
+            lambda: get_with_new_resource(boto3.session.Session())),
+        'fresh thread, get_item, DynamoDBHandler': lambda: on_fresh_thread(lambda: DynamoDBHandler.get_item(TABLE, key)),
+    }
+    overhead_rows = [['operation', 'median ms', 'p95 ms']]
+    for operation, fn in overhead.items():
+        result = timed(fn, 50)
+        overhead_rows.append([operation, f"{result['median_ms']:.2f}", f"{result['p95_ms']:.2f}"])
+    report('per-call overhead, no round trip', overhead_rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Launch latency of a 16 node job: one register-task-definition plus one start-task per
+node, through the shared in-process ECS client versus one forked interpreter per call.
+
+The forked path runs `python -c` with boto3 making the same stubbed call, a lower bound
+of the `aws` CLI (which additionally imports awscli). Both paths answer from the same
+local stub; --latency adds a simulated network round trip per request.
+
+    python benchmarks/bench_ecs_launch.py [--nodes 16] [--latency 0.02] [--repeat 5]
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+from _common import stub_http, timed, quiet, report
+
+from client_manager import ClientManager
+import task_manager
+from task_manager import TaskManager, _run_ecs_api
+
+CLUSTER_ARN = 'arn:aws:ecs:us-east-1:000000000000:cluster/bench-cluster'
+TASK_DEF_ARN = 'arn:aws:ecs:us-east-1:000000000000:task-definition/TrainingTask:1'
+
+
+def ecs_responder(operation, params):
+    if operation == 'RegisterTaskDefinition':
+        return {'taskDefinition': {'taskDefinitionArn': TASK_DEF_ARN, 'status': 'ACTIVE'}}
+    if operation in ('StartTask', 'RunTask'):
+        instances = params.get('containerInstances') or [f"inst-{i}" for i in range(params.get('count', 1))]
+        return {'tasks': [{
+            'taskArn': f"arn:aws:ecs:us-east-1:000000000000:task/bench-cluster/{inst}-task",
+            'clusterArn': CLUSTER_ARN,
+            'containerInstanceArn': f"arn:aws:ecs:us-east-1:000000000000:container-instance/bench-cluster/{inst}",
+            'taskDefinitionArn': TASK_DEF_ARN,
+        } for inst in instances], 'failures': []}
+    raise ValueError(operation)
+
+
+## the forked child, one per API call as the CLI path did
+CHILD = r'''
+import sys, json
+sys.path.insert(0, sys.argv[1])
+from _common import stub_http
+import boto3
+from bench_ecs_launch import ecs_responder
+client = boto3.client('ecs')
+stub_http(client, ecs_responder, float(sys.argv[2]))
+operation, params = sys.argv[3], json.loads(sys.argv[4])
+print(json.dumps(getattr(client, operation)(**params), default=str))
+'''
+
+
+def forked_launch(container_inst_ids, latency):
+    bench_dir = os.path.dirname(os.path.abspath(__file__))
+    calls = [('register_task_definition', {'family': 'TrainingTask', 'containerDefinitions': [{'name': 'c', 'image': 'i'}]})]
+    calls += [('start_task', {'cluster': 'bench-cluster', 'taskDefinition': TASK_DEF_ARN, 'containerInstances': [inst_id]})
+              for inst_id in container_inst_ids]
+    for operation, params in calls:
+        subprocess.run([sys.executable, '-c', CHILD, bench_dir, str(latency), operation, json.dumps(params)],
+                       check=True, capture_output=True)
+
+
+def in_process_launch(container_inst_ids, launch_fn):
+    _run_ecs_api(['aws', 'ecs', 'register-task-definition'], 'register_task_definition',
+                 family='TrainingTask', containerDefinitions=[{'name': 'c', 'image': 'i'}])
+    launched, _, errors = launch_fn(TASK_DEF_ARN, True, len(container_inst_ids), container_inst_ids)
+    assert not errors and len(launched) == len(container_inst_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    stub_http(ClientManager.get_client('ecs'), ecs_responder, args.latency)
+    task_manager._launch_type = 'EC2'
+    container_inst_ids = [f"inst-{i:03d}" for i in range(args.nodes)]
+
+    rows = [['path', 'median ms', 'p95 ms']]
+    with quiet():
+        ## warm the shared client once, as a running console has
+        in_process_launch(container_inst_ids, TaskManager._launch_tasks_fanout)
+        results = {
+            'forked interpreter per call': timed(lambda: forked_launch(container_inst_ids, args.latency),
+                                                 max(1, args.repeat // 2)),
+            'in-process, fanout': timed(lambda: in_process_launch(container_inst_ids, TaskManager._launch_tasks_fanout),
+                                        args.repeat),
+            'in-process, batched': timed(lambda: in_process_launch(container_inst_ids, TaskManager._launch_tasks_batched),
+                                         args.repeat),
+        }
+    for path, result in results.items():
+        rows.append([path, f"{result['median_ms']:.1f}", f"{result['p95_ms']:.1f}"])
+    report(f"{args.nodes} node launch, {args.latency * 1000:.0f} ms simulated round trip", rows)
+
+
+if __name__ == '__main__':
+    main()
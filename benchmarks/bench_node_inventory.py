@@ -0,0 +1,109 @@
+"""
+Node inventory of a large cluster: the full list + describe sweep of
+NodeManager.refresh_all_node_status, and the container instance <-> node lookups
+served from the NodeIndex built by each sweep.
+
+The ECS endpoint is stubbed and rejects describe calls over the 100 ARN limit, as
+ECS does. NODE_REFRESH_WORKERS=1 is the sequential sweep, one chunk after another.
+
+    python benchmarks/bench_node_inventory.py [--nodes 500 1000] [--latency 0.02]
+"""
+import argparse
+
+from _common import stub_http, timed, quiet, report
+
+from client_manager import ClientManager
+import node_manager
+from node_manager import NodeManager, NodeIndex
+
+LIST_PAGE_SIZE = 100
+
+
+def instance_arn(i: int) -> str:
+    return f"arn:aws:ecs:us-east-1:000000000000:container-instance/bench-cluster/{i:032x}"
+
+
+def node_name(i: int) -> str:
+    return f"p5-10-0-{i // 250}-{i % 250}-node{i:04d}"
+
+
+def container_instance(i: int) -> dict:
+    gpus = {'name': 'GPU', 'type': 'STRINGSET', 'stringSetValue': [f"GPU-{g}" for g in range(8)]}
+    return {
+        'containerInstanceArn': instance_arn(i),
+        'status': 'ACTIVE',
+        'attributes': [{'name': 'Node', 'value': node_name(i)}, {'name': 'TopologyGroup', 'value': f"nn-{i // 32}"}],
+        'registeredResources': [gpus],
+        'remainingResources': [gpus] if i % 4 else [dict(gpus, stringSetValue=[])],
+    }
+
+
+def ecs_responder(num_nodes):
+    def respond(operation, params):
+        if operation == 'ListContainerInstances':
+            start = int(params.get('nextToken', 0))
+            end = min(start + LIST_PAGE_SIZE, num_nodes)
+            page = {'containerInstanceArns': [instance_arn(i) for i in range(start, end)]}
+            if end < num_nodes:
+                page['nextToken'] = str(end)
+            return page
+        if operation == 'DescribeContainerInstances':
+            arns = params['containerInstances']
+            if len(arns) > 100:
+                raise ValueError('describe_container_instances accepts at most 100 instances')
+            return {'containerInstances': [container_instance(int(arn.split('/')[-1], 16)) for arn in arns],
+                    'failures': []}
+        raise ValueError(operation)
+    return respond
+
+
+def linear_fetch_node_name(nodes, container_inst_id):
+    ## lookup by scanning the inventory, as NodeManager did before NodeIndex
+    for name, node in nodes.items():
+        if node.container_inst_id == container_inst_id:
+            return name
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', type=int, nargs='+', default=[500, 1000])
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with quiet():
+        manager = NodeManager()
+    responder = {'num_nodes': 0}
+    stub_http(ClientManager.get_client('ecs'),
+              lambda operation, params: ecs_responder(responder['num_nodes'])(operation, params), args.latency)
+
+    sweep_rows = [['nodes', 'workers', 'median ms', 'p95 ms']]
+    lookup_rows = [['nodes', 'operation', 'median ms']]
+    for num_nodes in args.nodes:
+        responder['num_nodes'] = num_nodes
+        manager.node_names = [node_name(i) for i in range(num_nodes)]
+
+        for workers in (1, 8):
+            node_manager.NODE_REFRESH_WORKERS = workers
+            with quiet():
+                result = timed(lambda: manager.refresh_all_node_status(force=True), args.repeat)
+            sweep_rows.append([num_nodes, workers, f"{result['median_ms']:.1f}", f"{result['p95_ms']:.1f}"])
+
+        assert len(manager.get_spare_node_names()) == num_nodes - (num_nodes + 3) // 4
+        inst_ids = [manager.get_container_inst_id(name) for name in manager.node_names]
+        nodes = dict(manager.nodes)
+        lookups = {
+            f"{num_nodes} x fetch_node_name, index": lambda: [manager.fetch_node_name(i) for i in inst_ids],
+            f"{num_nodes} x fetch_node_name, linear scan": lambda: [linear_fetch_node_name(nodes, i) for i in inst_ids],
+            'NodeIndex.build': lambda: NodeIndex.build(nodes),
+        }
+        for operation, fn in lookups.items():
+            lookup_rows.append([num_nodes, operation, f"{timed(fn, args.repeat)['median_ms']:.3f}"])
+
+    report(f"refresh_all_node_status(force=True), {args.latency * 1000:.0f} ms simulated round trip", sweep_rows)
+    report('inventory lookups', lookup_rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Placement simulator for the node allocators: a stream of jobs with random sizes
+and run times arrives at a cluster of equally sized topology groups, waits in FIFO
+order for free nodes, and is placed by OrderedAllocator or TopologyAllocator. Both
+allocators see the same job stream.
+
+Reported per allocator:
+  - spanned / ideal: groups a job spans over the fewest groups its size needs
+  - split jobs: jobs spanning more groups than needed
+  - whole free groups: groups with every node free, averaged over placements,
+    the room left for the next large job
+
+Jobs only wait for a node count, so both allocators start every job at the same time.
+
+    python benchmarks/bench_placement.py [--groups 8] [--group-size 8] [--jobs 5000]
+"""
+import argparse
+import heapq
+import math
+import random
+from collections import deque
+
+from _common import report
+
+from node_allocator import NodeTopology, OrderedAllocator, TopologyAllocator
+
+JOB_SIZES = [1, 1, 2, 2, 4, 4, 8, 16]
+
+
+def build_cluster(num_groups, group_size):
+    ## names carry the node address, so name order keeps a subnet's nodes together as in a real cluster
+    return NodeTopology(groups={
+        f"p5-10-0-{group}-{host}": f"10.0.{group}.0/24"
+        for group in range(num_groups) for host in range(1, group_size + 1)
+    })
+
+
+def job_stream(num_jobs, seed, max_nodes):
+    rng = random.Random(seed)
+    clock = 0.0
+    for job_id in range(num_jobs):
+        clock += rng.expovariate(1.0)
+        yield job_id, clock, min(rng.choice(JOB_SIZES), max_nodes), rng.expovariate(1.0 / 10)
+
+
+def simulate(allocator, topology, jobs, group_size):
+    free = set(topology.groups)
+    running = []  # (end time, job id, nodes)
+    waiting = deque()
+    stats = {'jobs': 0, 'spanned': 0, 'ideal': 0, 'split': 0, 'whole_groups': 0}
+
+    def place_waiting(now):
+        while waiting and waiting[0][2] <= len(free):
+            job_id, _, size, duration = waiting.popleft()
+            nodes = allocator.allocate(sorted(free), size, topology)
+            free.difference_update(nodes)
+            heapq.heappush(running, (now + duration, job_id, nodes))
+
+            spanned = len({topology.group_of(node_name) for node_name in nodes})
+            ideal = math.ceil(size / group_size)
+            stats['jobs'] += 1
+            stats['spanned'] += spanned
+            stats['ideal'] += ideal
+            stats['split'] += spanned > ideal
+            busy_groups = {topology.group_of(node_name) for node_name in set(topology.groups) - free}
+            stats['whole_groups'] += len(set(topology.groups.values()) - busy_groups)
+
+    for job in jobs:
+        arrived_at = job[1]
+        while running and running[0][0] <= arrived_at:
+            ended_at, _, nodes = heapq.heappop(running)
+            free.update(nodes)
+            place_waiting(ended_at)
+        waiting.append(job)
+        place_waiting(arrived_at)
+    while running:
+        ended_at, _, nodes = heapq.heappop(running)
+        free.update(nodes)
+        place_waiting(ended_at)
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--groups', type=int, default=8)
+    parser.add_argument('--group-size', type=int, default=8)
+    parser.add_argument('--jobs', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    topology = build_cluster(args.groups, args.group_size)
+    rows = [['allocator', 'spanned / ideal', 'split jobs', 'whole free groups']]
+    for allocator in (OrderedAllocator(), TopologyAllocator()):
+        stats = simulate(allocator, topology, job_stream(args.jobs, args.seed, len(topology.groups)), args.group_size)
+        rows.append([
+            type(allocator).__name__,
+            f"{stats['spanned'] / stats['ideal']:.3f}",
+            f"{stats['split'] / stats['jobs']:.1%}",
+            f"{stats['whole_groups'] / stats['jobs']:.2f}",
+        ])
+    report(f"{args.jobs} jobs on {args.groups} groups of {args.group_size} nodes", rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Console startup cost per service: each service is measured in a fresh interpreter,
+so its import is not served from an earlier one's sys.modules. A child times the
+module import, the first Services accessor call (construction) and the first
+call the UI makes on it, against stubbed boto3 clients that answer every request
+with empty results. The UI itself is timed as the import of appuiv4 plus
+create_interface(). Targets that cannot be imported here are reported with their error.
+
+    python benchmarks/bench_startup.py [--repeat 5]
+"""
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from _common import stub_http, quiet, report
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONF_DIR = os.path.join(REPO_DIR, 'HYBRID_GPU_PRE_SETTINGS')
+
+os.environ.setdefault('ECS_TASK_DEF', os.path.join(CONF_DIR, 'ecs_task_def.json'))
+os.environ.setdefault('TRAINING_CONTAINER_DEF', os.path.join(CONF_DIR, 'training_container_def.json'))
+os.environ.setdefault('HEALTH_CONTAINER_DEF', os.path.join(CONF_DIR, 'healthcheck_container_def.json'))
+os.environ.setdefault('JOB_MANAGE_TABLE', 'bench-jobs')
+os.environ.setdefault('TASK_MANAGE_TABLE', 'bench-tasks')
+os.environ.setdefault('NODE_NAME_LIST', 'A800-10-204-9-8,A800-10-204-9-9')
+
+## every list / describe / query the first calls make comes back empty
+EMPTY_RESPONSE = {
+    'containerInstanceArns': [], 'containerInstances': [], 'taskArns': [], 'tasks': [], 'failures': [],
+    'Items': [], 'Count': 0, 'ScannedCount': 0, 'events': [],
+}
+STUBBED_SERVICES = ('ecs', 'dynamodb', 'logs')
+
+
+def _first_calls():
+    """target -> (module, Services accessor, first call the UI makes on the instance)"""
+    return {
+        'node_manager': ('node_manager', 'node_manager', lambda manager: manager.get_node_status_display()),
+        'task_manager': ('task_manager', 'task_manager', lambda manager: manager.describe_tasks(['bench-task'])),
+        'job_manager': ('job_manager', 'job_manager', lambda manager: manager.get_jobs_data()),
+        'cloudwatch_manager': ('cloudwatch_manager', 'cloudwatch_manager',
+                               lambda manager: manager.get_task_logs('bench-task', '/ecs/bench', 'TrainingContainer')),
+        'health_manager': ('health_manager', 'health_manager', None),
+        'training_manager': ('training_manager', 'training_manager', None),
+    }
+
+
+def _ms(started_at):
+    return (time.perf_counter() - started_at) * 1000
+
+
+def run_child(target: str) -> dict:
+    """Measure one target in this (fresh) interpreter."""
+    timings = {}
+    try:
+        started_at = time.perf_counter()
+        import boto3  # noqa: F401
+        timings['import boto3'] = _ms(started_at)
+
+        ## clients are built up front so the stub is in place, their cost is its own row
+        from client_manager import ClientManager
+        started_at = time.perf_counter()
+        for service in STUBBED_SERVICES:
+            stub_http(ClientManager.get_client(service), lambda operation, params: EMPTY_RESPONSE)
+        timings['clients'] = _ms(started_at)
+
+        if target == 'ui':
+            started_at = time.perf_counter()
+            with quiet():
+                appui = importlib.import_module('appuiv4')
+            timings['import'] = _ms(started_at)
+            started_at = time.perf_counter()
+            with quiet():
+                appui.create_interface()
+            timings['first use'] = _ms(started_at)
+            return {'timings': timings}
+
+        module_name, accessor, first_call = _first_calls()[target]
+        started_at = time.perf_counter()
+        with quiet():
+            importlib.import_module(module_name)
+        timings['import'] = _ms(started_at)
+
+        from service_container import Services
+        started_at = time.perf_counter()
+        with quiet():
+            manager = getattr(Services, accessor)()
+        timings['construct'] = _ms(started_at)
+
+        if first_call is not None:
+            started_at = time.perf_counter()
+            with quiet():
+                first_call(manager)
+            timings['first call'] = _ms(started_at)
+    except Exception as e:
+        return {'timings': timings, 'error': f"{type(e).__name__}: {e}"}
+    return {'timings': timings}
+
+
+def measure(target: str, repeat: int) -> dict:
+    samples = []
+    error = None
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', target],
+                                   capture_output=True, text=True, cwd=REPO_DIR)
+        if completed.returncode != 0:
+            return {'error': completed.stderr.strip().splitlines()[-1]}
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        samples.append(result['timings'])
+        error = result.get('error')
+        if error:
+            break
+    stages = {stage for sample in samples for stage in sample}
+    medians = {stage: statistics.median(sample[stage] for sample in samples if stage in sample) for stage in stages}
+    return {'medians': medians, 'error': error}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child)))
+        return
+
+    rows = [['target', 'import boto3', 'clients', 'import', 'construct', 'first call', 'note']]
+    for target in list(_first_calls()) + ['ui']:
+        result = measure(target, args.repeat)
+        medians = result.get('medians', {})
+
+        def cell(stage):
+            return f"{medians[stage]:.1f}" if stage in medians else '-'
+
+        first_use = 'first use' if target == 'ui' else 'first call'
+        rows.append([target, cell('import boto3'), cell('clients'), cell('import'), cell('construct'),
+                     cell(first_use), result['error'] or ''])
+    report(f"console startup, median ms of {args.repeat} fresh interpreters", rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,18 @@
 import json
+import time
 import boto3
 import os 
+from botocore.exceptions import ClientError
 
 client = boto3.client('sns')
 ecs_client = boto3.client('ecs')
 ssm_client = boto3.client('ssm')
+dynamodb = boto3.resource('dynamodb')
+
+# Counter item holding the last sequence number handed out to a state record
+STATE_SEQUENCE_KEY = '__sequence__'
+# Seconds a STOPPED task record is kept before DynamoDB TTL (expires_at) deletes it
+STATE_STOPPED_TASK_TTL = int(os.environ.get('STATE_STOPPED_TASK_TTL', 3 * 24 * 3600))
 
 def parse_event_message(event_dict, event_attributes):
     print("parsing event")
@@ -29,6 +37,100 @@ def get_ssm_instance_info(ec2InstanceId):
     )
     return response
 
+def _gpu_count(resources):
+    for item in resources:
+        if item['name'] == 'GPU':
+            return len(item.get('stringSetValue', []))
+    return 0
+
+
+def build_state_record(event):
+    """
+    Turn an ECS task / container instance state change event into the compact
+    record kept in ECS_STATE_TABLE, or None for other event types.
+    """
+    detail = event['detail']
+    cluster_name = detail['clusterArn'].split('/')[-1]
+
+    if event["detail-type"] == "ECS Task State Change":
+        record = {
+            'resource_id': detail['taskArn'].split('/')[-1],
+            'resource_type': 'TASK',
+            'cluster_name': cluster_name,
+            'last_status': detail.get('lastStatus'),
+            'desired_status': detail.get('desiredStatus'),
+            'container_instance_id': detail.get('containerInstanceArn', '').split('/')[-1],
+            'task_definition_arn': detail.get('taskDefinitionArn'),
+            'stop_code': detail.get('stopCode'),
+            'stopped_reason': detail.get('stoppedReason'),
+            'exit_codes': {
+                container['name']: container['exitCode']
+                for container in detail.get('containers', [])
+                if container.get('exitCode') is not None
+            },
+            'event_version': detail.get('version', 0),
+            'updated_at': detail.get('updatedAt', event.get('time')),
+        }
+    elif event["detail-type"] == "ECS Container Instance State Change":
+        attributes = {attr['name']: attr.get('value') for attr in detail.get('attributes', [])}
+        record = {
+            'resource_id': detail['containerInstanceArn'].split('/')[-1],
+            'resource_type': 'CONTAINER_INSTANCE',
+            'cluster_name': cluster_name,
+            'status': detail.get('status'),
+            'agent_connected': detail.get('agentConnected'),
+            'node_name': attributes.get('Node'),
+            'registered_gpu': _gpu_count(detail.get('registeredResources', [])),
+            'remaining_gpu': _gpu_count(detail.get('remainingResources', [])),
+            'event_version': detail.get('version', 0),
+            'updated_at': detail.get('updatedAt', event.get('time')),
+        }
+    else:
+        return None
+
+    ## running tasks and instances stay until their next change, stopped tasks age out
+    if record.get('last_status') == 'STOPPED':
+        record['expires_at'] = int(time.time()) + STATE_STOPPED_TASK_TTL
+
+    return {key: value for key, value in record.items() if value is not None}
+
+
+def upsert_state_record(record):
+    """
+    Write a state record tagged with a cluster wide sequence number, so the
+    console can read changes incrementally. Out of order (older) events are
+    dropped by comparing the ECS event version.
+
+    The seq is taken before the record is written, so concurrent invocations
+    can land records out of seq order; the console re-reads a window of seqs
+    below the last one it saw (ECS_STATE_REREAD_WINDOW) to pick those up.
+    """
+    table_name = os.environ.get('ECS_STATE_TABLE')
+    if not table_name or record is None:
+        return
+
+    table = dynamodb.Table(table_name)
+    seq_response = table.update_item(
+        Key={'resource_id': STATE_SEQUENCE_KEY},
+        UpdateExpression='ADD seq :one',
+        ExpressionAttributeValues={':one': 1},
+        ReturnValues='UPDATED_NEW'
+    )
+    record['seq'] = seq_response['Attributes']['seq']
+
+    try:
+        table.put_item(
+            Item=record,
+            ConditionExpression='attribute_not_exists(resource_id) OR event_version < :v',
+            ExpressionAttributeValues={':v': record['event_version']}
+        )
+        print(f"state record {record['resource_id']} stored with seq {record['seq']}")
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        print(f"skip stale state record {record['resource_id']} version {record['event_version']}")
+
+
 def lambda_handler(event, context):
     id_name = ""
     subject = "no specific subject"
@@ -56,6 +158,11 @@ def lambda_handler(event, context):
         if event["source"] != "aws.ecs":
             raise ValueError("Function only supports input from events with a source type of: aws.ecs")
 
+        try:
+            upsert_state_record(build_state_record(event))
+        except Exception as e:
+            print(f"failed to store state record: {e}")
+
         # Switch on task/container events.
         if event["detail-type"] == "ECS Task State Change":
             print("ECS Task State Change")
@@ -1,23 +1,29 @@
-import gradio as gr
 import time
+import threading
+_import_started_at = time.perf_counter()
+
+import gradio as gr
 import os
 import json
 import logging
 from datetime import datetime
-from typing import Tuple, List, Dict, Any, Optional
-from threading import Lock
+from typing import Tuple, List, Dict, Any, Optional, Iterator
 from pathlib import Path
 
 # Import managers
 from node_manager import NodeManager
-from training_manager import TrainingManager
+from training_manager import TrainingManager, CANONICAL_MASTER_PORTS
 from health_manager import HealthManager
 from job_manager import Job, JobManager
-from task_manager import TaskManager
+from task_manager import TaskManager, TaskLaunchSpec, LaunchReport
 from cloudwatch_manager import CloudWatchManager
 from file_manager import FileManager
+from precheck_watcher import PrecheckWatcher
+from warm_pool import WarmPool, FirstStepTracker
+from job_queue import JobQueue, QueuedJob, GangScheduler
+from service_container import Services, StartupProfile, CONSOLE_PROFILE_STARTUP
 
-import threading
+StartupProfile.record('import appuiv4', time.perf_counter() - _import_started_at)
 
 # Configure logging
 logging.basicConfig(
@@ -39,15 +45,57 @@ DEFAULT_PORT = 7860
 
 class EnhancedTrainingGUI:
     def __init__(self):
-        self.job_manager = JobManager()
-        self.health_manager = HealthManager()
-        self.cloudwatch_manager = CloudWatchManager()
-        self.task_manager = TaskManager()
-        self.node_manager = NodeManager()
-        self.submission_lock = Lock()
-        self.training_manager = None
+        self._background_started = False
+        self._background_lock = threading.Lock()
         logger.info("EnhancedTrainingGUI initialized")
 
+    def start_background_services(self):
+        """
+        Start the gang scheduler and fill the warm pool, once per process. Runs when
+        the page loads or a job is submitted, so building the console does no AWS work.
+        """
+        with self._background_lock:
+            if self._background_started:
+                return
+            self._background_started = True
+        GangScheduler.start(self._launch_queued_job)
+        self._replenish_warm_pool()
+
+    ## Managers are shared per process and built on first use, see service_container.Services
+    @property
+    def job_manager(self) -> JobManager:
+        return Services.job_manager()
+
+    @property
+    def health_manager(self) -> HealthManager:
+        return Services.health_manager()
+
+    @property
+    def cloudwatch_manager(self) -> CloudWatchManager:
+        return Services.cloudwatch_manager()
+
+    @property
+    def task_manager(self) -> TaskManager:
+        return Services.task_manager()
+
+    @property
+    def node_manager(self) -> NodeManager:
+        return Services.node_manager()
+
+    @property
+    def training_manager(self) -> TrainingManager:
+        return Services.training_manager()
+
+    def _replenish_warm_pool(self):
+        if not WarmPool.is_enabled():
+            return
+        try:
+            WarmPool.replenish(
+                self.training_manager.build_training_launch_spec(CANONICAL_MASTER_PORTS[0], command=[])
+            )
+        except Exception as e:
+            logger.error(f"Error replenishing warm pool: {str(e)}", exc_info=True)
+
     def launch_training(self, 
                       base_job_name: str, 
                       num_nodes: int, 
@@ -61,16 +109,9 @@ class EnhancedTrainingGUI:
                       host_workdir: str,
                       health_check_checkbox: bool,
                       progress=gr.Progress()) -> Tuple[gr.Markdown, List[List[str]]]:
-        if not self.submission_lock.acquire(blocking=False):
-            logger.warning("Another job submission is in progress")
-            return (
-                gr.Markdown("⚠️ Another job submission is in progress. Please wait."),
-                None
-            )
-
+        ## Submissions are queued, the gang scheduler launches each job once all its nodes are free
         try:
-            logger.info(f"Launching training job: {base_job_name} with {num_nodes} nodes")
-            self.training_manager = TrainingManager()
+            logger.info(f"Queueing training job: {base_job_name} with {num_nodes} nodes")
             progress(0, desc="Initializing...")
             
             # ui_task_config = {
@@ -79,226 +120,219 @@ class EnhancedTrainingGUI:
             #     'traininghealth_check': health_check_checkbox
             # }
             
-            progress(0.1, desc="Generating Job ID...")
+            progress(0.3, desc="Generating Job ID...")
             job_id, exec_history_save_dir, job_timestamp = self._generate_job_id(base_job_name)
-            
-            progress(0.2, desc="Assigning nodes...")
-            # all_node_names = self._assign_job_nodes(num_nodes)
-            # master_node_name = self._assign_job_master()
-            # logger.info(f"Assigned master node: {master_node_name}")
 
             train_job_settings_pack = {
                 'job_id': job_id,
                 'job_timestamp': job_timestamp,
-                'num_nodes': num_nodes,
+                'num_nodes': int(num_nodes),
                 'master_port': master_port,
                 'user_script_path': user_script_path,
                 'exec_history_save_dir': exec_history_save_dir,
                 'health_check_checkbox': health_check_checkbox
             }
-            
-            if health_check_checkbox:
-                progress(0.3, desc="Setting up health check...")
-                # self._setup_health_check([])
-                
-                progress(0.35, desc="Generating health check scripts...")
-                precheck_task_def_path = self.health_manager.generate_precheck_scripts(
-                    num_nodes, exec_history_save_dir, True
-                )
-                
-                precheck_job_id = job_id+'-precheck'
-                progress(0.4, desc="Submit health check Tasks...")
-                precheck_task_ids, orch_node_names, container_inst_ids, precheck_history_file_path = self._run_all_tasks(
-                    precheck_job_id,
-                    job_timestamp,
-                    num_nodes,
-                    precheck_task_def_path,
-                    exec_history_save_dir
-                )
-                
-                progress(0.4, desc="Record HealthCheck Job...")
-                self._record_job(
-                    precheck_task_ids,
-                    num_nodes,
-                    precheck_job_id,
-                    job_timestamp,
-                    orch_node_names,
-                    container_inst_ids,
-                    'PRE_CHECKING'
-                )
-
-                ## Lock all instances for following training
-                self.node_manager.lock_healthcheck_instances(container_inst_ids)
-
-                self.node_manager.refresh_all_node_status()
-                
-                results = self._prepare_results(
-                    orch_node_names,
-                    precheck_task_def_path,
-                    precheck_task_ids,
-                    exec_history_save_dir,
-                    precheck_job_id
-                )
 
+            progress(0.6, desc="Queueing job...")
+            self.start_background_services()
+            position = GangScheduler.submit(job_id, int(num_nodes), train_job_settings_pack)
 
-                ## Launch a background thread to polling the healthCheck job/tasks status 
-                #   + submit training
-                #   + record tasks to ddb
-                #   + change job status on ddb existing item 
+            results = [f"\n🕒 Job {job_id} queued at position {position}, it launches once {num_nodes} nodes are free"]
+            for queue_id, queued_nodes, enqueued_at, skip_count in JobQueue.get_queue_display():
+                results.append(f"\n  └─ `{queue_id}`: {queued_nodes} nodes, queued {enqueued_at}, backfilled past {skip_count} times")
 
-                training_job_thread = threading.Thread(
-                    target = self._background_launch_training_job_after_precheck,
-                    kwargs={'job_id': job_id,
-                            'precheck_job_id': precheck_job_id,
-                            'precheck_task_ids': precheck_task_ids,
-                            'container_inst_ids': container_inst_ids,
-                            'train_job_settings_pack': train_job_settings_pack
-                            }
-                )
+            node_data = self.node_manager.get_node_status_display()
+            progress(1.0, desc="Complete!")
+            return (
+                gr.Markdown("\n".join(results)),
+                node_data
+            )
+                
+        except Exception as e:
+            logger.error(f"Error queueing training: {str(e)}", exc_info=True)
+            return (
+                gr.Markdown(f"⚠️ Error: {str(e)}"),
+                None
+            )
 
-                training_job_thread.start()
 
-                
-                node_data = self.node_manager.get_node_status_display()
-                progress(1.0, desc="Complete!")
-                return (
-                    gr.Markdown("\n".join(results)),
-                    node_data
-                )
+    def _launch_queued_job(self, queued_job: QueuedJob, node_names: List[str], container_inst_ids: Optional[List[str]]):
+        """
+        Launch a job the gang scheduler dispatched, called on the scheduler thread.
 
+        Args:
+            queued_job: the dispatched job, its settings are the launch_training inputs
+            node_names: nodes reserved for the job in rank order, empty for a warm start
+            container_inst_ids: container instances of node_names, None to hand the job to warm standbys
+        """
+        train_job_settings_pack = queued_job.settings
+        job_id = train_job_settings_pack['job_id']
+        job_timestamp = train_job_settings_pack['job_timestamp']
+        num_nodes = train_job_settings_pack['num_nodes']
+        exec_history_save_dir = train_job_settings_pack['exec_history_save_dir']
+        health_check_checkbox = train_job_settings_pack['health_check_checkbox']
+        logger.info(f"Launching training job: {job_id} with {num_nodes} nodes {node_names}")
+
+        if health_check_checkbox:
+            # self._setup_health_check([])
+
+            precheck_task_def_path = self.health_manager.generate_precheck_scripts(
+                num_nodes, exec_history_save_dir, True
+            )
 
-            progress(0.5, desc="Generating task definitions...")
-            task_def_path = self._generate_nodes_script(
+            precheck_job_id = job_id+'-precheck'
+            precheck_task_ids, orch_node_names, container_inst_ids, precheck_history_file_path, launch_report = self._run_all_tasks(
+                precheck_job_id,
+                job_timestamp,
                 num_nodes,
-                master_port,
-                user_script_path,
+                precheck_task_def_path,
                 exec_history_save_dir,
-                health_check_checkbox
+                container_inst_ids
             )
-            
-            progress(0.7, desc="Launching training tasks...")
-            training_task_ids, orch_node_names, container_inst_ids, history_file_path = self._run_all_tasks(
-                job_id,
-                job_timestamp,
+
+            self._record_job(
+                precheck_task_ids,
                 num_nodes,
-                task_def_path,
-                exec_history_save_dir
+                precheck_job_id,
+                job_timestamp,
+                orch_node_names,
+                container_inst_ids,
+                'PRE_CHECKING',
+                launch_report
             )
 
-            progress(0.8, desc="Record whole training job to DDB...")
-            self._record_job(
-                    training_task_ids,
-                    num_nodes,
-                    job_id,
-                    job_timestamp,
-                    orch_node_names,
-                    container_inst_ids,
-                    'IN_PROGRESS'
-                )
-            
-            progress(0.9, desc="Refreshing node status...")
+            ## Lock all instances for following training
+            self.node_manager.lock_healthcheck_instances(container_inst_ids, precheck_job_id)
+
             self.node_manager.refresh_all_node_status()
-            
+
             results = self._prepare_results(
                 orch_node_names,
-                task_def_path,
-                training_task_ids,
-                history_file_path,
-                job_id
-            )
-            
-            node_data = self.node_manager.get_node_status_display()
-
-            #job_data = self.refresh_job_status()
-            
-            progress(1.0, desc="Complete!")
-            return (
-                gr.Markdown("\n".join(results)),
-                node_data
+                precheck_task_def_path,
+                precheck_task_ids,
+                exec_history_save_dir,
+                precheck_job_id,
+                launch_report
             )
-                
-        except Exception as e:
-            logger.error(f"Error launching training: {str(e)}", exc_info=True)
-            return (
-                gr.Markdown(f"⚠️ Error: {str(e)}"),
-                None
+            logger.info("".join(results))
+
+
+            ## Hand the precheck tasks to the shared watcher, once all succeed it
+            #   + submit training
+            #   + record tasks to ddb
+            #   + change job status on ddb existing item 
+
+            PrecheckWatcher.watch(
+                precheck_job_id,
+                precheck_task_ids,
+                on_success=lambda: self._launch_training_job_after_precheck(
+                    job_id, precheck_job_id, container_inst_ids, train_job_settings_pack
+                ),
+                on_failure=lambda reason: self._abort_training_job_after_precheck(
+                    precheck_job_id, container_inst_ids, reason
+                )
             )
-        finally:
-            self.submission_lock.release()
+            return
 
 
+        task_def_path = self._generate_nodes_script(
+            num_nodes,
+            train_job_settings_pack['master_port'],
+            train_job_settings_pack['user_script_path'],
+            exec_history_save_dir,
+            health_check_checkbox
+        )
 
-    def _background_launch_training_job_after_precheck(self, job_id, precheck_job_id, precheck_task_ids, container_inst_ids, train_job_settings_pack):
-        retry_interval=10
-        retry_times=60
-        timeout = retry_interval*retry_times
+        training_task_ids, orch_node_names, container_inst_ids, history_file_path, launch_report = self._run_all_tasks(
+            job_id,
+            job_timestamp,
+            num_nodes,
+            task_def_path,
+            exec_history_save_dir,
+            container_inst_ids
+        )
 
-        succeed_healthcheck_tasks = []
-        for i in range(retry_times):
-            print(f"Background polling Pre-HealthChecking Status {i} times.")
+        self._record_job(
+                training_task_ids,
+                num_nodes,
+                job_id,
+                job_timestamp,
+                orch_node_names,
+                container_inst_ids,
+                'IN_PROGRESS',
+                launch_report
+            )
 
-            for taskid in precheck_task_ids:
+        self.node_manager.refresh_all_node_status()
 
-                if taskid in succeed_healthcheck_tasks:
-                    continue
+        results = self._prepare_results(
+            orch_node_names,
+            task_def_path,
+            training_task_ids,
+            history_file_path,
+            job_id,
+            launch_report
+        )
+        logger.info("".join(results))
 
-                taskstatus = TaskManager.check_task_stop_status(taskid)
-                if taskstatus == 'FAIL':
-                    ## TODO keep locking healthcheck failed instance
-                    self.node_manager.clear_healthcheck_instances()
 
-                    JobManager.update_job_status(precheck_job_id, 'PRE_CHECKING_FAIL')
 
-                    print(f"Find Pre Health Check Failed on task - {taskid}. Stop Launching Training Job.")
-                    return 
+    def _abort_training_job_after_precheck(self, precheck_job_id, container_inst_ids, reason):
+        ## only this precheck's nodes, other prechecks may still be running on theirs
+        self.node_manager.unlock_healthcheck_instances(container_inst_ids, precheck_job_id)
+        GangScheduler.wake()
 
-                elif taskstatus == 'RUNNING':
-                    continue
-                elif taskstatus == 'SUCCESS':
-                    succeed_healthcheck_tasks.append(taskid)
+        JobManager.update_job_status(precheck_job_id, 'PRE_CHECKING_FAIL')
 
-            if len(set(succeed_healthcheck_tasks)) == len(precheck_task_ids):
-                ## TODO
-                ## call ecs start-tasks provided with container instance ids
-                
-                task_def_path = self._generate_nodes_script(
-                    train_job_settings_pack['num_nodes'],
-                    train_job_settings_pack['master_port'],
-                    train_job_settings_pack['user_script_path'],
-                    train_job_settings_pack['exec_history_save_dir'],
-                    train_job_settings_pack['health_check_checkbox']
-                )
-                
-                training_task_ids, orch_node_names, container_inst_ids, history_file_path = self._run_all_tasks(
-                    job_id,
-                    train_job_settings_pack['job_timestamp'],
-                    train_job_settings_pack['num_nodes'],
-                    task_def_path,
-                    train_job_settings_pack['exec_history_save_dir'],
-                    container_inst_ids
-                )
-                
-                ## Change health check job to Done
-                JobManager.update_job_status(precheck_job_id, 'PRE_CHECKING_DONE')
-                ## Add training JOB IN_PROGRESS
-                JobManager.gather_task_and_record_job(job_id, 
-                                                      train_job_settings_pack['job_timestamp'],
-                                                      train_job_settings_pack['num_nodes'], 
-                                                      orch_node_names, 
-                                                      container_inst_ids, 
-                                                      training_task_ids, 
-                                                      "IN_PROGRESS")
-
-
-                ## Unlock instances after task launched for re-assign
-                self.node_manager.unlock_healthcheck_instances(container_inst_ids)
-                
-                self.node_manager.refresh_all_node_status()
+        print(f"Pre Health Check {precheck_job_id} failed ({reason}). Stop Launching Training Job.")
 
-                return 
 
-            time.sleep(retry_interval)
-        return
+    def _launch_training_job_after_precheck(self, job_id, precheck_job_id, container_inst_ids, train_job_settings_pack):
+        ## TODO
+        ## call ecs start-tasks provided with container instance ids
+        precheck_inst_ids = list(container_inst_ids)
+        training_task_ids = []
+        try:
+            task_def_path = self._generate_nodes_script(
+                train_job_settings_pack['num_nodes'],
+                train_job_settings_pack['master_port'],
+                train_job_settings_pack['user_script_path'],
+                train_job_settings_pack['exec_history_save_dir'],
+                train_job_settings_pack['health_check_checkbox']
+            )
+
+            training_task_ids, orch_node_names, container_inst_ids, history_file_path, launch_report = self._run_all_tasks(
+                job_id,
+                train_job_settings_pack['job_timestamp'],
+                train_job_settings_pack['num_nodes'],
+                task_def_path,
+                train_job_settings_pack['exec_history_save_dir'],
+                container_inst_ids
+            )
+
+            ## Change health check job to Done
+            JobManager.update_job_status(precheck_job_id, 'PRE_CHECKING_DONE')
+            ## Add training JOB IN_PROGRESS
+            if not JobManager.gather_task_and_record_job(job_id,
+                                                         train_job_settings_pack['job_timestamp'],
+                                                         train_job_settings_pack['num_nodes'],
+                                                         orch_node_names,
+                                                         container_inst_ids,
+                                                         training_task_ids,
+                                                         "IN_PROGRESS",
+                                                         launch_report.task_records):
+                raise RuntimeError(f"Failed to record training job {job_id}")
+        except Exception as e:
+            logger.error(f"Error launching training job {job_id} after precheck: {str(e)}", exc_info=True)
+            ## tasks nobody records would run untracked
+            TaskManager.stop_launched_tasks(training_task_ids)
+            JobManager.update_job_status(precheck_job_id, 'FAILED')
+        finally:
+            ## Unlock instances after task launched for re-assign, or once the launch gave up
+            self.node_manager.unlock_healthcheck_instances(precheck_inst_ids, precheck_job_id)
+            GangScheduler.wake()
+
+        self.node_manager.refresh_all_node_status()
 
 
     def _generate_job_id(self, base_job_name: str) -> Tuple[str, str, str]:
@@ -359,16 +393,23 @@ class EnhancedTrainingGUI:
                      task_def_path: str,
                      exec_history_save_dir: str,
                      container_inst_ids: List[str] = None
-                     ) -> Tuple[List[str], str]:
+                     ) -> Tuple[List[str], List[str], List[str], str, LaunchReport]:
         try:
-            return TaskManager.register_task_and_run_all(
+            submitted_at = time.time()
+            results = TaskManager.register_task_and_run_all(
                 job_id,
                 job_timestamp,
                 num_nodes,
                 task_def_path,
                 exec_history_save_dir,
-                container_inst_ids
+                container_inst_ids,
+                warm_pool=WarmPool if WarmPool.is_enabled() else None
             )
+            launch_report = results[-1]
+            if isinstance(task_def_path, TaskLaunchSpec) and task_def_path.is_training:
+                FirstStepTracker.watch(job_id, exec_history_save_dir, submitted_at, launch_report.launch_mode)
+            self._replenish_warm_pool()
+            return results
         except Exception as e:
             logger.error(f"Error running tasks: {str(e)}", exc_info=True)
             raise RuntimeError(f"Failed to run tasks: {str(e)}")
@@ -381,14 +422,20 @@ class EnhancedTrainingGUI:
         job_timestamp,
         orch_node_names,
         container_inst_ids,
-        JOB_STATUS
+        JOB_STATUS,
+        launch_report: LaunchReport
     ):
         try:
             # ## if Each node is assigned a task, write to job
             if len(ecs_task_ids) == num_nodes:
-                JobManager.gather_task_and_record_job(
-                    job_id, job_timestamp, num_nodes, orch_node_names, container_inst_ids, ecs_task_ids, JOB_STATUS
+                phase_start = time.perf_counter()
+                recorded = JobManager.gather_task_and_record_job(
+                    job_id, job_timestamp, num_nodes, orch_node_names, container_inst_ids, ecs_task_ids, JOB_STATUS,
+                    launch_report.task_records
                 )
+                launch_report.timings['record'] = time.perf_counter() - phase_start
+                if not recorded:
+                    logger.error(f"Job {job_id} and its tasks were not recorded to DDB")
             else:
                 logger.error(f"Tasks belongs to the job do not completely submitted")
         except Exception as e:
@@ -401,7 +448,8 @@ class EnhancedTrainingGUI:
                        task_def_path: str,
                        training_task_ids: List[str],
                        history_file_path: str,
-                       job_id: str) -> List[str]:
+                       job_id: str,
+                       launch_report: Optional[LaunchReport] = None) -> List[str]:
         results = []
         
         for i, node_name in enumerate(node_names):
@@ -414,6 +462,9 @@ class EnhancedTrainingGUI:
         
         if training_task_ids:
             results.append(f"\n  └─ Task IDs: `{training_task_ids}`")
+
+        if launch_report is not None:
+            results.append(f"\n⏱️ Launch timings ({launch_report.launch_mode} start): {launch_report.format_timings()}")
             
         return results
 
@@ -445,6 +496,13 @@ class EnhancedTrainingGUI:
             logger.error(f"Error launching health check: {str(e)}", exc_info=True)
             return f"⚠️ Error: {str(e)}", []
 
+    def refresh_health_check_history(self) -> List[List[str]]:
+        try:
+            return self.health_manager.get_health_check_history()
+        except Exception as e:
+            logger.error(f"Error refreshing health check history: {str(e)}", exc_info=True)
+            return []
+
     def refresh_job_status(self) -> List[List[str]]:
         try:
             return JobManager.get_jobs_data()
@@ -469,19 +527,39 @@ class EnhancedTrainingGUI:
             logger.error(f"Error releasing nodes: {str(e)}", exc_info=True)
             return [["Error", "", "", f"Error: {str(e)}"]]
 
-    def view_task_logs(self, task_id: str, log_group: str, container_name: str) -> Tuple[str, str]:
+    def view_task_logs(self, task_id: str, log_group: str, container_name: str) -> Iterator[Tuple[str, str]]:
         try:
             if not task_id:
-                return "", "No task ID provided"
-            
-            logs = self.cloudwatch_manager.get_task_logs(task_id, log_group, container_name)
+                yield "", "No task ID provided"
+                return
             
-            escaped_logs = logs.replace('`', '\\`')
-            return task_id, f"```\n{escaped_logs}\n```"
+            for logs in self.cloudwatch_manager.stream_task_logs(task_id, log_group, container_name):
+                escaped_logs = logs.replace('`', '\\`')
+                yield task_id, f"```\n{escaped_logs}\n```"
 
         except Exception as e:
             logger.error(f"Error viewing task logs: {str(e)}", exc_info=True)
-            return "", f"Error fetching logs: {str(e)}"
+            yield "", f"Error fetching logs: {str(e)}"
+
+    def view_job_logs(self, job_id: str, log_group: str, container_name: str, filter_pattern: str) -> str:
+        try:
+            if not job_id or not job_id.strip():
+                return "No job ID provided"
+
+            task_ids = list(JobManager.get_job_associated_tasks_from_ddb(job_id.strip()).keys())
+            events = self.cloudwatch_manager.get_job_logs(
+                task_ids, log_group, container_name,
+                filter_pattern=filter_pattern.strip() if filter_pattern else None
+            )
+            if not events:
+                return f"No matching log messages found for the {len(task_ids)} tasks of job {job_id}."
+
+            escaped_logs = "\n".join(event.format() for event in events).replace('`', '\\`')
+            return f"```\n{escaped_logs}\n```"
+
+        except Exception as e:
+            logger.error(f"Error viewing job logs: {str(e)}", exc_info=True)
+            return f"Error fetching job logs: {str(e)}"
 
     def _get_env_var(self, var_name: str, default: str = "") -> str:
         return os.environ.get(var_name, default)
@@ -614,7 +692,10 @@ class EnhancedTrainingGUI:
 class UIBuilder:
     def __init__(self, gui):
         self.gui = gui
-        self.task_manager = TaskManager()
+
+    @property
+    def task_manager(self) -> TaskManager:
+        return Services.task_manager()
 
     def build_training_tab(self):
         with gr.Column():
@@ -796,7 +877,9 @@ class UIBuilder:
         }
 
     def _get_initial_node_table(self):
+        started_at = time.perf_counter()
         data = self.gui.refresh_node_status()
+        StartupProfile.record('render node table', time.perf_counter() - started_at)
         return self.gui._create_node_table(data)
 
     def _connect_training_tab_events(self, 
@@ -878,17 +961,27 @@ class UIBuilder:
         
         health_output = gr.Markdown()
         health_check_history = gr.Dataframe(
-            headers=["Node ID", "Timestamp", "Status"],
+            headers=["Node ID", "Timestamp", "Status", "FSx", "TCP", "Ping", "DCGM", "NCCL", "Task ID", "Reason"],
             label="Health Check History",
             value=[]
         )
 
+        with gr.Row():
+            with gr.Column(scale=3):
+                pass
+            with gr.Column(scale=1):
+                history_refresh_btn = gr.Button("🔄 Refresh History", variant="secondary")
+
         # Connect event handler
         check_btn.click(
             fn=self.gui.launch_health_check,
             inputs=[master_node_name, other_nodes_names],
             outputs=[health_output, health_check_history]
         )
+        history_refresh_btn.click(
+            fn=self.gui.refresh_health_check_history,
+            outputs=[health_check_history]
+        )
 
         return {
             "health_output": health_output,
@@ -938,16 +1031,15 @@ class UIBuilder:
                     interactive=True,
                     type="text"
                 )
-            with gr.Column(scale=2):
-                pass
-            with gr.Column(scale=2):
-                pass
+            with gr.Column(scale=4):
+                stop_report = gr.Markdown()
             with gr.Column(scale=1):
                 stop_job_btn = gr.Button("🛑 STOP JOB", variant="stop", size="lg")
         
         return {
             "job_id_input": job_id_input,
-            "stop_job_btn": stop_job_btn
+            "stop_job_btn": stop_job_btn,
+            "stop_report": stop_report
         }
 
 
@@ -1001,6 +1093,26 @@ class UIBuilder:
                     
                     with gr.Column(scale=1):
                         log_refresh_btn = gr.Button("📋 Fetch Logs", variant="primary", size="lg")
+
+                with gr.Row(equal_height=True, variant="compact"):
+                    with gr.Column(scale=2):
+                        log_job_id_input = gr.Textbox(
+                            label="Job ID",
+                            placeholder="All ranks of this job, merged by time",
+                            interactive=True,
+                            type="text"
+                        )
+
+                    with gr.Column(scale=4):
+                        log_filter_input = gr.Textbox(
+                            label="Filter Pattern",
+                            placeholder='CloudWatch filter pattern, e.g. "NCCL WARN" or Traceback',
+                            interactive=True,
+                            type="text"
+                        )
+
+                    with gr.Column(scale=1):
+                        job_log_refresh_btn = gr.Button("📚 Fetch Job Logs", variant="primary", size="lg")
                 
                 with gr.Row():
                     log_output = gr.Markdown(elem_classes="log-viewer")
@@ -1043,11 +1155,16 @@ class UIBuilder:
             "container_name_input": container_name_input,
             "task_id_input": task_id_input,
             "log_refresh_btn": log_refresh_btn,
+            "log_job_id_input": log_job_id_input,
+            "log_filter_input": log_filter_input,
+            "job_log_refresh_btn": job_log_refresh_btn,
             "log_output": log_output
         }
 
     def _get_initial_job_table(self):
+        started_at = time.perf_counter()
         jobs_data = self.gui.refresh_job_status()
+        StartupProfile.record('render job table', time.perf_counter() - started_at)
         return self.gui._create_job_table(jobs_data)
 
     def _connect_job_status_tab_events(self, 
@@ -1065,7 +1182,7 @@ class UIBuilder:
         job_control["stop_job_btn"].click(
             fn=self._stop_job_and_refresh,
             inputs=[job_control["job_id_input"]],
-            outputs=[job_control["job_id_input"], job_status]
+            outputs=[job_control["job_id_input"], job_status, job_control["stop_report"]]
         )
 
         # Log refresh button click event
@@ -1079,25 +1196,40 @@ class UIBuilder:
             outputs=[log_viewer["task_id_input"], log_viewer["log_output"]]
         )
 
+        log_viewer["job_log_refresh_btn"].click(
+            fn=self.gui.view_job_logs,
+            inputs=[
+                log_viewer["log_job_id_input"],
+                log_viewer["log_group_input"],
+                log_viewer["container_name_input"],
+                log_viewer["log_filter_input"]
+            ],
+            outputs=[log_viewer["log_output"]]
+        )
+
     def _refresh_job_table(self):
         jobs_data = self.gui.refresh_job_status()
         return self.gui._create_job_table(jobs_data)
 
     def _stop_job_and_refresh(self, job_id: str):
         if not job_id or not job_id.strip():
-            return "", self._refresh_job_table()
+            return "", self._refresh_job_table(), ""
         
         try:
-            success = JobManager.stop_job(job_id.strip())
-            if success:
-                return "", self._refresh_job_table()
-            return job_id, self._refresh_job_table()
+            report = JobManager.stop_job(job_id.strip())
+            ## freed nodes may let a queued job start
+            GangScheduler.wake()
+            self.gui._replenish_warm_pool()
+            summary = f"⏱️ {report.format_summary()}"
+            if report.success:
+                return "", self._refresh_job_table(), summary
+            return job_id, self._refresh_job_table(), f"⚠️ {summary}"
         except Exception as e:
             logger.error(f"Error stopping job: {str(e)}", exc_info=True)
-            return job_id, self._refresh_job_table()
+            return job_id, self._refresh_job_table(), f"❌ Error stopping job: {str(e)}"
 
     def _fetch_logs(self, task_id: str, log_group: str, container_name: str):
-        return self.gui.view_task_logs(task_id, log_group, container_name)
+        yield from self.gui.view_task_logs(task_id, log_group, container_name)
 
 
 def create_interface():
@@ -1105,6 +1237,8 @@ def create_interface():
     ui_builder = UIBuilder(gui)
 
     def update_welcome_message(request: gr.Request):
+        if CONSOLE_PROFILE_STARTUP:
+            print(StartupProfile.report())
         return f"""
             # 🚀 {APP_TITLE}
             ### Distributed Training Management Interface
@@ -1135,6 +1269,7 @@ def create_interface():
         )
 
         interface.load(update_welcome_message, None, titlemd)
+        interface.load(gui.start_background_services, None, None)
 
 
         # interface.load(get_login_user, None, titlemd)
@@ -1166,7 +1301,11 @@ def create_interface():
 
 if __name__ == "__main__":
     # Create and launch the interface
+    build_started_at = time.perf_counter()
     interface = create_interface()
+    StartupProfile.record('build interface', time.perf_counter() - build_started_at)
+    if CONSOLE_PROFILE_STARTUP:
+        print(StartupProfile.report())
     
     # Get port from environment variable or use default
     port = int(os.environ.get('GRADIO_SERVER_PORT', DEFAULT_PORT))
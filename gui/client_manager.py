@@ -0,0 +1,46 @@
+import os
+import threading
+from typing import Any, Dict
+
+import boto3
+from botocore.config import Config
+
+
+def _build_client_config() -> Config:
+    # AWS_RETRY_MODE / AWS_MAX_ATTEMPTS follow the standard botocore env names
+    return Config(
+        max_pool_connections=int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', 50)),
+        connect_timeout=float(os.environ.get('AWS_CONNECT_TIMEOUT', 5)),
+        read_timeout=float(os.environ.get('AWS_READ_TIMEOUT', 30)),
+        retries={
+            'mode': os.environ.get('AWS_RETRY_MODE', 'adaptive'),
+            'max_attempts': int(os.environ.get('AWS_MAX_ATTEMPTS', 10)),
+        }
+    )
+
+
+class ClientManager:
+    """
+    Process wide cache of boto3 clients, one per service.
+
+    boto3 clients are thread-safe, so one client and its connection pool are
+    shared by all managers, Gradio sessions and worker threads instead of
+    forking the aws CLI per call. Resources are not thread-safe and a
+    per-thread cache rebuilds one on every short-lived thread, so DynamoDB
+    items go through the client too, see DynamoDBHandler.
+    """
+    _clients: Dict[str, Any] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_client(service_name: str):
+        client = ClientManager._clients.get(service_name)
+        if client is not None:
+            return client
+
+        with ClientManager._lock:
+            client = ClientManager._clients.get(service_name)
+            if client is None:
+                client = boto3.session.Session().client(service_name, config=_build_client_config())
+                ClientManager._clients[service_name] = client
+        return client
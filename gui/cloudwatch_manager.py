@@ -1,72 +1,313 @@
-import subprocess
-import json, os
-from typing import Optional
+import os
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from client_manager import ClientManager
+from log_cache import LogCache
+from task_manager import TaskManager
+
+
+# Lines kept per stream for the viewer, older lines are dropped from the display
+LOG_TAIL_MAX_LINES = int(os.environ.get('LOG_TAIL_MAX_LINES', 5000))
+# Streams whose cursor is kept, least recently viewed ones are forgotten
+LOG_CURSOR_MAX_STREAMS = int(os.environ.get('LOG_CURSOR_MAX_STREAMS', 64))
+# How long a viewer keeps following a stream after a fetch, and how often it polls
+LOG_FOLLOW_SECONDS = float(os.environ.get('LOG_FOLLOW_SECONDS', 60))
+LOG_FOLLOW_INTERVAL = float(os.environ.get('LOG_FOLLOW_INTERVAL', 2))
+# Job level view: concurrent filter-log-events calls, streams per call and total events returned
+LOG_FETCH_WORKERS = int(os.environ.get('LOG_FETCH_WORKERS', 8))
+LOG_STREAMS_PER_FILTER = 4
+LOG_JOB_MAX_EVENTS = int(os.environ.get('LOG_JOB_MAX_EVENTS', 10000))
+# A stopped task's stream is cached once it has been stopped this long, giving the log driver time to flush
+LOG_CACHE_SETTLE_SECONDS = float(os.environ.get('LOG_CACHE_SETTLE_SECONDS', 30))
+
+
+@dataclass
+class RankLogEvent:
+    timestamp: int
+    rank: int
+    task_id: str
+    message: str
+
+    def format(self) -> str:
+        event_time = datetime.fromtimestamp(self.timestamp / 1000).strftime('%H:%M:%S.%f')[:-3]
+        return f"[rank {self.rank} {event_time}] {self.message}"
+
+
+@dataclass
+class LogCursor:
+    # nextForwardToken of the last page read, None before the first read
+    next_token: Optional[str] = None
+    lines: Deque[str] = field(default_factory=lambda: deque(maxlen=LOG_TAIL_MAX_LINES))
+    # lines read so far, more than len(lines) once the tail dropped older ones
+    total_lines: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
 
 class CloudWatchManager:
 
+    def __init__(self):
+        self._cursors: "OrderedDict[Tuple[str, str], LogCursor]" = OrderedDict()
+        self._cursors_lock = threading.Lock()
+        self.log_cache = LogCache()
+
+    @staticmethod
+    def get_log_stream_name(task_id: str, container_name: str) -> str:
+        return f"ecs/{container_name.strip()}/{task_id.strip()}"
+
+    def _get_cursor(self, log_group: str, log_stream_name: str) -> LogCursor:
+        key = (log_group, log_stream_name)
+        with self._cursors_lock:
+            cursor = self._cursors.get(key)
+            if cursor is None:
+                cursor = self._cursors[key] = LogCursor()
+            self._cursors.move_to_end(key)
+            while len(self._cursors) > LOG_CURSOR_MAX_STREAMS:
+                self._cursors.popitem(last=False)
+        return cursor
+
+    def fetch_new_events(self, log_group: str, log_stream_name: str) -> List[str]:
+        """
+        Read the events appended to a stream since the last call, following
+        nextForwardToken until the end of the stream.
+
+        Args:
+            log_group: CloudWatch log group
+            log_stream_name: Log stream within the group
+
+        Returns:
+            List[str]: messages of the new events, oldest first
+        """
+        logs_client = ClientManager.get_client('logs')
+        cursor = self._get_cursor(log_group, log_stream_name)
+
+        new_lines = []
+        with cursor.lock:
+            while True:
+                kwargs = {
+                    'logGroupName': log_group,
+                    'logStreamName': log_stream_name,
+                    'startFromHead': True
+                }
+                if cursor.next_token is not None:
+                    kwargs['nextToken'] = cursor.next_token
+
+                response = logs_client.get_log_events(**kwargs)
+                new_lines.extend(event['message'].rstrip('\n') for event in response.get('events', []))
+
+                # The end of the stream is reached when the same token comes back
+                next_token = response.get('nextForwardToken')
+                reached_end = next_token is None or next_token == cursor.next_token
+                cursor.next_token = next_token or cursor.next_token
+                if reached_end:
+                    break
+
+            cursor.lines.extend(new_lines)
+            cursor.total_lines += len(new_lines)
+
+        return new_lines
+
+    @staticmethod
+    def _read_full_stream(log_group: str, log_stream_name: str) -> List[str]:
+        """Every message of a stream from its head, without touching the viewer's cursor."""
+        logs_client = ClientManager.get_client('logs')
+        lines = []
+        next_token = None
+        while True:
+            kwargs = {'logGroupName': log_group, 'logStreamName': log_stream_name, 'startFromHead': True}
+            if next_token is not None:
+                kwargs['nextToken'] = next_token
+            response = logs_client.get_log_events(**kwargs)
+            lines.extend(event['message'].rstrip('\n') for event in response.get('events', []))
+            if response.get('nextForwardToken') in (None, next_token):
+                return lines
+            next_token = response['nextForwardToken']
+
+    @staticmethod
+    def _tail(content: str) -> str:
+        lines = content.split('\n')
+        return content if len(lines) <= LOG_TAIL_MAX_LINES else '\n'.join(lines[-LOG_TAIL_MAX_LINES:])
+
+    @staticmethod
+    def _is_task_finished(task_id: str) -> bool:
+        task_status = TaskManager.get_tasks_status([task_id])[task_id]
+        if task_status['stop_status'] == 'NO_TASK':
+            ## ECS forgets a task about an hour after it stopped, its stream is long complete
+            return True
+        stopped_at = task_status['stopped_at']
+        return (task_status['last_status'] == 'STOPPED' and stopped_at is not None
+                and (datetime.now(timezone.utc) - stopped_at).total_seconds() >= LOG_CACHE_SETTLE_SECONDS)
+
+    def _read_task_logs(self, task_id: str, log_group: str, log_stream_name: str) -> Tuple[str, bool]:
+        """
+        Returns:
+            Tuple[str, bool]: the log text and whether the stream is final
+        """
+        task_id = task_id.strip()
+        cached = self.log_cache.get(log_group, log_stream_name, task_id)
+        if cached is not None:
+            print(f"Serving logs of finished task {task_id} from local cache")
+            return self._tail(cached), True
+
+        try:
+            finished = self._is_task_finished(task_id)
+        except Exception as e:
+            print(f"Could not check whether task {task_id} finished: {e}")
+            finished = False
+
+        # Checked before the fetch, so a finished task's fetch reads its stream to the end
+        self.fetch_new_events(log_group, log_stream_name)
+        cursor = self._get_cursor(log_group, log_stream_name)
+        content = "\n".join(cursor.lines)
+
+        if finished and cursor.lines:
+            try:
+                ## the tail dropped older lines, cache the whole stream rather than what the viewer keeps
+                full_content = content if cursor.total_lines == len(cursor.lines) else \
+                    "\n".join(self._read_full_stream(log_group, log_stream_name))
+                self.log_cache.put(log_group, log_stream_name, task_id, full_content)
+            except OSError as e:
+                print(f"Could not cache logs of task {task_id}: {e}")
+
+        return content, finished
+
     def get_task_logs(self, task_id: str, log_group_input: str, container_name_input: str) -> str:
-        """Fetch logs for a specific task from CloudWatch."""
+        """Fetch logs for a specific task, from the local cache once the task finished, else from CloudWatch."""
+        return self._get_task_logs(task_id, log_group_input, container_name_input)[0]
+
+    def _get_task_logs(self, task_id: str, log_group_input: str, container_name_input: str) -> Tuple[str, bool]:
         try:
-            # Construct the log stream name
-            log_stream_name = f"ecs/{container_name_input.strip()}/{task_id.strip()}"
+            log_stream_name = self.get_log_stream_name(task_id, container_name_input)
             print(f"Fetching logs from stream: {log_stream_name}")  # Debug log
-            
-            # Execute aws command directly without shell
-            cmd = [
-                "aws", "logs", "get-log-events",
-                "--log-group-name", log_group_input,
-                "--log-stream-name", log_stream_name,
-                "--output", "text"
-            ]
-            print(f"Executing command: {' '.join(cmd)}")  # Debug log
-            
-            # Use Popen to have more control over execution
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
-            
-            # Get output with timeout
-            try:
-                stdout, stderr = process.communicate(timeout=100)
-                if process.returncode != 0:
-                    # if "aws: command not found" in stderr:
-                    #     return "AWS CLI not found. Please ensure it is installed and in your PATH."
-                    # if "Unable to locate credentials" in stderr:
-                    #     return "AWS credentials not found. Please configure AWS CLI."
-                    # if "ResourceNotFoundException" in stderr:
-                    #     return "No logs found for this task. The log stream may not exist yet."
-                    # return f"Error fetching logs: {stderr}"
-                    return f"ERROR - {stderr}"
-                
-                if not stdout.strip():
-                    return "No logs found for this task."
-                
-                # Parse the tab-separated output from aws logs get-log-events
-                # Format: EVENTS  timestamp   message
-                formatted_logs = []
-                for line in stdout.splitlines():
-                    parts = line.split('\t')
-                    if len(parts) >= 3 and parts[0] == 'EVENTS':
-                        # Extract just the message part
-                        message = parts[2].strip()
-                        formatted_logs.append(message)
-                
-                if not formatted_logs:
-                    return "No log messages found for this task."
-                
-                return "\n".join(formatted_logs)
-            except subprocess.TimeoutExpired:
-                process.kill()
-                return "Command timed out while fetching logs"
-            
-        except subprocess.CalledProcessError as e:
-            error_msg = f"Error fetching logs: {str(e)}\nError output: {e.stderr}"
-            print(error_msg)  # Debug log
-            return error_msg
+
+            content, finished = self._read_task_logs(task_id, log_group_input, log_stream_name)
+            if not content:
+                return "No log messages found for this task.", finished
+
+            return content, finished
+
+        except ClientManager.get_client('logs').exceptions.ResourceNotFoundException:
+            return "No logs found for this task. The log stream may not exist yet.", False
         except Exception as e:
             error_msg = f"Unexpected error: {str(e)}"
             print(error_msg)  # Debug log
-            return error_msg
+            return error_msg, False
+
+    def stream_task_logs(self,
+                         task_id: str,
+                         log_group_input: str,
+                         container_name_input: str,
+                         follow_seconds: float = LOG_FOLLOW_SECONDS,
+                         poll_interval: float = LOG_FOLLOW_INTERVAL) -> Iterator[str]:
+        """
+        Generator for the log viewer: yields the current tail at once, then a
+        refreshed tail whenever new events arrive, for up to `follow_seconds`.
+        Finished tasks are not followed.
+        """
+        log_stream_name = self.get_log_stream_name(task_id, container_name_input)
+        ## the cursor is shared between viewers, track what this one has shown, another
+        ## viewer's fetch may have consumed the new events before ours ran. Read before the
+        ## first fetch, so lines landing in between cost a redundant refresh, never a missed one
+        shown_lines = self._get_cursor(log_group_input, log_stream_name).total_lines
+        logs, finished = self._get_task_logs(task_id, log_group_input, container_name_input)
+        yield logs
+        if finished:
+            return
+
+        deadline = time.monotonic() + follow_seconds
+        while time.monotonic() + poll_interval <= deadline:
+            time.sleep(poll_interval)
+            try:
+                self.fetch_new_events(log_group_input, log_stream_name)
+            except Exception as e:
+                print(f"Stopped following {log_stream_name}: {e}")
+                return
+            cursor = self._get_cursor(log_group_input, log_stream_name)
+            with cursor.lock:
+                total_lines = cursor.total_lines
+                content = "\n".join(cursor.lines)
+            if total_lines > shown_lines:
+                shown_lines = total_lines
+                yield content
+
+    @staticmethod
+    def _filter_streams(log_group: str,
+                        stream_ranks: Dict[str, Tuple[int, str]],
+                        filter_pattern: Optional[str],
+                        start_time: Optional[int],
+                        max_events: int) -> List[RankLogEvent]:
+        logs_client = ClientManager.get_client('logs')
+        kwargs = {
+            'logGroupName': log_group,
+            'logStreamNames': list(stream_ranks.keys())
+        }
+        if filter_pattern:
+            kwargs['filterPattern'] = filter_pattern
+        if start_time is not None:
+            kwargs['startTime'] = start_time
+
+        events = []
+        while len(events) < max_events:
+            response = logs_client.filter_log_events(**kwargs)
+            for event in response.get('events', []):
+                rank, task_id = stream_ranks[event['logStreamName']]
+                events.append(RankLogEvent(event['timestamp'], rank, task_id, event['message'].rstrip('\n')))
+
+            if not response.get('nextToken'):
+                break
+            kwargs['nextToken'] = response['nextToken']
+
+        return events[:max_events]
+
+    def get_job_logs(self,
+                     task_ids: List[str],
+                     log_group_input: str,
+                     container_name_input: str,
+                     filter_pattern: Optional[str] = None,
+                     start_time: Optional[int] = None,
+                     max_events: int = LOG_JOB_MAX_EVENTS) -> List[RankLogEvent]:
+        """
+        Fetch the logs of every rank of a job and merge them by timestamp.
+
+        Streams are split across concurrent filter-log-events calls, each
+        covering LOG_STREAMS_PER_FILTER streams. The filter pattern is applied
+        by CloudWatch, so only matching lines are downloaded.
+
+        Args:
+            task_ids: ECS task IDs of the job in rank order
+            log_group_input: CloudWatch log group
+            container_name_input: Container whose streams are read
+            filter_pattern: CloudWatch filter pattern, e.g. '"NCCL WARN"' or 'Traceback'
+            start_time: Only events after this epoch time in milliseconds
+            max_events: Cap on the events fetched per call
+
+        Returns:
+            List[RankLogEvent]: earliest events of all ranks ordered by timestamp, then rank
+        """
+        stream_ranks = {
+            self.get_log_stream_name(task_id, container_name_input): (rank, task_id.strip())
+            for rank, task_id in enumerate(task_ids)
+        }
+        stream_names = list(stream_ranks.keys())
+        stream_groups = [
+            {name: stream_ranks[name] for name in stream_names[i:i + LOG_STREAMS_PER_FILTER]}
+            for i in range(0, len(stream_names), LOG_STREAMS_PER_FILTER)
+        ]
+        if not stream_groups:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(LOG_FETCH_WORKERS, len(stream_groups))) as executor:
+            group_events = list(executor.map(
+                lambda group: self._filter_streams(log_group_input, group, filter_pattern, start_time, max_events),
+                stream_groups
+            ))
+
+        events = [event for events in group_events for event in events]
+        events.sort(key=lambda event: (event.timestamp, event.rank))
+        return events[:max_events]
+
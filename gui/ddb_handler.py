@@ -1,6 +1,41 @@
-import boto3
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
 from botocore.exceptions import ClientError
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+from client_manager import ClientManager
+
+
+# DynamoDB API limits
+BATCH_WRITE_MAX_ITEMS = 25
+BATCH_GET_MAX_KEYS = 100
+TRANSACT_MAX_ITEMS = 100
+BATCH_MAX_RETRIES = int(os.environ.get('DDB_BATCH_MAX_RETRIES', 8))
+
+
+def _backoff(attempt: int, base: float = 0.05, cap: float = 5.0) -> None:
+    # full jitter exponential backoff between retries of unprocessed batch items
+    time.sleep(random.uniform(0, min(cap, base * (2 ** attempt))))
+
+
+## Every call goes through the shared low-level client: callers include short-lived threads (batch
+## and scan workers, claim heartbeats, callbacks), a per-thread resource would load its model on each
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def _to_ddb(values: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: _serializer.serialize(value) for key, value in values.items()}
+
+
+def _from_ddb(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: _deserializer.deserialize(value) for key, value in item.items()}
 
 
 class DynamoDBHandler:
@@ -9,17 +44,44 @@ class DynamoDBHandler:
     """
     
     @staticmethod
-    def create_table_if_not_exists(table_name: str, primary_key: str) -> bool:
+    def create_table_if_not_exists(table_name: str, primary_key: str,
+                                   global_secondary_indexes: Optional[List[Dict[str, Any]]] = None,
+                                   ttl_attribute: Optional[str] = None) -> bool:
         """
         Creates a DynamoDB table if it doesn't already exist.
         
         Args:
             table_name: Name of the table to create
+            primary_key: Name of the string partition key
+            global_secondary_indexes: Optional list of
+                {'index_name': str, 'partition_key': (name, type), 'sort_key': (name, type)}
+            ttl_attribute: Optional epoch seconds attribute DynamoDB expires items by
             
         Returns:
             bool: True if table exists or was created successfully, False otherwise
         """
-        dynamodb = boto3.client('dynamodb')
+        dynamodb = ClientManager.get_client('dynamodb')
+
+        attribute_types = {primary_key: 'S'}
+        create_kwargs = {}
+        if global_secondary_indexes:
+            create_kwargs['GlobalSecondaryIndexes'] = []
+            for index in global_secondary_indexes:
+                key_schema = [{'AttributeName': index['partition_key'][0], 'KeyType': 'HASH'}]
+                attribute_types[index['partition_key'][0]] = index['partition_key'][1]
+                if index.get('sort_key'):
+                    key_schema.append({'AttributeName': index['sort_key'][0], 'KeyType': 'RANGE'})
+                    attribute_types[index['sort_key'][0]] = index['sort_key'][1]
+
+                create_kwargs['GlobalSecondaryIndexes'].append({
+                    'IndexName': index['index_name'],
+                    'KeySchema': key_schema,
+                    'Projection': {'ProjectionType': 'ALL'},
+                    'ProvisionedThroughput': {
+                        'ReadCapacityUnits': 5,
+                        'WriteCapacityUnits': 5
+                    }
+                })
         
         try:
             response = dynamodb.create_table(
@@ -32,27 +94,84 @@ class DynamoDBHandler:
                 ],
                 AttributeDefinitions=[
                     {
-                        'AttributeName': primary_key,
-                        'AttributeType': 'S'
+                        'AttributeName': attr_name,
+                        'AttributeType': attr_type
                     }
+                    for attr_name, attr_type in attribute_types.items()
                 ],
                 ProvisionedThroughput={
                     'ReadCapacityUnits': 5,
                     'WriteCapacityUnits': 5
-                }
+                },
+                **create_kwargs
             )
             print(f"Creating table {table_name}...")
+            if ttl_attribute:
+                dynamodb.get_waiter('table_exists').wait(TableName=table_name)
+                DynamoDBHandler._enable_ttl(table_name, ttl_attribute)
             return True
             
         except ClientError as e:
             if e.response['Error']['Code'] == 'ResourceInUseException':
                 print(f"Table {table_name} already exists")
+                if ttl_attribute:
+                    DynamoDBHandler._enable_ttl(table_name, ttl_attribute)
+                if global_secondary_indexes:
+                    return DynamoDBHandler._add_missing_indexes(table_name, create_kwargs['GlobalSecondaryIndexes'],
+                                                                attribute_types)
                 return True
             else:
                 print(f"Error creating table: {e}")
                 return False
+
+    @staticmethod
+    def _enable_ttl(table_name: str, ttl_attribute: str) -> None:
+        dynamodb = ClientManager.get_client('dynamodb')
+        try:
+            status = dynamodb.describe_time_to_live(TableName=table_name)['TimeToLiveDescription']
+            if status.get('TimeToLiveStatus') in ('ENABLED', 'ENABLING'):
+                return
+            dynamodb.update_time_to_live(
+                TableName=table_name,
+                TimeToLiveSpecification={'Enabled': True, 'AttributeName': ttl_attribute}
+            )
+        except ClientError as e:
+            print(f"Could not enable TTL on {table_name}: {e}")
     
 
+    @staticmethod
+    def _add_missing_indexes(table_name: str, index_specs: List[Dict[str, Any]],
+                             attribute_types: Dict[str, str]) -> bool:
+        """Adds secondary indexes missing from an existing table (one per update_table call)."""
+        dynamodb = ClientManager.get_client('dynamodb')
+
+        try:
+            table_desc = dynamodb.describe_table(TableName=table_name)['Table']
+            existing = {index['IndexName'] for index in table_desc.get('GlobalSecondaryIndexes', [])}
+            on_demand = table_desc.get('BillingModeSummary', {}).get('BillingMode') == 'PAY_PER_REQUEST'
+
+            for index_spec in index_specs:
+                if index_spec['IndexName'] in existing:
+                    continue
+                index_spec = dict(index_spec)
+                if on_demand:
+                    index_spec.pop('ProvisionedThroughput')
+                dynamodb.update_table(
+                    TableName=table_name,
+                    AttributeDefinitions=[
+                        {'AttributeName': key['AttributeName'], 'AttributeType': attribute_types[key['AttributeName']]}
+                        for key in index_spec['KeySchema']
+                    ],
+                    GlobalSecondaryIndexUpdates=[{'Create': index_spec}]
+                )
+                print(f"Creating index {index_spec['IndexName']} on table {table_name}...")
+                # DynamoDB allows only one index creation in flight per table
+                break
+            return True
+        except ClientError as e:
+            print(f"Error adding index to table: {e}")
+            return False
+
     @staticmethod
     def write_item(table_name: str, item: Dict[str, Any]) -> bool:
         """
@@ -65,11 +184,10 @@ class DynamoDBHandler:
         Returns:
             bool: True if write was successful, False otherwise
         """
-        dynamodb = boto3.resource('dynamodb')
-        table = dynamodb.Table(table_name)
+        dynamodb = ClientManager.get_client('dynamodb')
         
         try:
-            response = table.put_item(Item=item)
+            response = dynamodb.put_item(TableName=table_name, Item=_to_ddb(item))
             return True
         except ClientError as e:
             print(f"Error writing to table: {e}")
@@ -87,12 +205,11 @@ class DynamoDBHandler:
         Returns:
             Optional[Dict]: The item if found, None otherwise
         """
-        dynamodb = boto3.resource('dynamodb')
-        table = dynamodb.Table(table_name)
+        dynamodb = ClientManager.get_client('dynamodb')
         
         try:
-            response = table.get_item(Key=key)
-            return response.get('Item')
+            response = dynamodb.get_item(TableName=table_name, Key=_to_ddb(key))
+            return _from_ddb(response['Item']) if 'Item' in response else None
         except ClientError as e:
             print(f"Error retrieving item: {e}")
             return None
@@ -109,24 +226,23 @@ class DynamoDBHandler:
         Returns:
             bool: True if deletion was successful, False otherwise
         """
-        dynamodb = boto3.resource('dynamodb')
-        table = dynamodb.Table(table_name)
+        dynamodb = ClientManager.get_client('dynamodb')
         
         try:
-            response = table.delete_item(Key=key)
+            response = dynamodb.delete_item(TableName=table_name, Key=_to_ddb(key))
             return True
         except ClientError as e:
             print(f"Error deleting item: {e}")
             return False
     
     def item_exist(table_name: str, primary_key: str):
-        dynamodb = boto3.resource('dynamodb')
-        table = dynamodb.Table(table_name)
+        dynamodb = ClientManager.get_client('dynamodb')
         try:
-            response = table.get_item(
-                Key={
+            response = dynamodb.get_item(
+                TableName=table_name,
+                Key=_to_ddb({
                     'partition_key': primary_key,
-                }
+                })
             )
             item_exists = 'Item' in response
         except Exception as e:
@@ -136,7 +252,8 @@ class DynamoDBHandler:
     @staticmethod
     def update_item(table_name: str, key: Dict[str, str], 
                    update_expression: str, 
-                   expression_values: Dict[str, Any]) -> bool:
+                   expression_values: Dict[str, Any],
+                   condition_expression: Optional[str] = None) -> bool:
         """
         Updates an item in the specified DynamoDB table.
         
@@ -145,30 +262,39 @@ class DynamoDBHandler:
             key: Dictionary containing the primary key
             update_expression: Update expression
             expression_values: Expression attribute values
+            condition_expression: Optional condition the item must meet for the update to apply
             
         Returns:
-            bool: True if update was successful, False otherwise
+            bool: True if update was successful, False otherwise (including a failed condition)
         """
-        dynamodb = boto3.resource('dynamodb')
-        table = dynamodb.Table(table_name)
+        dynamodb = ClientManager.get_client('dynamodb')
+
+        update_kwargs = {}
+        if condition_expression:
+            update_kwargs['ConditionExpression'] = condition_expression
         
         try:
-            response = table.update_item(
-                Key=key,
+            response = dynamodb.update_item(
+                TableName=table_name,
+                Key=_to_ddb(key),
                 UpdateExpression=update_expression,
-                ExpressionAttributeValues=expression_values,
-                ReturnValues="UPDATED_NEW"
+                ExpressionAttributeValues=_to_ddb(expression_values),
+                ReturnValues="UPDATED_NEW",
+                **update_kwargs
             )
             return True
         except ClientError as e:
-            print(f"Error updating item: {e}")
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                print(f"Update of {key} skipped, condition not met: {condition_expression}")
+            else:
+                print(f"Error updating item: {e}")
             return False
     
     @staticmethod
     def scan_table(table_name: str, filter_expression: Optional[str] = None,
                   expression_values: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
-        Scans a DynamoDB table, optionally with a filter.
+        Scans a DynamoDB table, optionally with a filter, following pagination.
         
         Args:
             table_name: Name of the table to scan
@@ -177,22 +303,289 @@ class DynamoDBHandler:
             
         Returns:
             List[Dict]: List of items matching the scan
+
+        Raises:
+            ClientError: a page could not be read, see iter_scan
+        """
+        return list(DynamoDBHandler.iter_scan(table_name, filter_expression, expression_values))
+
+    @staticmethod
+    def iter_scan(table_name: str, filter_expression: Optional[str] = None,
+                  expression_values: Optional[Dict[str, Any]] = None,
+                  segment: Optional[int] = None,
+                  total_segments: Optional[int] = None,
+                  page_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Streams the items of a table page by page, following LastEvaluatedKey.
+        
+        Args:
+            table_name: Name of the table to scan
+            filter_expression: Optional filter expression
+            expression_values: Optional expression attribute values
+            segment: Optional segment number for a parallel scan worker
+            total_segments: Total number of parallel scan segments
+            page_size: Optional number of items evaluated per request
+            
+        Yields:
+            Dict: Items matching the scan
+
+        Raises:
+            ClientError: a page could not be read; raised rather than ending the
+                iteration, so a failed scan is never mistaken for a complete one
         """
-        dynamodb = boto3.resource('dynamodb')
-        table = dynamodb.Table(table_name)
+        dynamodb = ClientManager.get_client('dynamodb')
+
+        scan_kwargs = {'TableName': table_name}
+        if filter_expression and expression_values:
+            scan_kwargs['FilterExpression'] = filter_expression
+            scan_kwargs['ExpressionAttributeValues'] = _to_ddb(expression_values)
+        if total_segments:
+            scan_kwargs['Segment'] = segment
+            scan_kwargs['TotalSegments'] = total_segments
+        if page_size:
+            scan_kwargs['Limit'] = page_size
         
         try:
-            if filter_expression and expression_values:
-                response = table.scan(
-                    FilterExpression=filter_expression,
-                    ExpressionAttributeValues=expression_values
-                )
+            while True:
+                response = dynamodb.scan(**scan_kwargs)
+                yield from (_from_ddb(item) for item in response.get('Items', []))
+                if 'LastEvaluatedKey' not in response:
+                    return
+                scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except ClientError as e:
+            print(f"Error scanning table {table_name}: {e}")
+            raise
+
+    @staticmethod
+    def parallel_scan(table_name: str, total_segments: int = 4,
+                      filter_expression: Optional[str] = None,
+                      expression_values: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Streams a whole table with `total_segments` concurrent Segment scans,
+        meant for offline analytics over large tables such as the task table.
+        Items are yielded as pages arrive, in no particular order. A segment
+        that fails, with a ClientError or anything else such as a dropped
+        connection, raises its error once the other segments finished.
+        """
+        item_queue = queue.Queue(maxsize=total_segments * 100)
+        stopped = threading.Event()
+        done = object()
+        errors = []
+
+        def put_item(item):
+            # give up when the consumer stopped iterating early
+            while not stopped.is_set():
+                try:
+                    item_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def scan_segment(segment):
+            try:
+                for item in DynamoDBHandler.iter_scan(table_name, filter_expression, expression_values,
+                                                      segment=segment, total_segments=total_segments):
+                    if not put_item(item):
+                        return
+            except Exception as e:
+                # any error ends the segment, the consumer re-raises it instead of missing its items
+                errors.append(e)
+            finally:
+                put_item(done)
+
+        with ThreadPoolExecutor(max_workers=total_segments) as pool:
+            for segment in range(total_segments):
+                pool.submit(scan_segment, segment)
+
+            try:
+                finished_segments = 0
+                while finished_segments < total_segments:
+                    item = item_queue.get()
+                    if item is done:
+                        finished_segments += 1
+                    else:
+                        yield item
+            finally:
+                stopped.set()
+
+        if errors:
+            raise errors[0]
+
+    @staticmethod
+    def batch_get_items(table_name: str, keys: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Retrieves items by key in batch_get_item calls of up to 100 keys,
+        retrying UnprocessedKeys with exponential backoff.
+        
+        Args:
+            table_name: Name of the table to read from
+            keys: List of primary key dictionaries
+            
+        Returns:
+            List[Dict]: The items found, in no particular order
+        """
+        dynamodb = ClientManager.get_client('dynamodb')
+        items = []
+
+        try:
+            for i in range(0, len(keys), BATCH_GET_MAX_KEYS):
+                request_items = {table_name: {'Keys': [_to_ddb(key) for key in keys[i:i + BATCH_GET_MAX_KEYS]]}}
+                for attempt in range(BATCH_MAX_RETRIES + 1):
+                    response = dynamodb.batch_get_item(RequestItems=request_items)
+                    items.extend(_from_ddb(item) for item in response.get('Responses', {}).get(table_name, []))
+                    request_items = response.get('UnprocessedKeys')
+                    if not request_items:
+                        break
+                    _backoff(attempt)
+                else:
+                    print(f"Error reading batch: keys still unprocessed after {BATCH_MAX_RETRIES} retries")
+            return items
+        except ClientError as e:
+            print(f"Error reading batch: {e}")
+            return items
+
+    @staticmethod
+    def batch_write_items(table_name: str, items: Optional[List[Dict[str, Any]]] = None,
+                          delete_keys: Optional[List[Dict[str, Any]]] = None) -> bool:
+        """
+        Puts and deletes items in batch_write_item calls of up to 25 requests,
+        retrying UnprocessedItems with exponential backoff.
+        
+        Args:
+            table_name: Name of the table to write to
+            items: Items to put
+            delete_keys: Primary keys of items to delete
+            
+        Returns:
+            bool: True if every request was processed, False otherwise
+        """
+        dynamodb = ClientManager.get_client('dynamodb')
+        write_requests = [{'PutRequest': {'Item': _to_ddb(item)}} for item in items or []]
+        write_requests += [{'DeleteRequest': {'Key': _to_ddb(key)}} for key in delete_keys or []]
+
+        try:
+            for i in range(0, len(write_requests), BATCH_WRITE_MAX_ITEMS):
+                request_items = {table_name: write_requests[i:i + BATCH_WRITE_MAX_ITEMS]}
+                for attempt in range(BATCH_MAX_RETRIES + 1):
+                    response = dynamodb.batch_write_item(RequestItems=request_items)
+                    request_items = response.get('UnprocessedItems')
+                    if not request_items:
+                        break
+                    _backoff(attempt)
+                else:
+                    print(f"Error writing batch: items still unprocessed after {BATCH_MAX_RETRIES} retries")
+                    return False
+            return True
+        except ClientError as e:
+            print(f"Error writing batch: {e}")
+            return False
+    
+    @staticmethod
+    def transact_put_items(puts: List[Tuple[str, Dict[str, Any]]]) -> bool:
+        """
+        Writes items across tables in a single all-or-nothing transaction.
+        
+        Args:
+            puts: List of (table_name, item) pairs, at most 100
+            
+        Returns:
+            bool: True if the transaction committed, False otherwise
+        """
+        return DynamoDBHandler.transact_write_items([
+            {'Put': {'TableName': table_name, 'Item': item}} for table_name, item in puts
+        ])
+
+    @staticmethod
+    def transact_write_items(transact_items: List[Dict[str, Dict[str, Any]]]) -> bool:
+        """
+        Runs Put, Update, Delete and ConditionCheck actions as one all-or-nothing transaction.
+        
+        Args:
+            transact_items: TransactItems as for the client API, with plain Python values
+                in Item, Key and ExpressionAttributeValues, at most 100
+            
+        Returns:
+            bool: True if the transaction committed, False if a condition failed or on error
+        """
+        dynamodb = ClientManager.get_client('dynamodb')
+
+        serialized_items = []
+        for transact_item in transact_items:
+            (action, params), = transact_item.items()
+            params = dict(params)
+            for field_name in ('Item', 'Key', 'ExpressionAttributeValues'):
+                if field_name in params:
+                    params[field_name] = _to_ddb(params[field_name])
+            serialized_items.append({action: params})
+
+        try:
+            dynamodb.transact_write_items(TransactItems=serialized_items)
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'TransactionCanceledException':
+                reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons', [])]
+                print(f"Transaction cancelled: {reasons}")
             else:
-                response = table.scan()
-                
-            return response.get('Items', [])
+                print(f"Error writing transaction: {e}")
+            return False
+
+    @staticmethod
+    def query(table_name: str, key_condition: str,
+              expression_values: Dict[str, Any],
+              index_name: Optional[str] = None,
+              expression_names: Optional[Dict[str, str]] = None,
+              limit: Optional[int] = None,
+              scan_index_forward: bool = True) -> List[Dict[str, Any]]:
+        """
+        Queries a DynamoDB table or secondary index, following pagination.
+        
+        Args:
+            table_name: Name of the table to query
+            key_condition: Key condition expression
+            expression_values: Expression attribute values
+            index_name: Optional secondary index to query
+            expression_names: Optional expression attribute names
+            limit: Optional maximum number of items to return
+            scan_index_forward: False to return items in descending sort key order
+            
+        Returns:
+            List[Dict]: List of items matching the key condition
+
+        Raises:
+            RuntimeError: the table or index does not exist, run gui/setup_tables.py
+        """
+        dynamodb = ClientManager.get_client('dynamodb')
+
+        query_kwargs = {
+            'TableName': table_name,
+            'KeyConditionExpression': key_condition,
+            'ExpressionAttributeValues': _to_ddb(expression_values)
+        }
+        if index_name:
+            query_kwargs['IndexName'] = index_name
+        if expression_names:
+            query_kwargs['ExpressionAttributeNames'] = expression_names
+        if not scan_index_forward:
+            query_kwargs['ScanIndexForward'] = False
+        
+        try:
+            items = []
+            while True:
+                if limit is not None:
+                    query_kwargs['Limit'] = limit - len(items)
+                response = dynamodb.query(**query_kwargs)
+                items.extend(_from_ddb(item) for item in response.get('Items', []))
+                if 'LastEvaluatedKey' not in response or (limit is not None and len(items) >= limit):
+                    return items
+                query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
         except ClientError as e:
-            print(f"Error scanning table: {e}")
+            error = e.response['Error']
+            if error['Code'] == 'ResourceNotFoundException' or \
+                    (error['Code'] == 'ValidationException' and 'index' in error.get('Message', '').lower()):
+                raise RuntimeError(f"Cannot query {table_name}{' index ' + index_name if index_name else ''}, "
+                                   f"provision it with gui/setup_tables.py: {error.get('Message')}") from e
+            print(f"Error querying table: {e}")
             return []
     
     @staticmethod
@@ -206,7 +599,7 @@ class DynamoDBHandler:
         Returns:
             bool: True if deletion was successful, False otherwise
         """
-        dynamodb = boto3.client('dynamodb')
+        dynamodb = ClientManager.get_client('dynamodb')
         
         try:
             response = dynamodb.delete_table(TableName=table_name)
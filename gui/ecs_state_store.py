@@ -0,0 +1,150 @@
+import os
+import time
+import threading
+from decimal import Decimal
+from typing import Dict, List, Any, Optional, Tuple
+
+from ddb_handler import DynamoDBHandler
+
+
+# GSI written by ecs-monitor/lambda_function.py: cluster_name (HASH) + seq (RANGE)
+STATE_SEQ_INDEX = 'cluster_name-seq-index'
+# The lambda takes a seq before writing its record, so a record can land after one with a
+# higher seq; every sync re-reads this many seqs below the last one seen to pick it up
+ECS_STATE_REREAD_WINDOW = int(os.environ.get('ECS_STATE_REREAD_WINDOW', 200))
+# Seconds a STOPPED task stays in memory once seen, the lambda expires its record later via TTL
+ECS_STATE_STOPPED_RETENTION = float(os.environ.get('ECS_STATE_STOPPED_RETENTION', 3600))
+
+
+def _record_order(record: Dict[str, Any]) -> Tuple[int, int]:
+    return int(record.get('event_version', 0)), int(record['seq'])
+
+
+class EcsStateStore:
+    """
+    Incremental reader of the task / container instance state records that the
+    ecs-monitor lambda upserts from ECS state change events.
+
+    Every record carries a cluster wide sequence number, so each sync only
+    queries the records changed since the last one seen (minus a re-read
+    window for late writes) instead of polling ECS. Records are applied by
+    event version, so re-reading one never rolls a resource back.
+    Point DynamoDB at a local stand-in with AWS_ENDPOINT_URL_DYNAMODB.
+    """
+    _last_seq = 0
+    # local counter of applied records, the order readers of get_instance_changes follow
+    _applied_version = 0
+    _tasks: Dict[str, Dict[str, Any]] = {}
+    _task_stopped_seen_at: Dict[str, float] = {}
+    _instances: Dict[str, Dict[str, Any]] = {}
+    _instance_versions: Dict[str, int] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return bool(os.environ.get('ECS_STATE_TABLE'))
+
+    @staticmethod
+    def create_table() -> bool:
+        return DynamoDBHandler.create_table_if_not_exists(
+            os.environ['ECS_STATE_TABLE'],
+            'resource_id',
+            global_secondary_indexes=[{
+                'index_name': STATE_SEQ_INDEX,
+                'partition_key': ('cluster_name', 'S'),
+                'sort_key': ('seq', 'N')
+            }],
+            ttl_attribute='expires_at'
+        )
+
+    @staticmethod
+    def sync() -> List[Dict[str, Any]]:
+        """
+        Pull the records changed since the last sync.
+
+        Returns:
+            List[Dict]: newly applied records in sequence order
+        """
+        if not EcsStateStore.is_enabled():
+            return []
+
+        with EcsStateStore._lock:
+            records = DynamoDBHandler.query(
+                os.environ['ECS_STATE_TABLE'],
+                key_condition='cluster_name = :c AND seq > :s',
+                expression_values={
+                    ':c': os.environ.get('CLUSTER_NAME', 'default-cluster'),
+                    ':s': Decimal(max(EcsStateStore._last_seq - ECS_STATE_REREAD_WINDOW, 0))
+                },
+                index_name=STATE_SEQ_INDEX
+            )
+
+            changes = []
+            for record in records:
+                EcsStateStore._last_seq = max(EcsStateStore._last_seq, int(record['seq']))
+                if record.get('resource_type') == 'TASK':
+                    known = EcsStateStore._tasks
+                elif record.get('resource_type') == 'CONTAINER_INSTANCE':
+                    known = EcsStateStore._instances
+                else:
+                    continue
+                current = known.get(record['resource_id'])
+                if current is not None and _record_order(current) >= _record_order(record):
+                    continue
+
+                known[record['resource_id']] = record
+                EcsStateStore._applied_version += 1
+                if known is EcsStateStore._instances:
+                    EcsStateStore._instance_versions[record['resource_id']] = EcsStateStore._applied_version
+                elif record.get('last_status') == 'STOPPED':
+                    EcsStateStore._task_stopped_seen_at.setdefault(record['resource_id'], time.monotonic())
+                changes.append(record)
+
+            EcsStateStore._evict_stopped_tasks()
+
+        return changes
+
+    @staticmethod
+    def _evict_stopped_tasks() -> None:
+        """Forget tasks stopped long ago that are also out of the re-read window, so they cannot come back."""
+        now = time.monotonic()
+        for task_id, seen_at in list(EcsStateStore._task_stopped_seen_at.items()):
+            record = EcsStateStore._tasks.get(task_id)
+            if record is None or record.get('last_status') != 'STOPPED':
+                EcsStateStore._task_stopped_seen_at.pop(task_id)
+            elif now - seen_at > ECS_STATE_STOPPED_RETENTION and \
+                    int(record['seq']) <= EcsStateStore._last_seq - ECS_STATE_REREAD_WINDOW:
+                EcsStateStore._task_stopped_seen_at.pop(task_id)
+                EcsStateStore._tasks.pop(task_id)
+
+    @staticmethod
+    def get_last_seq() -> int:
+        return EcsStateStore._last_seq
+
+    @staticmethod
+    def get_applied_version() -> int:
+        return EcsStateStore._applied_version
+
+    @staticmethod
+    def get_task_state(task_id: str) -> Optional[Dict[str, Any]]:
+        return EcsStateStore._tasks.get(task_id)
+
+    @staticmethod
+    def get_instance_state(container_inst_id: str) -> Optional[Dict[str, Any]]:
+        return EcsStateStore._instances.get(container_inst_id)
+
+    @staticmethod
+    def get_instance_changes(since_version: int) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Container instance records applied after `since_version`, for readers keeping their own cursor.
+
+        Returns:
+            (records in apply order, version to pass next time)
+        """
+        with EcsStateStore._lock:
+            changed = sorted(
+                (resource_id for resource_id, version in EcsStateStore._instance_versions.items()
+                 if version > since_version),
+                key=EcsStateStore._instance_versions.get
+            )
+            return [EcsStateStore._instances[resource_id] for resource_id in changed], EcsStateStore._applied_version
@@ -0,0 +1,37 @@
+from typing import Dict
+
+
+# Checks in the order healthCheckMain.sh / healthCheckWorker.sh run them, with the
+# log lines they print on success and on failure. The scripts exit on the first
+# failed fsx / tcp / ping / dcgm health check, so later checks did not run.
+HEALTH_CHECK_MARKERS = [
+    ('fsx', ['AWS Fsx connection health'], ['fail on AWS Fsx connection']),
+    ('tcp', ['health:tcp ping check'], ['fail on tcp ping check']),
+    ('ping', ['health:ping check'], ['fail on ping check']),
+    ('dcgm', ['dcgmi health success', 'dcgmi diag health'], ['fail on dcgm health check', 'fail on dcgm diag check']),
+    ('nccl', ['NCCL health'], ['fail on multiple host NCCL check']),
+]
+HEALTH_FATAL_CHECKS = ('fsx', 'tcp', 'ping')
+
+
+def parse_health_log(log_text: str, is_main: bool) -> Dict[str, str]:
+    """
+    Per check PASS / FAIL / NOT_RUN from the log of one health check task.
+
+    Args:
+        log_text: log of healthCheckMain.sh or healthCheckWorker.sh
+        is_main: whether the log is from the main node, the only one running NCCL
+    """
+    results = {}
+    stopped = False
+    for check, pass_markers, fail_markers in HEALTH_CHECK_MARKERS:
+        if stopped or (check == 'nccl' and not is_main):
+            results[check] = 'NOT_RUN'
+        elif any(marker in log_text for marker in fail_markers):
+            results[check] = 'FAIL'
+            stopped = check in HEALTH_FATAL_CHECKS or 'fail on dcgm health check' in log_text
+        elif all(marker in log_text for marker in pass_markers):
+            results[check] = 'PASS'
+        else:
+            results[check] = 'NOT_RUN'
+    return results
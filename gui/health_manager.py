@@ -1,27 +1,77 @@
 from datetime import datetime
 from typing import List, Dict, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 import os
 import copy
+import threading
 
 import boto3
 from datetime import datetime
 
 from file_manager import FileManager
 from dist_command_generator import DistCommandGenerator
-from task_manager import TaskManager
+from task_manager import TaskManager, TaskLaunchSpec, TASK_LAUNCH_WORKERS
+from ddb_handler import DynamoDBHandler
+from service_container import Services
+from health_log import parse_health_log
+
+
+# Health check results, check_id (HASH), queried through the two indexes below.
+# Unset keeps the latest results in memory only.
+HEALTH_HISTORY_TABLE = os.environ.get('HEALTH_HISTORY_TABLE', '')
+# GSI: cluster_name (HASH) + checked_at (RANGE)
+HEALTH_HISTORY_TIME_INDEX = os.environ.get('HEALTH_HISTORY_TIME_INDEX', 'cluster_name-checked_at-index')
+# GSI: node_name (HASH) + checked_at (RANGE)
+HEALTH_HISTORY_NODE_INDEX = os.environ.get('HEALTH_HISTORY_NODE_INDEX', 'node_name-checked_at-index')
+HEALTH_HISTORY_LIMIT = 50
+HEALTH_CHECK_TIMEOUT = float(os.environ.get('HEALTH_CHECK_TIMEOUT', 1800))
+
+HEALTH_MAIN_SCRIPT = '/healthcheck/healthCheckMain.sh'
+HEALTH_WORKER_SCRIPT = '/healthcheck/healthCheckWorker.sh'
 
 
 @dataclass
 class HealthCheck:
     node_id: str
     timestamp: str
+    # RUNNING / PASS / FAIL / INCOMPLETE / LAUNCH_FAILED
     status: str
+    check_id: str = ''
+    task_id: str = ''
+    # per check PASS / FAIL / NOT_RUN
+    fsx: str = 'NOT_RUN'
+    tcp: str = 'NOT_RUN'
+    ping: str = 'NOT_RUN'
+    dcgm: str = 'NOT_RUN'
+    nccl: str = 'NOT_RUN'
+    reason: str = ''
+
+    def to_item(self) -> Dict[str, str]:
+        item = asdict(self)
+        item['node_name'] = item.pop('node_id')
+        item['checked_at'] = item.pop('timestamp')
+        item['cluster_name'] = os.environ.get('CLUSTER_NAME', 'default-cluster')
+        return item
+
+    @staticmethod
+    def from_item(item: Dict[str, str]) -> 'HealthCheck':
+        return HealthCheck(
+            node_id=item['node_name'],
+            timestamp=item['checked_at'],
+            status=item['status'],
+            **{name: item.get(name, '') for name in ('check_id', 'task_id', 'fsx', 'tcp', 'ping', 'dcgm', 'nccl', 'reason')}
+        )
 
 
 class HealthManager:
+    # latest results, the history when HEALTH_HISTORY_TABLE is unset
+    _recent_health_checks = deque(maxlen=HEALTH_HISTORY_LIMIT)
+    _recent_lock = threading.Lock()
+
     def __init__(self):
-        self.task_manager = TaskManager()
+        self.task_manager = Services.task_manager()
         self.command_generator = DistCommandGenerator()
 
     
@@ -97,26 +147,190 @@ class HealthManager:
 
 
 
-    def submit_health_check(self, hostname_list):
-        save_path, timestampstr = self.generate_healthcheck_savepath()
-        self.setup_connectivity_host_file(hostname_list)
-
-        healthcheck_tasks = []
+    def build_healthcheck_launch_spec(self, node_index: int) -> TaskLaunchSpec:
+        """One shared health check definition, the main / worker script travels in containerOverrides."""
+        ecs_task_def = self.task_manager.get_ecs_task_def()
+        health_container_def = self.task_manager.get_healthcheck_container_def()
+        health_container_def['essential'] = True
+        ecs_task_def['containerDefinitions'] = [health_container_def]
 
-        for _, node_name in enumerate(reversed(hostname_list)):
-            ecs_task_def = self.task_manager.get_ecs_task_def()
-            node_index = hostname_list.index(node_name)
+        return TaskLaunchSpec(
+            task_def=ecs_task_def,
+            container_name=health_container_def['name'],
+            command=[HEALTH_MAIN_SCRIPT if node_index == 0 else HEALTH_WORKER_SCRIPT],
+            is_training=False
+        )
 
-            health_container_def = self.generate_healthcheck_container_def(node_index)
-            ecs_task_def['containerDefinitions'] = [health_container_def]
 
-            node_task_def_path = os.path.join(save_path, f"task_def_{node_name}.json")
-            FileManager.save_json(node_task_def_path, ecs_task_def)
+    def submit_health_check(self, hostname_list):
+        """
+        Start the health check on every node at once and collect the per node
+        results into the health history in the background.
 
-            healthcheck_task_id, *_ = TaskManager.task_register_and_exec(node_task_def_path)
-            healthcheck_tasks.append(healthcheck_task_id)
+        Returns:
+            List[str]: task IDs of the nodes that launched, main node first
+        """
+        save_path, timestampstr = self.generate_healthcheck_savepath()
+        self.setup_connectivity_host_file(hostname_list)
 
-        return healthcheck_tasks
+        ## registered once (and reused across runs through TaskDefCache), every node only overrides its command
+        task_def_arn, reg_task_cmd = TaskManager.task_register_spec(self.build_healthcheck_launch_spec(0))
+        node_manager = Services.node_manager()
+        checked_at = datetime.now().isoformat()
+
+        def launch(node_index: int) -> HealthCheck:
+            node_name = hostname_list[node_index]
+            health_check = HealthCheck(node_name, checked_at, 'RUNNING', check_id=f"{timestampstr}#{node_name}")
+            try:
+                container_inst_id = node_manager.get_container_inst_id(node_name)
+                if container_inst_id is None:
+                    raise RuntimeError(f"node {node_name} has no container instance")
+                health_check.task_id, *_ = TaskManager.task_start(
+                    task_def_arn, container_inst_id, self.build_healthcheck_launch_spec(node_index).overrides()
+                )
+            except Exception as e:
+                print(f"HealthManager failed to launch health check on {node_name}: {e}")
+                ## a deregistered cached revision is registered again on the next run
+                TaskManager.forget_stale_task_def(e, self.build_healthcheck_launch_spec(node_index).task_def)
+                health_check.status = 'LAUNCH_FAILED'
+                health_check.reason = str(e)
+            return health_check
+
+        with ThreadPoolExecutor(max_workers=max(1, min(TASK_LAUNCH_WORKERS, len(hostname_list)))) as pool:
+            health_checks = list(pool.map(launch, range(len(hostname_list))))
+
+        HealthManager.record_health_checks(health_checks)
+        FileManager.save_json(os.path.join(save_path, 'health_checks.json'), {
+            'task_def_arn': task_def_arn,
+            'register': reg_task_cmd,
+            'health_checks': [asdict(health_check) for health_check in health_checks]
+        })
+
+        threading.Thread(target=self._collect_health_results, args=(health_checks,),
+                         name='health-check-collector', daemon=True).start()
+
+        return [health_check.task_id for health_check in health_checks if health_check.task_id]
+
+
+    def _collect_health_results(self, health_checks: List[HealthCheck]) -> None:
+        """Wait for the health check tasks to stop, then parse their logs into results."""
+        running = [health_check for health_check in health_checks if health_check.status == 'RUNNING']
+        if not running:
+            return
+
+        try:
+            task_statuses = TaskManager.wait_tasks_stopped([health_check.task_id for health_check in running],
+                                                           HEALTH_CHECK_TIMEOUT)
+            health_container_def = self.task_manager.get_healthcheck_container_def()
+            log_group = health_container_def['logConfiguration']['options']['awslogs-group']
+            cloudwatch_manager = Services.cloudwatch_manager()
+
+            def collect(health_check: HealthCheck) -> None:
+                task_status = task_statuses.get(health_check.task_id, {})
+                log_text = cloudwatch_manager.get_task_logs(health_check.task_id, log_group,
+                                                            health_container_def['name'])
+                results = parse_health_log(log_text, health_checks.index(health_check) == 0)
+                for check, result in results.items():
+                    setattr(health_check, check, result)
+
+                if task_status.get('stop_status') not in ('SUCCESS', 'FAIL'):
+                    health_check.status = 'INCOMPLETE'
+                    health_check.reason = f"task {task_status.get('last_status', 'unknown')} after {HEALTH_CHECK_TIMEOUT:.0f}s"
+                elif task_status['stop_status'] == 'FAIL' or 'FAIL' in results.values():
+                    health_check.status = 'FAIL'
+                    health_check.reason = task_status.get('stopped_reason') or ', '.join(
+                        check for check, result in results.items() if result == 'FAIL'
+                    )
+                else:
+                    health_check.status = 'PASS'
+
+            with ThreadPoolExecutor(max_workers=max(1, min(TASK_LAUNCH_WORKERS, len(running)))) as pool:
+                list(pool.map(collect, running))
+        except Exception as e:
+            print(f"HealthManager failed to collect health check results: {e}")
+            for health_check in running:
+                if health_check.status == 'RUNNING':
+                    health_check.status = 'INCOMPLETE'
+                    health_check.reason = str(e)
+
+        HealthManager.record_health_checks(running)
+        print("Health check results: " + ", ".join(f"{health_check.node_id} {health_check.status}"
+                                                   for health_check in health_checks))
+
+
+    @staticmethod
+    def create_health_history_table() -> bool:
+        return DynamoDBHandler.create_table_if_not_exists(
+            HEALTH_HISTORY_TABLE,
+            'check_id',
+            global_secondary_indexes=[
+                {
+                    'index_name': HEALTH_HISTORY_TIME_INDEX,
+                    'partition_key': ('cluster_name', 'S'),
+                    'sort_key': ('checked_at', 'S')
+                },
+                {
+                    'index_name': HEALTH_HISTORY_NODE_INDEX,
+                    'partition_key': ('node_name', 'S'),
+                    'sort_key': ('checked_at', 'S')
+                }
+            ]
+        )
+
+    @staticmethod
+    def record_health_checks(health_checks: List[HealthCheck]) -> bool:
+        with HealthManager._recent_lock:
+            recent = {health_check.check_id: health_check for health_check in HealthManager._recent_health_checks}
+            recent.update({health_check.check_id: health_check for health_check in health_checks})
+            HealthManager._recent_health_checks.clear()
+            HealthManager._recent_health_checks.extend(
+                sorted(recent.values(), key=lambda health_check: health_check.timestamp)
+            )
+        if not HEALTH_HISTORY_TABLE:
+            return True
+        return DynamoDBHandler.batch_write_items(HEALTH_HISTORY_TABLE,
+                                                 [health_check.to_item() for health_check in health_checks])
+
+    @staticmethod
+    def get_health_checks(node_name: Optional[str] = None, limit: int = HEALTH_HISTORY_LIMIT) -> List[HealthCheck]:
+        """
+        Latest health check results, newest first, of the cluster or of one node.
+        """
+        if not HEALTH_HISTORY_TABLE:
+            with HealthManager._recent_lock:
+                health_checks = [health_check for health_check in reversed(HealthManager._recent_health_checks)
+                                 if node_name is None or health_check.node_id == node_name]
+            return health_checks[:limit]
+
+        if node_name is None:
+            items = DynamoDBHandler.query(
+                HEALTH_HISTORY_TABLE,
+                key_condition='cluster_name = :c',
+                expression_values={':c': os.environ.get('CLUSTER_NAME', 'default-cluster')},
+                index_name=HEALTH_HISTORY_TIME_INDEX,
+                limit=limit,
+                scan_index_forward=False
+            )
+        else:
+            items = DynamoDBHandler.query(
+                HEALTH_HISTORY_TABLE,
+                key_condition='node_name = :n',
+                expression_values={':n': node_name},
+                index_name=HEALTH_HISTORY_NODE_INDEX,
+                limit=limit,
+                scan_index_forward=False
+            )
+        return [HealthCheck.from_item(item) for item in items]
+
+    @staticmethod
+    def get_health_check_history(node_name: Optional[str] = None) -> List[List[str]]:
+        """Health check results formatted for the health check history table."""
+        return [
+            [health_check.node_id, health_check.timestamp, health_check.status,
+             health_check.fsx, health_check.tcp, health_check.ping, health_check.dcgm, health_check.nccl,
+             health_check.task_id, health_check.reason]
+            for health_check in HealthManager.get_health_checks(node_name)
+        ]
 
 
 
@@ -1,14 +1,24 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
+from decimal import Decimal
 from typing import List, Dict, Optional
 
-import boto3, os
+import boto3, os, time
 from datetime import datetime
-from ddb_handler import DynamoDBHandler
+from ddb_handler import DynamoDBHandler, TRANSACT_MAX_ITEMS
 from task_manager import TaskManager
+from node_manager import NodeManager
+from ecs_state_store import EcsStateStore
 
 
 
+# GSI on the job table: cluster_name (HASH) + created_at (RANGE)
+JOB_TIME_INDEX = os.environ.get('JOB_TABLE_TIME_INDEX', 'cluster_name-created_at-index')
+RECENT_JOBS_LIMIT = 5
+# Seconds to wait for stopped tasks to reach STOPPED before the stop is recorded
+JOB_STOP_TIMEOUT = float(os.environ.get('JOB_STOP_TIMEOUT', 60))
+
+
 @dataclass
 class Job:
     id: str
@@ -18,6 +28,31 @@ class Job:
     task_ids: List[str] = None  # List to store task IDs for each node
 
 
+@dataclass
+class StopReport:
+    job_id: str
+    # task_id -> STOPPED / NOT_RUNNING / STOP_FAILED / STOP_TIMEOUT
+    task_outcomes: Dict[str, str] = field(default_factory=dict)
+    # seconds spent in each teardown phase: lookup, stop, confirm, record
+    timings: Dict[str, float] = field(default_factory=dict)
+    recorded: bool = False
+
+    @property
+    def success(self) -> bool:
+        return self.recorded and all(
+            outcome in ('STOPPED', 'NOT_RUNNING') for outcome in self.task_outcomes.values()
+        )
+
+    def format_summary(self) -> str:
+        counts = {}
+        for outcome in self.task_outcomes.values():
+            counts[outcome] = counts.get(outcome, 0) + 1
+        outcomes = ', '.join(f"{outcome} {count}" for outcome, count in sorted(counts.items()))
+        timings = ', '.join(f"{phase} {seconds:.2f}s" for phase, seconds in self.timings.items())
+        return (f"Job {self.job_id} teardown {sum(self.timings.values()):.2f}s "
+                f"({timings}) | tasks: {outcomes or 'none'}")
+
+
 # def singleton(cls):
 #     instances = {}
 #     def get_instance(*args, **kwargs):
@@ -58,26 +93,44 @@ class JobManager:
 
 
     @staticmethod
-    def gather_task_and_record_job(job_id, job_timestamp, num_nodes, assigned_nodes, container_inst_ids, ecs_task_ids, JOB_STATUS):
-        
-        DynamoDBHandler.write_item(table_name = os.environ['JOB_MANAGE_TABLE'], 
-                                    item = {
-                                        'job_id': job_id,
-                                        'job_timestamp': job_timestamp,
-                                        'cluster_name': os.environ['CLUSTER_NAME'],
-                                        'num_nodes': num_nodes,
-                                        'assigned_nodes': assigned_nodes,
-                                        'submittd_container_inst_ids': container_inst_ids,
-                                        'submittd_ecs_task_ids': ecs_task_ids,
-                                        'updated_at': datetime.now().isoformat(),
-                                        'created_at': datetime.now().isoformat(),
-                                        'retry': 0,
-                                        # 'job_status': 'IN_PROGRESS',
-                                        'job_status': JOB_STATUS
-                                    }
-                                )
-
-        return
+    def gather_task_and_record_job(job_id, job_timestamp, num_nodes, assigned_nodes, container_inst_ids, ecs_task_ids, JOB_STATUS,
+                                   task_records=None):
+        """
+        Write the job row, together with its buffered task records if given.
+
+        Job and tasks go into one transaction when they fit, so a job is never
+        left half recorded. Larger jobs batch-write the tasks first and the job
+        row last, the job row acting as the commit marker.
+        """
+        job_item = {
+            'job_id': job_id,
+            'job_timestamp': job_timestamp,
+            'cluster_name': os.environ['CLUSTER_NAME'],
+            'num_nodes': num_nodes,
+            'assigned_nodes': assigned_nodes,
+            'submittd_container_inst_ids': container_inst_ids,
+            'submittd_ecs_task_ids': ecs_task_ids,
+            'updated_at': datetime.now().isoformat(),
+            'created_at': datetime.now().isoformat(),
+            'retry': 0,
+            # 'job_status': 'IN_PROGRESS',
+            'job_status': JOB_STATUS
+        }
+
+        task_records = task_records or []
+        if not task_records:
+            return DynamoDBHandler.write_item(os.environ['JOB_MANAGE_TABLE'], job_item)
+
+        if len(task_records) + 1 <= TRANSACT_MAX_ITEMS:
+            return DynamoDBHandler.transact_put_items(
+                [(os.environ['TASK_MANAGE_TABLE'], task_record) for task_record in task_records]
+                + [(os.environ['JOB_MANAGE_TABLE'], job_item)]
+            )
+
+        if not DynamoDBHandler.batch_write_items(os.environ['TASK_MANAGE_TABLE'], task_records):
+            print(f"Error recording tasks of job {job_id}, job row not written")
+            return False
+        return DynamoDBHandler.write_item(os.environ['JOB_MANAGE_TABLE'], job_item)
 
 
 
@@ -89,57 +142,153 @@ class JobManager:
         return dict(zip(resp['submittd_ecs_task_ids'], resp['assigned_nodes']))
 
     @staticmethod
-    def stop_job(job_id: str) -> bool:
-        job_tasks = JobManager.get_job_associated_tasks_from_ddb(job_id)
-        
-        for taskid in job_tasks.keys():
+    def is_task_running(task_id: str) -> bool:
+        return JobManager.are_tasks_running([task_id])[task_id]
+
+    @staticmethod
+    def are_tasks_running(task_ids: List[str]) -> Dict[str, bool]:
+        """
+        Running state from the event state store, with one bulk describe-tasks
+        pass for the tasks the store has not seen.
+        """
+        running = {}
+        unseen_task_ids = []
+        for task_id in task_ids:
+            task_state = EcsStateStore.get_task_state(task_id)
+            if task_state is None:
+                unseen_task_ids.append(task_id)
+            else:
+                running[task_id] = task_state.get('last_status') == 'RUNNING' and task_state.get('desired_status') == 'RUNNING'
+
+        if unseen_task_ids:
             try:
-                if TaskManager.is_task_running(taskid):
-                    resp = TaskManager.stop_ecs_task(taskid)
+                running.update(TaskManager.are_tasks_running(unseen_task_ids))
+            except Exception as e:
+                print(f"Error checking task status: {e}")
+                running.update({task_id: False for task_id in unseen_task_ids})
 
-                    # if resp['task']['stopCode'] == "EssentialContainerExited":
-                    #     NodeManager().update_node_status(job_tasks[taskid], UserNodeStatus.AVAILABLE.value)
-                    # else:
-                    #     NodeManager().update_node_status(job_tasks[taskid], UserNodeStatus.UNKNOWN.value)
+        return running
 
-                    # print('STOP RESP: ', resp)
+    @staticmethod
+    def record_job_stop(job_id: str, job_status: Optional[str], report: StopReport) -> bool:
+        """Write the stop outcome of every task, and the new job status if any, in one update."""
+        update_expression = "SET updated_at = :t, task_stop_outcomes = :o, stop_timings = :d"
+        expression_values = {
+            ':t': datetime.now().isoformat(),
+            ':o': report.task_outcomes,
+            ':d': {phase: Decimal(f"{seconds:.3f}") for phase, seconds in report.timings.items()}
+        }
+        if job_status is not None:
+            update_expression += ", job_status = :s"
+            expression_values[':s'] = job_status
 
-                    JobManager.update_job_status(job_id, 'USER_STOPPED')
-                else:
-                    print(f"Task {taskid} is not running")
+        try:
+            return DynamoDBHandler.update_item(
+                table_name=os.environ['JOB_MANAGE_TABLE'],
+                key={'job_id': job_id},
+                update_expression=update_expression,
+                expression_values=expression_values
+            )
+        except Exception as e:
+            print(f"Error recording stop of job {job_id} in DDB: {str(e)}")
+            return False
 
-            except Exception as e:
+    @staticmethod
+    def stop_job(job_id: str, timeout: float = JOB_STOP_TIMEOUT) -> StopReport:
+        """
+        Stop every running task of a job: stop-task fan-out, one bulk wait for
+        STOPPED bounded by `timeout`, then a single job row update.
+
+        Returns:
+            StopReport: per task outcomes and per phase timings
+        """
+        report = StopReport(job_id=job_id)
+
+        phase_start = time.perf_counter()
+        job_tasks = JobManager.get_job_associated_tasks_from_ddb(job_id)
+        EcsStateStore.sync()
+        tasks_running = JobManager.are_tasks_running(list(job_tasks.keys()))
+        running_task_ids = [task_id for task_id, running in tasks_running.items() if running]
+        for task_id, running in tasks_running.items():
+            if not running:
+                print(f"Task {task_id} is not running")
+                report.task_outcomes[task_id] = 'NOT_RUNNING'
+        report.timings['lookup'] = time.perf_counter() - phase_start
+
+        phase_start = time.perf_counter()
+        stop_errors = TaskManager.stop_tasks(running_task_ids)
+        stopping_task_ids = []
+        for task_id, error in stop_errors.items():
+            if error is None:
+                stopping_task_ids.append(task_id)
+            else:
                 # Keep stop other tasks
-                print(f"Error stopping tasks {taskid}: {str(e)}")
-                # NodeManager().update_node_status(job_tasks[taskid], UserNodeStatus.UNKNOWN.value)
-            
-        
+                print(f"Error stopping tasks {task_id}: {str(error)}")
+                report.task_outcomes[task_id] = 'STOP_FAILED'
+        report.timings['stop'] = time.perf_counter() - phase_start
 
-        return True
+        phase_start = time.perf_counter()
+        try:
+            task_statuses = TaskManager.wait_tasks_stopped(stopping_task_ids, timeout)
+        except Exception as e:
+            print(f"Error confirming stop of job {job_id} tasks: {str(e)}")
+            task_statuses = {}
+        for task_id in stopping_task_ids:
+            task_status = task_statuses.get(task_id)
+            stopped = task_status is not None and task_status['stop_status'] != 'RUNNING'
+            report.task_outcomes[task_id] = 'STOPPED' if stopped else 'STOP_TIMEOUT'
+        report.timings['confirm'] = time.perf_counter() - phase_start
+
+        phase_start = time.perf_counter()
+        report.recorded = JobManager.record_job_stop(
+            job_id, 'USER_STOPPED' if stopping_task_ids else None, report
+        )
+        report.timings['record'] = time.perf_counter() - phase_start
+
+        NodeManager().invalidate_inventory()
+
+        print(report.format_summary())
+        return report
+
+    @staticmethod
+    def create_job_table() -> bool:
+        """Creates the job table, or adds the time ordered index to an existing one."""
+        return DynamoDBHandler.create_table_if_not_exists(
+            os.environ['JOB_MANAGE_TABLE'],
+            'job_id',
+            global_secondary_indexes=[{
+                'index_name': JOB_TIME_INDEX,
+                'partition_key': ('cluster_name', 'S'),
+                'sort_key': ('created_at', 'S')
+            }]
+        )
+
+    @staticmethod
+    def get_latest_jobs(limit: int = RECENT_JOBS_LIMIT) -> List[Dict]:
+        """
+        Latest jobs of this cluster, newest first, read from the
+        cluster_name + created_at index instead of scanning the whole table.
+        """
+        return DynamoDBHandler.query(
+            os.environ['JOB_MANAGE_TABLE'],
+            key_condition='cluster_name = :c',
+            expression_values={':c': os.environ['CLUSTER_NAME']},
+            index_name=JOB_TIME_INDEX,
+            limit=limit,
+            scan_index_forward=False
+        )
 
     @staticmethod
     def get_jobs_data() -> List[List[str]]:
         """
-        Retrieves the latest 10 jobs data from DynamoDB table using job_id as primary key and status as a key field.
+        Retrieves the latest jobs data from DynamoDB through the time ordered index.
         Returns formatted job data for display.
         """
         try:
-            # Get all jobs from DynamoDB table
-            jobs_data = DynamoDBHandler.scan_table(os.environ['JOB_MANAGE_TABLE'])
+            latest_jobs = JobManager.get_latest_jobs()
             
-            if not jobs_data:
+            if not latest_jobs:
                 return []
-            
-            # Sort jobs by timestamp (most recent first)
-            # Use created_at if available, otherwise fall back to job_timestamp
-            sorted_jobs = sorted(
-                jobs_data,
-                key=lambda job: job.get('created_at', job.get('job_timestamp', '')),
-                reverse=True
-            )
-            
-            # Take only the latest N jobs
-            latest_jobs = sorted_jobs[:5]
 
             # Format the data for display
             return [
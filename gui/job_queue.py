@@ -0,0 +1,418 @@
+import os
+import time
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from ddb_handler import DynamoDBHandler
+from node_lease import NodeLease
+from node_manager import NodeManager
+from warm_pool import WarmPool
+
+
+# Queue state table, queue_id (HASH); the scheduler reads it through the pending index.
+# Unset keeps the queue in memory only, so queued jobs are lost when the console restarts.
+JOB_QUEUE_TABLE = os.environ.get('JOB_QUEUE_TABLE', '')
+# Sparse GSI on the queue table: cluster_name (HASH) + queue_state (RANGE). queue_state is
+# "<status>#<enqueued_at>" while a job is QUEUED or DISPATCHING and removed once it leaves,
+# so the index only ever holds pending jobs, not the queue's history.
+JOB_QUEUE_INDEX = os.environ.get('JOB_QUEUE_INDEX', 'cluster_name-queue_state-index')
+JOB_QUEUE_POLL_INTERVAL = float(os.environ.get('JOB_QUEUE_POLL_INTERVAL', 15))
+# Times smaller jobs may be backfilled past a waiting head job before the queue holds nodes for it
+JOB_QUEUE_MAX_SKIPS = int(os.environ.get('JOB_QUEUE_MAX_SKIPS', 3))
+# Seconds a dispatch claim is valid unless the dispatching console renews it; a job DISPATCHING
+# past its deadline belongs to a console that exited mid launch
+JOB_QUEUE_DISPATCH_TTL = float(os.environ.get('JOB_QUEUE_DISPATCH_TTL', 120))
+
+# statuses kept in the pending index
+_PENDING_STATUSES = ('QUEUED', 'DISPATCHING')
+
+
+def _cluster_name() -> str:
+    return os.environ.get('CLUSTER_NAME', 'default-cluster')
+
+
+@dataclass
+class QueuedJob:
+    queue_id: str
+    num_nodes: int
+    enqueued_at: str
+    # launch_training settings, handed back to the launch callback on dispatch
+    settings: Dict[str, Any] = field(default_factory=dict)
+    # QUEUED / DISPATCHING / DISPATCHED / FAILED / INTERRUPTED
+    queue_status: str = 'QUEUED'
+    skip_count: int = 0
+    reason: str = ''
+    updated_at: str = ''
+    # console dispatching the job and the time its claim runs out, while DISPATCHING
+    holder: str = ''
+    dispatch_deadline: int = 0
+
+    def queue_state(self) -> str:
+        return f"{self.queue_status}#{self.enqueued_at}"
+
+    def to_item(self) -> Dict[str, Any]:
+        item = {
+            'queue_id': self.queue_id,
+            'cluster_name': _cluster_name(),
+            'num_nodes': self.num_nodes,
+            'enqueued_at': self.enqueued_at,
+            'settings': self.settings,
+            'queue_status': self.queue_status,
+            'skip_count': self.skip_count,
+            'reason': self.reason,
+            'updated_at': datetime.now().isoformat()
+        }
+        if self.queue_status in _PENDING_STATUSES:
+            item['queue_state'] = self.queue_state()
+        return item
+
+    @staticmethod
+    def from_item(item: Dict[str, Any]) -> 'QueuedJob':
+        settings = dict(item.get('settings', {}))
+        ## DynamoDB hands numbers back as Decimal
+        if 'num_nodes' in settings:
+            settings['num_nodes'] = int(settings['num_nodes'])
+        return QueuedJob(
+            queue_id=item['queue_id'],
+            num_nodes=int(item['num_nodes']),
+            enqueued_at=item['enqueued_at'],
+            settings=settings,
+            queue_status=item.get('queue_status', 'QUEUED'),
+            skip_count=int(item.get('skip_count', 0)),
+            reason=item.get('reason', ''),
+            updated_at=item.get('updated_at', ''),
+            holder=item.get('holder', ''),
+            dispatch_deadline=int(item.get('dispatch_deadline', 0))
+        )
+
+
+class JobQueue:
+    """
+    FIFO of submitted jobs, persisted to JOB_QUEUE_TABLE when configured.
+
+    Status changes out of QUEUED are conditional writes, so when several
+    console processes share the table only one of them dispatches a job.
+    The dispatching console keeps renewing its claim while it launches, a
+    claim that runs out marks the job INTERRUPTED.
+    """
+    _jobs: Dict[str, QueuedJob] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def is_persistent() -> bool:
+        return bool(JOB_QUEUE_TABLE)
+
+    @staticmethod
+    def create_table() -> bool:
+        return DynamoDBHandler.create_table_if_not_exists(
+            JOB_QUEUE_TABLE,
+            'queue_id',
+            global_secondary_indexes=[{
+                'index_name': JOB_QUEUE_INDEX,
+                'partition_key': ('cluster_name', 'S'),
+                'sort_key': ('queue_state', 'S')
+            }]
+        )
+
+    @staticmethod
+    def _query_pending(status: str) -> List[QueuedJob]:
+        items = DynamoDBHandler.query(
+            JOB_QUEUE_TABLE,
+            key_condition='cluster_name = :c AND begins_with(queue_state, :s)',
+            expression_values={':c': _cluster_name(), ':s': f"{status}#"},
+            index_name=JOB_QUEUE_INDEX
+        )
+        return [QueuedJob.from_item(item) for item in items]
+
+    @staticmethod
+    def enqueue(queue_id: str, num_nodes: int, settings: Dict[str, Any]) -> QueuedJob:
+        job = QueuedJob(queue_id, num_nodes, datetime.now().isoformat(timespec='microseconds'), dict(settings))
+        if JobQueue.is_persistent() and not DynamoDBHandler.write_item(JOB_QUEUE_TABLE, job.to_item()):
+            raise RuntimeError(f"Failed to persist queued job {queue_id}")
+        with JobQueue._lock:
+            JobQueue._jobs[queue_id] = job
+        return job
+
+    @staticmethod
+    def get_queued() -> List[QueuedJob]:
+        """Jobs still waiting, oldest first."""
+        if JobQueue.is_persistent():
+            jobs = JobQueue._query_pending('QUEUED')
+            with JobQueue._lock:
+                dispatching = {queue_id: job for queue_id, job in JobQueue._jobs.items()
+                               if job.queue_status == 'DISPATCHING'}
+                JobQueue._jobs = {**{job.queue_id: job for job in jobs}, **dispatching}
+        else:
+            with JobQueue._lock:
+                jobs = list(JobQueue._jobs.values())
+
+        return sorted((job for job in jobs if job.queue_status == 'QUEUED'),
+                      key=lambda job: (job.enqueued_at, job.queue_id))
+
+    @staticmethod
+    def transition(job: QueuedJob, from_status: str, to_status: str, reason: str = '') -> bool:
+        """
+        Move `job` from `from_status` to `to_status`, False when another writer moved it first.
+        Moving to DISPATCHING claims the job for this console until JOB_QUEUE_DISPATCH_TTL
+        from now, see renew_dispatch; moving out of the pending statuses drops it from the index.
+        """
+        holder, dispatch_deadline = '', 0
+        if to_status == 'DISPATCHING':
+            holder, dispatch_deadline = NodeLease.HOLDER_ID, int(time.time() + JOB_QUEUE_DISPATCH_TTL)
+
+        if JobQueue.is_persistent():
+            expression_values = {
+                ':s': to_status, ':r': reason, ':t': datetime.now().isoformat(), ':from': from_status
+            }
+            update_expression = "SET queue_status = :s, reason = :r, updated_at = :t"
+            if to_status in _PENDING_STATUSES:
+                update_expression += ", queue_state = :q"
+                expression_values[':q'] = f"{to_status}#{job.enqueued_at}"
+            if to_status == 'DISPATCHING':
+                update_expression += ", holder = :h, dispatch_deadline = :d"
+                expression_values.update({':h': holder, ':d': dispatch_deadline})
+            if to_status not in _PENDING_STATUSES:
+                update_expression += " REMOVE queue_state"
+            if not DynamoDBHandler.update_item(
+                table_name=JOB_QUEUE_TABLE,
+                key={'queue_id': job.queue_id},
+                update_expression=update_expression,
+                expression_values=expression_values,
+                condition_expression="queue_status = :from"
+            ):
+                return False
+        elif job.queue_status != from_status:
+            return False
+
+        with JobQueue._lock:
+            job.queue_status = to_status
+            job.reason = reason
+            job.holder, job.dispatch_deadline = holder, dispatch_deadline
+            if to_status not in _PENDING_STATUSES:
+                JobQueue._jobs.pop(job.queue_id, None)
+        return True
+
+    @staticmethod
+    def renew_dispatch(job: QueuedJob) -> bool:
+        """Push this console's dispatch claim on `job` out by JOB_QUEUE_DISPATCH_TTL, False if it was lost."""
+        dispatch_deadline = int(time.time() + JOB_QUEUE_DISPATCH_TTL)
+        if JobQueue.is_persistent() and not DynamoDBHandler.update_item(
+            table_name=JOB_QUEUE_TABLE,
+            key={'queue_id': job.queue_id},
+            update_expression="SET dispatch_deadline = :d",
+            expression_values={':d': dispatch_deadline, ':h': NodeLease.HOLDER_ID, ':s': 'DISPATCHING'},
+            condition_expression="queue_status = :s AND holder = :h"
+        ):
+            return False
+        job.dispatch_deadline = dispatch_deadline
+        return True
+
+    @staticmethod
+    def record_skip(job: QueuedJob) -> None:
+        job.skip_count += 1
+        if JobQueue.is_persistent():
+            DynamoDBHandler.update_item(
+                table_name=JOB_QUEUE_TABLE,
+                key={'queue_id': job.queue_id},
+                update_expression="SET skip_count = :n, updated_at = :t",
+                expression_values={':n': job.skip_count, ':t': datetime.now().isoformat()}
+            )
+
+    @staticmethod
+    def recover_interrupted() -> List[str]:
+        """
+        Jobs left DISPATCHING by a console that stopped renewing its claim may have
+        partially started, mark them INTERRUPTED instead of ever relaunching them.
+
+        Returns:
+            List[str]: queue ids marked INTERRUPTED
+        """
+        if not JobQueue.is_persistent():
+            return []
+
+        now = int(time.time())
+        interrupted = []
+        for job in JobQueue._query_pending('DISPATCHING'):
+            if job.dispatch_deadline >= now:
+                continue
+            ## conditional on the deadline, a late heartbeat of a live console wins
+            if DynamoDBHandler.update_item(
+                table_name=JOB_QUEUE_TABLE,
+                key={'queue_id': job.queue_id},
+                update_expression="SET queue_status = :s, reason = :r, updated_at = :t REMOVE queue_state",
+                expression_values={
+                    ':s': 'INTERRUPTED', ':r': f"console {job.holder or 'unknown'} stopped during dispatch",
+                    ':t': datetime.now().isoformat(), ':from': 'DISPATCHING', ':now': now
+                },
+                condition_expression="queue_status = :from AND dispatch_deadline < :now"
+            ):
+                print(f"JobQueue marking {job.queue_id} INTERRUPTED, {job.holder or 'its console'} stopped during dispatch")
+                interrupted.append(job.queue_id)
+        return interrupted
+
+    @staticmethod
+    def get_queue_display() -> List[List[str]]:
+        return [
+            [job.queue_id, str(job.num_nodes), job.enqueued_at, str(job.skip_count)]
+            for job in JobQueue.get_queued()
+        ]
+
+
+class GangScheduler:
+    """
+    Dispatches queued jobs once all of their nodes can be reserved together.
+
+    Jobs go out in FIFO order. When the head job does not fit, later jobs
+    that fit the free nodes are backfilled past it, at most
+    JOB_QUEUE_MAX_SKIPS times; after that nothing more is backfilled and
+    nodes freed by finishing jobs accumulate until the head job fits.
+
+    One shared daemon thread runs the queue, woken by enqueue and by
+    released nodes, otherwise every JOB_QUEUE_POLL_INTERVAL seconds.
+    """
+    _launch_fn: Optional[Callable[[QueuedJob, List[str], Optional[List[str]]], None]] = None
+    _thread = None
+    _wakeup = threading.Event()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def start(launch_fn: Callable[[QueuedJob, List[str], Optional[List[str]]], None]) -> None:
+        """
+        Args:
+            launch_fn: launch_fn(job, node_names, container_inst_ids) launches the job on the
+                reserved nodes, or lets ready warm standbys take it when container_inst_ids is None
+        """
+        with GangScheduler._lock:
+            GangScheduler._launch_fn = launch_fn
+            if GangScheduler._thread is not None and GangScheduler._thread.is_alive():
+                return
+            GangScheduler._thread = threading.Thread(target=GangScheduler._run, name='gang-scheduler', daemon=True)
+            GangScheduler._thread.start()
+
+    @staticmethod
+    def submit(queue_id: str, num_nodes: int, settings: Dict[str, Any]) -> int:
+        """
+        Queue a job and wake the dispatcher.
+
+        Returns:
+            int: 1-based position of the job in the queue
+        """
+        total_nodes = len(NodeManager().node_names)
+        if num_nodes > total_nodes:
+            raise ValueError(f"Job needs {num_nodes} nodes but the cluster has {total_nodes}")
+
+        JobQueue.enqueue(queue_id, num_nodes, settings)
+        GangScheduler.wake()
+        queued_ids = [job.queue_id for job in JobQueue.get_queued()]
+        return queued_ids.index(queue_id) + 1 if queue_id in queued_ids else 1
+
+    @staticmethod
+    def wake() -> None:
+        GangScheduler._wakeup.set()
+
+    @staticmethod
+    def _run() -> None:
+        while True:
+            GangScheduler._wakeup.wait(JOB_QUEUE_POLL_INTERVAL)
+            GangScheduler._wakeup.clear()
+            try:
+                GangScheduler.schedule_once()
+            except Exception as e:
+                print(f"GangScheduler pass failed: {e}")
+
+    @staticmethod
+    def schedule_once() -> List[str]:
+        """
+        Run one scheduling pass over the queue.
+
+        Returns:
+            List[str]: queue ids dispatched in this pass
+        """
+        ## cheap on the sparse index, so a console that died mid dispatch is noticed within a pass
+        JobQueue.recover_interrupted()
+        queued = JobQueue.get_queued()
+        if not queued:
+            return []
+
+        node_manager = NodeManager()
+        node_manager.refresh_all_node_status()
+        free_count = len(node_manager.get_spare_node_names())
+        warm_count = len(WarmPool.get_ready_node_names()) if WarmPool.is_enabled() else 0
+
+        head = queued[0]
+        head_blocked = False
+        dispatched = []
+        for job in queued:
+            use_warm = GangScheduler._is_warm_eligible(job) and job.num_nodes <= warm_count
+            fits = use_warm or job.num_nodes <= free_count
+
+            if job is head:
+                if not fits and job.num_nodes <= free_count + warm_count:
+                    ## Standbys hold the nodes this job needs, free them for a cold start next pass
+                    print(f"GangScheduler draining warm pool for {job.queue_id}")
+                    WarmPool.drain()
+                    GangScheduler.wake()
+                    return dispatched
+                head_blocked = not fits
+            elif head_blocked and head.skip_count >= JOB_QUEUE_MAX_SKIPS:
+                print(f"GangScheduler holding nodes for {head.queue_id}, skipped {head.skip_count} times")
+                break
+
+            if not fits:
+                continue
+
+            if GangScheduler._dispatch(job, node_manager, use_warm):
+                dispatched.append(job.queue_id)
+                if use_warm:
+                    warm_count -= job.num_nodes
+                else:
+                    free_count -= job.num_nodes
+                if head_blocked:
+                    JobQueue.record_skip(head)
+
+        return dispatched
+
+    @staticmethod
+    def _is_warm_eligible(job: QueuedJob) -> bool:
+        ## Health checked jobs run their precheck on cold nodes first
+        return WarmPool.is_enabled() and not job.settings.get('health_check_checkbox')
+
+    @staticmethod
+    def _dispatch(job: QueuedJob, node_manager: NodeManager, use_warm: bool) -> bool:
+        if not JobQueue.transition(job, 'QUEUED', 'DISPATCHING'):
+            return False
+
+        node_names = []
+        launched = threading.Event()
+        threading.Thread(target=GangScheduler._renew_claim, args=(job, launched),
+                         name=f"dispatch-claim-{job.queue_id}", daemon=True).start()
+        try:
+            if use_warm:
+                container_inst_ids = None
+            else:
+                node_names = node_manager.assign_node_names(job.num_nodes, job.queue_id)
+                container_inst_ids = [node_manager.get_container_inst_id(node_name) for node_name in node_names]
+            print(f"GangScheduler dispatching {job.queue_id} on {node_names or 'warm standbys'}")
+            GangScheduler._launch_fn(job, node_names, container_inst_ids)
+        except Exception as e:
+            print(f"GangScheduler failed to dispatch {job.queue_id}: {e}")
+            JobQueue.transition(job, 'DISPATCHING', 'FAILED', str(e))
+            return False
+        finally:
+            launched.set()
+            ## Launched tasks now hold the GPUs, the next inventory refresh keeps these nodes out of spare
+            node_manager.invalidate_inventory()
+            node_manager.release_node_names(node_names)
+
+        JobQueue.transition(job, 'DISPATCHING', 'DISPATCHED')
+        return True
+
+    @staticmethod
+    def _renew_claim(job: QueuedJob, launched: threading.Event) -> None:
+        """Heartbeat of the dispatch claim on `job` until `launched` is set."""
+        while not launched.wait(JOB_QUEUE_DISPATCH_TTL / 3):
+            if not JobQueue.renew_dispatch(job):
+                print(f"GangScheduler lost the dispatch claim on {job.queue_id}")
+                return
@@ -0,0 +1,93 @@
+import os
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+LOG_CACHE_DIR = os.environ.get('LOG_CACHE_DIR', os.path.expanduser('~/.cache/hybrid-gpu-console/logs'))
+LOG_CACHE_MAX_BYTES = int(os.environ.get('LOG_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+
+class LogCache:
+    """
+    Size bounded LRU cache of finished task logs on local disk, gzip compressed.
+
+    Entries are files named after a hash of (log group, stream, task); file
+    mtime is the recency, so the LRU order survives console restarts.
+    """
+
+    def __init__(self, cache_dir: str = LOG_CACHE_DIR, max_bytes: int = LOG_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # file name -> compressed size, least recently used first; loaded on first use
+        self._entries: Optional["OrderedDict[str, int]"] = None
+        self._total_bytes = 0
+
+    @staticmethod
+    def _entry_name(log_group: str, log_stream_name: str, task_id: str) -> str:
+        key = '\0'.join((log_group, log_stream_name, task_id))
+        return hashlib.sha256(key.encode('utf-8')).hexdigest() + '.log.gz'
+
+    def _load_entries(self) -> None:
+        if self._entries is not None:
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        found = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.log.gz'):
+                stat = entry.stat()
+                found.append((stat.st_mtime, entry.name, stat.st_size))
+
+        self._entries = OrderedDict((name, size) for _, name, size in sorted(found))
+        self._total_bytes = sum(self._entries.values())
+
+    def get(self, log_group: str, log_stream_name: str, task_id: str) -> Optional[str]:
+        name = self._entry_name(log_group, log_stream_name, task_id)
+        path = os.path.join(self.cache_dir, name)
+
+        with self._lock:
+            self._load_entries()
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                content = f.read()
+            os.utime(path)
+            return content
+        except OSError as e:
+            print(f"LogCache dropping unreadable entry {path}: {e}")
+            with self._lock:
+                self._total_bytes -= self._entries.pop(name, 0)
+            return None
+
+    def put(self, log_group: str, log_stream_name: str, task_id: str, content: str) -> None:
+        name = self._entry_name(log_group, log_stream_name, task_id)
+        path = os.path.join(self.cache_dir, name)
+        data = gzip.compress(content.encode('utf-8'))
+        if len(data) > self.max_bytes:
+            return
+
+        with self._lock:
+            self._load_entries()
+
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+            self._total_bytes += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+
+            while self._total_bytes > self.max_bytes and self._entries:
+                evicted, size = self._entries.popitem(last=False)
+                self._total_bytes -= size
+                try:
+                    os.remove(os.path.join(self.cache_dir, evicted))
+                except FileNotFoundError:
+                    pass
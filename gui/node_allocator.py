@@ -0,0 +1,175 @@
+import os
+import json
+import ipaddress
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from file_manager import FileManager
+
+
+# 'topology' packs a job onto the tightest group of nodes, 'ordered' takes free nodes in name order
+NODE_ALLOCATOR = os.environ.get('NODE_ALLOCATOR', 'topology')
+NODE_MAPPING_PATH = os.environ.get(
+    'NODE_MAPPING_PATH',
+    os.path.join(os.environ.get('ECS_CLUSTER_CONF_PATH', 'HYBRID_GPU_PRE_SETTINGS'), 'node_mapping_info.yaml')
+)
+# Nodes whose IPs share this prefix are treated as one group (same leaf switch / subnet)
+NODE_TOPOLOGY_SUBNET_PREFIX = int(os.environ.get('NODE_TOPOLOGY_SUBNET_PREFIX', 24))
+# ECS container instance attribute naming the node's switch / placement group, e.g. set with
+# `aws ecs put-attributes --attributes name=TopologyGroup,value=leaf-3,...`
+NODE_TOPOLOGY_ATTRIBUTE = os.environ.get('NODE_TOPOLOGY_ATTRIBUTE', 'TopologyGroup')
+# Optional JSON {node: {node: GB/s}} measured with nccl-tests
+NODE_BANDWIDTH_PATH = os.environ.get('NODE_BANDWIDTH_PATH', '')
+
+
+@dataclass
+class NodeTopology:
+    # node name -> group key, nodes in the same group are well connected
+    groups: Dict[str, str] = field(default_factory=dict)
+    # node name -> node name -> measured bandwidth
+    bandwidth: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+    def group_of(self, node_name: str) -> str:
+        return self.groups.get(node_name, '')
+
+    def link(self, node_a: str, node_b: str) -> float:
+        return self.bandwidth.get(node_a, {}).get(node_b, self.bandwidth.get(node_b, {}).get(node_a, 0.0))
+
+
+def _subnet_of(ip: str) -> Optional[str]:
+    try:
+        return str(ipaddress.ip_network(f"{ip}/{NODE_TOPOLOGY_SUBNET_PREFIX}", strict=False))
+    except ValueError:
+        return None
+
+
+def load_topology(node_addresses: Mapping[str, str],
+                  node_attribute_groups: Mapping[str, str]) -> NodeTopology:
+    """
+    Build the topology from the available sources, first match per node wins:
+    a `switch` entry in node_mapping_info.yaml, the ECS attribute group, the
+    YAML ip's subnet, then the subnet of the address derived from the node name.
+
+    Args:
+        node_addresses: node name -> address derived from the node name
+        node_attribute_groups: node name -> group from the ECS topology attribute
+    """
+    topology = NodeTopology()
+
+    node_mapping = {}
+    if os.path.exists(NODE_MAPPING_PATH):
+        try:
+            node_mapping = FileManager.load_yaml(NODE_MAPPING_PATH) or {}
+        except Exception as e:
+            print(f"NodeAllocator ignoring {NODE_MAPPING_PATH}: {e}")
+
+    for node_name in set(node_addresses) | set(node_mapping):
+        mapping = node_mapping.get(node_name) or {}
+        group = (
+            mapping.get('switch')
+            or node_attribute_groups.get(node_name)
+            or (mapping.get('ip') and _subnet_of(str(mapping['ip']).strip()))
+            or (node_addresses.get(node_name) and _subnet_of(node_addresses[node_name]))
+        )
+        if group:
+            topology.groups[node_name] = str(group)
+
+    if NODE_BANDWIDTH_PATH:
+        try:
+            with open(NODE_BANDWIDTH_PATH, 'r') as f:
+                topology.bandwidth = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"NodeAllocator ignoring {NODE_BANDWIDTH_PATH}: {e}")
+
+    return topology
+
+
+class OrderedAllocator:
+    """Free nodes in name order, the first one is rank 0."""
+
+    def allocate(self, free_nodes: List[str], num_nodes: int, topology: NodeTopology) -> List[str]:
+        if num_nodes > len(free_nodes):
+            raise ValueError(f"Requested {num_nodes} nodes but only {len(free_nodes)} are free")
+        return sorted(free_nodes)[:num_nodes]
+
+
+class TopologyAllocator:
+    """
+    Packs a job onto the fewest, tightest topology groups.
+
+    - If one group can hold the whole job, the smallest such group is used
+      (best fit), which keeps larger groups free for larger jobs.
+    - Otherwise the largest groups are filled first, so the job spans as
+      few groups as possible.
+    - Within the chosen nodes, rank 0 is the best connected node by measured
+      bandwidth when known, ranks then follow group and name order.
+
+    Every choice is broken by name, so the same free set gives the same placement.
+    """
+
+    def allocate(self, free_nodes: List[str], num_nodes: int, topology: NodeTopology) -> List[str]:
+        if num_nodes > len(free_nodes):
+            raise ValueError(f"Requested {num_nodes} nodes but only {len(free_nodes)} are free")
+        if num_nodes <= 0:
+            return []
+
+        groups: Dict[str, List[str]] = {}
+        for node_name in sorted(free_nodes):
+            groups.setdefault(topology.group_of(node_name), []).append(node_name)
+
+        fitting = [key for key, members in groups.items() if len(members) >= num_nodes]
+        if fitting:
+            best_key = min(fitting, key=lambda key: (len(groups[key]), key))
+            chosen = self._pick_within(groups[best_key], num_nodes, topology)
+        else:
+            chosen = []
+            for key in sorted(groups, key=lambda key: (-len(groups[key]), key)):
+                take = min(num_nodes - len(chosen), len(groups[key]))
+                chosen.extend(self._pick_within(groups[key], take, topology))
+                if len(chosen) == num_nodes:
+                    break
+
+        return self._rank_order(chosen, topology)
+
+    @staticmethod
+    def _pick_within(members: List[str], count: int, topology: NodeTopology) -> List[str]:
+        """Greedy: seed with the best connected member, add the node with the best weakest link."""
+        if count >= len(members) or not topology.bandwidth:
+            return members[:count]
+
+        def total_link(node_name):
+            return sum(topology.link(node_name, other) for other in members if other != node_name)
+
+        ## members are in name order and max keeps the first of equals, so ties go to the lowest name
+        chosen = [max(members, key=total_link)]
+        remaining = [node_name for node_name in members if node_name != chosen[0]]
+        while len(chosen) < count:
+            next_node = max(remaining, key=lambda node_name: min(topology.link(node_name, other) for other in chosen))
+            chosen.append(next_node)
+            remaining.remove(next_node)
+        return chosen
+
+    @staticmethod
+    def _rank_order(chosen: List[str], topology: NodeTopology) -> List[str]:
+        if len(chosen) <= 1:
+            return list(chosen)
+
+        group_size: Dict[str, int] = {}
+        for node_name in chosen:
+            group_size[topology.group_of(node_name)] = group_size.get(topology.group_of(node_name), 0) + 1
+
+        def connectivity(node_name: str) -> Tuple[float, int]:
+            return (sum(topology.link(node_name, other) for other in chosen if other != node_name),
+                    group_size[topology.group_of(node_name)])
+
+        rank0 = max(sorted(chosen), key=connectivity)
+        rest = sorted((node_name for node_name in chosen if node_name != rank0),
+                      key=lambda node_name: (topology.group_of(node_name) != topology.group_of(rank0),
+                                             topology.group_of(node_name), node_name))
+        return [rank0] + rest
+
+
+def build_allocator():
+    if NODE_ALLOCATOR == 'ordered':
+        return OrderedAllocator()
+    return TopologyAllocator()
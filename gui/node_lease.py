@@ -0,0 +1,202 @@
+import os
+import time
+import uuid
+import socket
+import threading
+from typing import Dict, Iterable, List, Set, Tuple
+
+from ddb_handler import DynamoDBHandler, TRANSACT_MAX_ITEMS
+
+
+# Lease table shared by every console of the cluster, lease_id (HASH) = "<cluster>/<node>".
+# Unset keeps reservations in this process only, as before.
+NODE_LEASE_TABLE = os.environ.get('NODE_LEASE_TABLE', '')
+# Seconds a lease is valid unless renewed; DynamoDB TTL cleans expired items up
+NODE_LEASE_TTL = int(os.environ.get('NODE_LEASE_TTL', 300))
+# Seconds a released lease keeps blocking other consoles, so their inventory snapshot
+# catches up with the tasks just started on the node (see NODE_INVENTORY_TTL)
+NODE_LEASE_SETTLE = int(os.environ.get('NODE_LEASE_SETTLE', 30))
+
+# lease purposes
+LEASE_ASSIGN = 'assign'
+LEASE_HEALTHCHECK = 'healthcheck'
+
+
+def _cluster_name() -> str:
+    return os.environ.get('CLUSTER_NAME', 'default-cluster')
+
+
+def _lease_id(node_name: str) -> str:
+    return f"{_cluster_name()}/{node_name}"
+
+
+class NodeLease:
+    """
+    Node reservations shared across console processes through NODE_LEASE_TABLE.
+
+    Each node has at most one lease item, taken with a compare-and-set write
+    that only succeeds when the node is unleased, its lease expired, or this
+    console already holds it. A job's nodes are acquired and released in one
+    transaction, so a job never holds part of its nodes. Held leases are
+    renewed by a heartbeat thread; leases of a console that died expire after
+    NODE_LEASE_TTL.
+    """
+    HOLDER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    # node name -> (purpose, job_id) of leases this console holds
+    _held: Dict[str, Tuple[str, str]] = {}
+    _lock = threading.Lock()
+    _heartbeat = None
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return bool(NODE_LEASE_TABLE)
+
+    @staticmethod
+    def create_table() -> bool:
+        return DynamoDBHandler.create_table_if_not_exists(NODE_LEASE_TABLE, 'lease_id', ttl_attribute='expires_at')
+
+    @staticmethod
+    def acquire(node_names: List[str], job_id: str, purpose: str = LEASE_ASSIGN) -> bool:
+        """
+        Lease all of `node_names` for `job_id`, or none of them.
+
+        Returns:
+            bool: True when every node is now leased by this console
+        """
+        if not NodeLease.is_enabled() or not node_names:
+            return True
+        if len(node_names) > TRANSACT_MAX_ITEMS:
+            raise ValueError(f"Cannot lease {len(node_names)} nodes in one transaction, at most {TRANSACT_MAX_ITEMS}")
+
+        now = int(time.time())
+        acquired = DynamoDBHandler.transact_write_items([
+            {
+                'Update': {
+                    'TableName': NODE_LEASE_TABLE,
+                    'Key': {'lease_id': _lease_id(node_name)},
+                    'UpdateExpression': "SET node_name = :n, cluster_name = :c, holder = :h, job_id = :j, "
+                                        "purpose = :p, acquired_at = :now, expires_at = :exp",
+                    'ConditionExpression': "attribute_not_exists(lease_id) OR expires_at < :now OR holder = :h",
+                    'ExpressionAttributeValues': {
+                        ':n': node_name, ':c': _cluster_name(), ':h': NodeLease.HOLDER_ID, ':j': job_id,
+                        ':p': purpose, ':now': now, ':exp': now + NODE_LEASE_TTL
+                    }
+                }
+            }
+            for node_name in node_names
+        ])
+        if not acquired:
+            print(f"NodeLease could not lease {node_names} for {job_id}, some are held by another console")
+            return False
+
+        with NodeLease._lock:
+            for node_name in node_names:
+                NodeLease._held[node_name] = (purpose, job_id)
+        NodeLease._ensure_heartbeat()
+        return True
+
+    @staticmethod
+    def release(node_names: List[str], purpose: str = LEASE_ASSIGN, settle: int = NODE_LEASE_SETTLE) -> None:
+        """
+        Release this console's `purpose` leases on `node_names`. The leases stay
+        valid for `settle` more seconds instead of being deleted, leases taken
+        over for another purpose (e.g. a health check lock) are left alone.
+        """
+        with NodeLease._lock:
+            node_names = [node_name for node_name in node_names
+                          if NodeLease._held.get(node_name, (None,))[0] == purpose]
+            for node_name in node_names:
+                NodeLease._held.pop(node_name, None)
+        if not NodeLease.is_enabled() or not node_names:
+            return
+
+        now = int(time.time())
+        for i in range(0, len(node_names), TRANSACT_MAX_ITEMS):
+            chunk = node_names[i:i + TRANSACT_MAX_ITEMS]
+            transact_items = [NodeLease._release_item(node_name, purpose, now + settle) for node_name in chunk]
+            if DynamoDBHandler.transact_write_items(transact_items):
+                continue
+            ## a lease expired and was taken by another console, release the rest one by one
+            for transact_item in transact_items:
+                DynamoDBHandler.transact_write_items([transact_item])
+
+    @staticmethod
+    def _release_item(node_name: str, purpose: str, expires_at: int) -> Dict:
+        return {
+            'Update': {
+                'TableName': NODE_LEASE_TABLE,
+                'Key': {'lease_id': _lease_id(node_name)},
+                'UpdateExpression': "SET expires_at = :exp",
+                'ConditionExpression': "holder = :h AND purpose = :p",
+                'ExpressionAttributeValues': {':exp': expires_at, ':h': NodeLease.HOLDER_ID, ':p': purpose}
+            }
+        }
+
+    @staticmethod
+    def release_job(job_id: str, purpose: str) -> None:
+        """Release this console's `purpose` leases taken for `job_id` only."""
+        with NodeLease._lock:
+            node_names = [node_name for node_name, held in NodeLease._held.items() if held == (purpose, job_id)]
+        NodeLease.release(node_names, purpose)
+
+    @staticmethod
+    def release_all(purpose: str) -> None:
+        with NodeLease._lock:
+            node_names = [node_name for node_name, (held_purpose, _) in NodeLease._held.items()
+                          if held_purpose == purpose]
+        NodeLease.release(node_names, purpose)
+
+    @staticmethod
+    def get_foreign_leased_node_names(node_names: Iterable[str]) -> Set[str]:
+        """
+        Those of `node_names` under an unexpired lease of another console.
+
+        Reads the candidates' lease items by key, so the cost follows the number
+        of candidates rather than the size of the lease table.
+        """
+        node_names = set(node_names)
+        if not NodeLease.is_enabled() or not node_names:
+            return set()
+
+        now = int(time.time())
+        items = DynamoDBHandler.batch_get_items(
+            NODE_LEASE_TABLE, [{'lease_id': _lease_id(node_name)} for node_name in sorted(node_names)]
+        )
+        return {
+            item['node_name'] for item in items
+            if item.get('expires_at', 0) > now and item.get('holder') != NodeLease.HOLDER_ID
+        }
+
+    @staticmethod
+    def _ensure_heartbeat() -> None:
+        with NodeLease._lock:
+            if NodeLease._heartbeat is not None:
+                return
+            NodeLease._heartbeat = threading.Thread(target=NodeLease._renew_loop, name='node-lease-heartbeat',
+                                                    daemon=True)
+            NodeLease._heartbeat.start()
+
+    @staticmethod
+    def _renew_loop() -> None:
+        while True:
+            time.sleep(NODE_LEASE_TTL / 3)
+            with NodeLease._lock:
+                held = dict(NodeLease._held)
+                if not held:
+                    NodeLease._heartbeat = None
+                    return
+
+            now = int(time.time())
+            for node_name, (purpose, job_id) in held.items():
+                renewed = DynamoDBHandler.update_item(
+                    table_name=NODE_LEASE_TABLE,
+                    key={'lease_id': _lease_id(node_name)},
+                    update_expression="SET expires_at = :exp",
+                    expression_values={':exp': now + NODE_LEASE_TTL, ':h': NodeLease.HOLDER_ID, ':p': purpose},
+                    condition_expression="holder = :h AND purpose = :p"
+                )
+                if not renewed:
+                    print(f"NodeLease lost the {purpose} lease on {node_name} for {job_id}")
+                    with NodeLease._lock:
+                        if NodeLease._held.get(node_name) == (purpose, job_id):
+                            NodeLease._held.pop(node_name)
@@ -1,11 +1,19 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Mapping, Optional
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
 import copy
 from file_manager import FileManager
 import os
 import datetime
+import threading
+import time
 import boto3
 from ddb_handler import DynamoDBHandler
+from client_manager import ClientManager
+from ecs_state_store import EcsStateStore
+from node_allocator import NODE_TOPOLOGY_ATTRIBUTE, NodeTopology, build_allocator, load_topology
+from node_lease import NodeLease, LEASE_ASSIGN, LEASE_HEALTHCHECK
 
 from enum import Enum, unique
 
@@ -17,8 +25,25 @@ class UserNodeStatus(Enum):
     UNKNOWN = "UNKNOWN"
 
 
+# describe_container_instances accepts at most 100 ARNs per call
+DESCRIBE_INSTANCES_BATCH_SIZE = 100
+NODE_REFRESH_WORKERS = int(os.environ.get('NODE_REFRESH_WORKERS', 8))
+# seconds an inventory snapshot is served before the next ECS sweep
+NODE_INVENTORY_TTL = float(os.environ.get('NODE_INVENTORY_TTL', 10))
+# with the event state store enabled, full ECS sweeps only run this often to heal missed events
+NODE_FULL_SYNC_INTERVAL = float(os.environ.get('NODE_FULL_SYNC_INTERVAL', 300))
+# allocation attempts when another console leases some of the chosen nodes first
+NODE_ASSIGN_ATTEMPTS = 3
 
-@dataclass
+
+def _gpu_count(resources) -> int:
+    for item in resources:
+        if item['name'] == 'GPU':
+            return len(item.get('stringSetValue', []))
+    return 0
+
+
+@dataclass(frozen=True, slots=True)
 class NodeInfo:
     name: str
     # ip: str
@@ -26,6 +51,34 @@ class NodeInfo:
     num_gpus: int = 8
     status: bool = False
     container_inst_id: str = ""
+    # value of the NODE_TOPOLOGY_ATTRIBUTE container instance attribute, if set
+    topology_group: str = ""
+
+
+def _node_address(node_name: str) -> str:
+    return '.'.join(node_name.split('-')[1:5])
+
+
+@dataclass(frozen=True)
+class NodeIndex:
+    """One inventory snapshot with its lookup indexes, swapped as a whole on refresh."""
+    nodes: Mapping[str, NodeInfo]
+    node_to_inst: Mapping[str, str]
+    inst_to_node: Mapping[str, str]
+    node_to_address: Mapping[str, str]
+
+    @staticmethod
+    def build(inventory: Dict[str, NodeInfo]) -> 'NodeIndex':
+        return NodeIndex(
+            nodes=MappingProxyType(inventory),
+            node_to_inst=MappingProxyType({
+                name: node.container_inst_id for name, node in inventory.items() if node.container_inst_id
+            }),
+            inst_to_node=MappingProxyType({
+                node.container_inst_id: name for name, node in inventory.items() if node.container_inst_id
+            }),
+            node_to_address=MappingProxyType({name: _node_address(name) for name in inventory}),
+        )
 
 
 def singleton(cls):
@@ -45,10 +98,10 @@ class NodeManager:
         self.node_ibdev_str = os.environ.get('IB_DEV_LIST', "mlx5_10,mlx5_11,mlx5_12,mlx5_13")
         self.node_names = os.environ.get('NODE_NAME_LIST', "A800_node001,A800_node002").split(',')
         self.cluster_name = os.environ.get('CLUSTER_NAME', 'default-cluster')
-        self.ecs_client = boto3.client('ecs')
         
         # Initialize STATIC node information from config
-        self.nodes = {
+        # self._index (self.nodes and its lookups) is an immutable snapshot, replaced as a whole on refresh
+        self._index = NodeIndex.build({
             name: NodeInfo(
                 name=name,
                 # ip=info['ip']
@@ -56,35 +109,90 @@ class NodeManager:
             )
             for name in self.node_names
             # for name, info in self.node_config.items()
-        }
-
-        # self.refresh_all_node_status()
+        })
+        self._inventory_lock = threading.Lock()
+        self._inventory_inflight = None
+        self._inventory_refreshed_at = None
+        self._last_full_sweep_at = None
+        self._applied_state_version = 0
+
+        # No ECS sweep here: spare_nodes is filled by the first refresh, on first use
         self.assigned_nodes = set()
         self.spare_nodes = set()
-        physical_available_node_names = self.get_physical_available_node_names()
-        self.spare_nodes.update(physical_available_node_names)
 
         self.healthcheck_locked_instances = set()
+        self.allocator = build_allocator()
+
+
+    @property
+    def ecs_client(self):
+        return ClientManager.get_client('ecs')
 
+    @property
+    def nodes(self) -> Mapping[str, NodeInfo]:
+        return self._index.nodes
 
-    def lock_healthcheck_instances(self, container_inst_ids):
-        self.healthcheck_locked_instances.update(container_inst_ids)
 
-    def unlock_healthcheck_instances(self, container_inst_ids):
-        self.healthcheck_locked_instances.difference_update(container_inst_ids)
+    ## Health check locks are also leased, so other consoles keep off the nodes between precheck and training
+    def lock_healthcheck_instances(self, container_inst_ids, job_id: str = ''):
+        with self._inventory_lock:
+            self.healthcheck_locked_instances.update(container_inst_ids)
+        node_names = [self.fetch_node_name(inst_id) for inst_id in container_inst_ids]
+        if not NodeLease.acquire([node_name for node_name in node_names if node_name], job_id, LEASE_HEALTHCHECK):
+            print(f"Health check lock of {node_names} is not shared, another console leases some of them")
+
+    def unlock_healthcheck_instances(self, container_inst_ids, job_id: Optional[str] = None):
+        """Unlock `container_inst_ids`; with `job_id` only the leases that job took are released."""
+        with self._inventory_lock:
+            self.healthcheck_locked_instances.difference_update(container_inst_ids)
+        if job_id is not None:
+            NodeLease.release_job(job_id, LEASE_HEALTHCHECK)
+            return
+        node_names = [self.fetch_node_name(inst_id) for inst_id in container_inst_ids]
+        NodeLease.release([node_name for node_name in node_names if node_name], LEASE_HEALTHCHECK)
 
     def clear_healthcheck_instances(self):
         # self.healthcheck_locked_instances.difference_update(container_inst_ids)
-        self.healthcheck_locked_instances.clear()
+        with self._inventory_lock:
+            self.healthcheck_locked_instances.clear()
+        NodeLease.release_all(LEASE_HEALTHCHECK)
 
     
     def get_physical_available_node_names(self) -> List[str]:
         self.refresh_all_node_status()
-        physical_available_node_names = list(filter(lambda key: self.nodes[key].status == True, self.nodes.keys()))
+        nodes = self.nodes
+        physical_available_node_names = list(filter(lambda key: nodes[key].status == True, nodes.keys()))
         return physical_available_node_names
 
 
-    def refresh_all_node_status(self):
+    def _describe_container_instances(self, container_instance_arns: List[str]) -> Dict[str, dict]:
+        """Describe instances in concurrent chunks of the API limit, indexed by ARN."""
+        chunks = [
+            container_instance_arns[i:i + DESCRIBE_INSTANCES_BATCH_SIZE]
+            for i in range(0, len(container_instance_arns), DESCRIBE_INSTANCES_BATCH_SIZE)
+        ]
+
+        def describe_chunk(chunk):
+            return self.ecs_client.describe_container_instances(
+                cluster=self.cluster_name,
+                containerInstances=chunk,
+                # include=['TAGS']  # Include tags in the response
+            )
+
+        with ThreadPoolExecutor(max_workers=max(1, min(NODE_REFRESH_WORKERS, len(chunks)))) as pool:
+            responses = list(pool.map(describe_chunk, chunks))
+
+        return {
+            container_instance['containerInstanceArn']: container_instance
+            for desp_response in responses
+            for container_instance in desp_response['containerInstances']
+        }
+
+
+    def _fetch_inventory(self) -> Dict[str, NodeInfo]:
+        """Full ECS list + describe sweep, returns a new node_name -> NodeInfo mapping."""
+        inventory = {name: NodeInfo(name=name) for name in self.node_names}
+
         container_instance_arns = []
         paginator = self.ecs_client.get_paginator('list_container_instances')
 
@@ -92,67 +200,146 @@ class NodeManager:
             container_instance_arns.extend(page['containerInstanceArns'])
 
         if container_instance_arns:
-            desp_response = self.ecs_client.describe_container_instances(
-                    cluster=self.cluster_name,
-                    containerInstances=container_instance_arns,
-                    # include=['TAGS']  # Include tags in the response
-                )
+            described_instances = self._describe_container_instances(container_instance_arns)
 
-            for i, inst_arn in enumerate(container_instance_arns):
-                container_instance_id = inst_arn.split('/')[-1]
-                node_name = None
-                
-                # 首先找到Node属性和对应的节点名称
-                for attrdict in desp_response['containerInstances'][i]['attributes']:
-                    if attrdict['name'] == 'Node':
-                        node_name = attrdict['value']
-                        break
-                
-                # 只有当节点名称在self.nodes中存在时才继续处理
-                # print(node_name)
-                if node_name and node_name in self.nodes.keys():
-                    # 更新container_instance_id
-                    self.nodes[node_name].container_inst_id = container_instance_id
-                    
-                    # 获取物理状态
-                    node_physical_status = desp_response['containerInstances'][i]['status']
-                    
-                    # 初始化GPU数量
-                    registered_gpu = 0
-                    remain_gpu = 0
-                    
-                    # 获取注册的GPU数量
-                    for item in desp_response['containerInstances'][i]['registeredResources']:
-                        if item['name'] == 'GPU':
-                            registered_gpu = len(item['stringSetValue'])
-                            self.nodes[node_name].num_gpus = registered_gpu
-                            break
-                    
-                    # 获取剩余的GPU数量
-                    for item in desp_response['containerInstances'][i]['remainingResources']:
-                        if item['name'] == 'GPU':
-                            remain_gpu = len(item['stringSetValue'])
-                            break
-                    
-                    # 判断节点是否可用
-                    node_usable = registered_gpu == remain_gpu and node_physical_status == 'ACTIVE'
-                    self.nodes[node_name].status = node_usable
-                    
-                    # 如果节点不可用，从spare_nodes中移除
-                    if not node_usable and node_name in self.spare_nodes:
-                        self.spare_nodes.remove(node_name)
-                    
-                    print(container_instance_id, node_name, node_physical_status, registered_gpu, remain_gpu, node_usable)
+            for inst_arn in container_instance_arns:
+                container_instance = described_instances.get(inst_arn)
+                if container_instance is None:
+                    continue
+
+                node_info = self._node_info_from_instance(container_instance, inventory)
+                if node_info is not None:
+                    inventory[node_info.name] = node_info
+
+        return inventory
+
+
+    def _node_info_from_instance(self, container_instance: dict, inventory: Mapping[str, NodeInfo]) -> Optional[NodeInfo]:
+        container_instance_id = container_instance['containerInstanceArn'].split('/')[-1]
+
+        # 首先找到Node属性和对应的节点名称
+        attributes = {attrdict['name']: attrdict.get('value') for attrdict in container_instance['attributes']}
+        node_name = attributes.get('Node')
+        
+        # 只有当节点名称在self.nodes中存在时才继续处理
+        if not node_name or node_name not in inventory:
+            return None
+
+        # 获取物理状态
+        node_physical_status = container_instance['status']
+        
+        # 获取注册的GPU数量和剩余的GPU数量
+        registered_gpu = _gpu_count(container_instance['registeredResources'])
+        remain_gpu = _gpu_count(container_instance['remainingResources'])
+        
+        # 判断节点是否可用
+        node_usable = registered_gpu == remain_gpu and node_physical_status == 'ACTIVE'
+
+        print(container_instance_id, node_name, node_physical_status, registered_gpu, remain_gpu, node_usable)
+
+        return NodeInfo(
+            name=node_name,
+            num_gpus=registered_gpu or inventory[node_name].num_gpus,
+            status=node_usable,
+            container_inst_id=container_instance_id,
+            topology_group=attributes.get(NODE_TOPOLOGY_ATTRIBUTE) or "",
+        )
+
+
+    def refresh_all_node_status(self, force: bool = False):
+        """
+        Refresh the node inventory snapshot if it is older than NODE_INVENTORY_TTL.
+
+        Concurrent callers share a single in-flight ECS sweep (single-flight),
+        so many Gradio sessions rendering at once cost one list + describe.
+        """
+        with self._inventory_lock:
+            if not force and self._is_inventory_fresh():
+                return
+            inflight = self._inventory_inflight
+            is_leader = inflight is None
+            if is_leader:
+                inflight = self._inventory_inflight = threading.Event()
+
+        if not is_leader:
+            inflight.wait()
+            return
+
+        try:
+            if (EcsStateStore.is_enabled() and self._last_full_sweep_at is not None
+                    and time.monotonic() - self._last_full_sweep_at < NODE_FULL_SYNC_INTERVAL):
+                EcsStateStore.sync()
+                inventory = self._apply_state_changes()
+            else:
+                EcsStateStore.sync()
+                self._applied_state_version = EcsStateStore.get_applied_version()
+                inventory = self._fetch_inventory()
+                self._last_full_sweep_at = time.monotonic()
+
+            index = NodeIndex.build(inventory)
+            with self._inventory_lock:
+                self._index = index
+                self._inventory_refreshed_at = time.monotonic()
+
+                # usable nodes not held by an assignment are spare again, e.g. once their job ended
+                self.spare_nodes.update(
+                    node_name for node_name, node in inventory.items()
+                    if node.status and node_name not in self.assigned_nodes
+                )
+                # 如果节点不可用，从spare_nodes中移除
+                self.spare_nodes.difference_update(
+                    node_name for node_name, node in inventory.items() if not node.status
+                )
+        finally:
+            with self._inventory_lock:
+                self._inventory_inflight = None
+            inflight.set()
 
         return
 
 
+    def _apply_state_changes(self) -> Dict[str, NodeInfo]:
+        """Build the next snapshot from container instance events newer than the last applied one."""
+        inventory = dict(self.nodes)
+        inst_to_node = {node.container_inst_id: name for name, node in inventory.items() if node.container_inst_id}
+
+        records, self._applied_state_version = EcsStateStore.get_instance_changes(self._applied_state_version)
+        for record in records:
+            node_name = record.get('node_name') or inst_to_node.get(record['resource_id'])
+            if node_name not in inventory:
+                continue
+
+            registered_gpu = int(record.get('registered_gpu', 0))
+            remain_gpu = int(record.get('remaining_gpu', 0))
+            inventory[node_name] = NodeInfo(
+                name=node_name,
+                num_gpus=registered_gpu or inventory[node_name].num_gpus,
+                status=registered_gpu == remain_gpu and record.get('status') == 'ACTIVE',
+                container_inst_id=record['resource_id'],
+                topology_group=inventory[node_name].topology_group,
+            )
+
+        return inventory
+
+
+    def _is_inventory_fresh(self) -> bool:
+        return (self._inventory_refreshed_at is not None
+                and time.monotonic() - self._inventory_refreshed_at < NODE_INVENTORY_TTL)
+
+
+    def invalidate_inventory(self) -> None:
+        """Drop the cached snapshot, called after tasks are launched or stopped."""
+        with self._inventory_lock:
+            self._inventory_refreshed_at = None
+
+
 
     ## Node assignment during node assignment
     ## release above temperary status
     def release_all_node_names(self) -> None:
+        NodeLease.release(list(self.assigned_nodes), LEASE_ASSIGN)
         self.assigned_nodes.clear()
-        self.healthcheck_lock_nodes.clear()
+        self.clear_healthcheck_instances()
         self.spare_nodes.clear()
         # self.refresh_all_node_status()
         # physical_available_node_names = self.get_physical_available_node_names()
@@ -161,19 +348,139 @@ class NodeManager:
 
 
     def assign_a_node_name(self) -> str:
-        node_name = self.spare_nodes.pop()
-        self.assigned_nodes.add(node_name)
-        # self.update_node_status(node_name, UserNodeStatus.ASSIGNED.value)
-        return node_name
+        return self.assign_node_names(1)[0]
+
+
+    def assign_node_names(self, num_nodes: int, job_id: str = '') -> List[str]:
+        """
+        Assign `num_nodes` spare nodes to one job, placed by self.allocator and
+        leased in NODE_LEASE_TABLE so other consoles cannot assign them too.
+
+        Returns:
+            List[str]: node names in rank order, the first one hosts rank 0
+        """
+        self.refresh_all_node_status()
+        topology = self.load_node_topology()
+
+        for _ in range(NODE_ASSIGN_ATTEMPTS):
+            spare_node_names = self.get_spare_node_names()
+            ## all or nothing: allocate raises when fewer than num_nodes are spare
+            with self._inventory_lock:
+                node_names = self.allocator.allocate(
+                    [node_name for node_name in spare_node_names if node_name in self.spare_nodes], num_nodes, topology
+                )
+                self.spare_nodes.difference_update(node_names)
+                self.assigned_nodes.update(node_names)
+
+            if NodeLease.acquire(node_names, job_id, LEASE_ASSIGN):
+                # self.update_node_status(node_name, UserNodeStatus.ASSIGNED.value)
+                return node_names
+
+            ## lost the race for some of them to another console, choose again without its leases
+            with self._inventory_lock:
+                self.assigned_nodes.difference_update(node_names)
+                self.spare_nodes.update(node_names)
+
+        raise RuntimeError(f"Could not lease {num_nodes} nodes after {NODE_ASSIGN_ATTEMPTS} attempts")
+
+
+    def reserve_node_names(self, node_names: List[str], job_id: str = '') -> bool:
+        """
+        Assign exactly `node_names`, e.g. a node about to get a warm standby, if all of
+        them are spare and not health check locked, and lease them like assign_node_names.
+        End the reservation with release_node_names.
+
+        Returns:
+            bool: True when every node is now assigned and leased to `job_id`
+        """
+        with self._inventory_lock:
+            locked_nodes = {self._index.inst_to_node.get(inst_id) for inst_id in self.healthcheck_locked_instances}
+            if not set(node_names) <= self.spare_nodes or locked_nodes & set(node_names):
+                return False
+            self.spare_nodes.difference_update(node_names)
+            self.assigned_nodes.update(node_names)
+
+        if NodeLease.acquire(node_names, job_id, LEASE_ASSIGN):
+            return True
+
+        with self._inventory_lock:
+            self.assigned_nodes.difference_update(node_names)
+            self.spare_nodes.update(node_names)
+        return False
+
+
+    def load_node_topology(self) -> NodeTopology:
+        """Topology of the current snapshot's nodes, see node_allocator.load_topology."""
+        index = self._index
+        return load_topology(
+            index.node_to_address,
+            {name: node.topology_group for name, node in index.nodes.items() if node.topology_group}
+        )
+
+
+    def get_spare_node_names(self) -> List[str]:
+        """
+        Spare nodes of the current snapshot, without those held for a job after
+        its health check or leased by another console.
+        """
+        ## refresh and assignment threads mutate these sets, iterate over copies
+        with self._inventory_lock:
+            node_to_inst = self._index.node_to_inst
+            spare_nodes = set(self.spare_nodes)
+            locked_instances = set(self.healthcheck_locked_instances)
+        foreign_leased = NodeLease.get_foreign_leased_node_names(spare_nodes)
+        return sorted(
+            node_name for node_name in spare_nodes
+            if node_to_inst.get(node_name) not in locked_instances
+            and node_name not in foreign_leased
+        )
+
+
+    def release_node_names(self, node_names: List[str]) -> None:
+        """
+        End the assignment of `node_names`, e.g. once their tasks are launched and
+        hold the GPUs. Nodes become spare again on a refresh that sees them usable,
+        their leases keep other consoles off for NODE_LEASE_SETTLE more seconds.
+        """
+        with self._inventory_lock:
+            self.assigned_nodes.difference_update(node_names)
+        NodeLease.release(node_names, LEASE_ASSIGN)
 
 
     def get_node_address(self, node_name):
-        return '.'.join(self.nodes.get(node_name).name.split('-')[1:5])
+        address = self._index.node_to_address.get(node_name)
+        return address if address is not None else _node_address(self.nodes.get(node_name).name)
+
+    def get_container_inst_id(self, node_name: str) -> Optional[str]:
+        return self._index.node_to_inst.get(node_name)
 
     def fetch_node_name(self, container_inst_id: str):
-        for node_name in self.nodes.keys():
-            if self.nodes[node_name].container_inst_id == container_inst_id:
-                return node_name
+        node_name = self._index.inst_to_node.get(container_inst_id)
+        if node_name is not None:
+            return node_name
+        return self._describe_single_instance(container_inst_id)
+
+    def _describe_single_instance(self, container_inst_id: str) -> Optional[str]:
+        """Index miss: describe just this instance and patch it into the current snapshot."""
+        try:
+            response = self.ecs_client.describe_container_instances(
+                cluster=self.cluster_name,
+                containerInstances=[container_inst_id],
+            )
+        except Exception as e:
+            print(f"NodeManager failed to describe container instance {container_inst_id}: {e}")
+            return None
+
+        for container_instance in response.get('containerInstances', []):
+            with self._inventory_lock:
+                inventory = dict(self._index.nodes)
+                node_info = self._node_info_from_instance(container_instance, inventory)
+                if node_info is None:
+                    continue
+                inventory[node_info.name] = node_info
+                self._index = NodeIndex.build(inventory)
+            return node_info.name
+
         return None
 
     def get_node_status_display(self) -> List[List[str]]:
@@ -181,15 +488,16 @@ class NodeManager:
     
         data = []
         physical_available_node_names = self.get_physical_available_node_names()
+        nodes = self.nodes
 
-        for node_name in self.nodes.keys():
+        for node_name in nodes.keys():
             is_avl = False
             if node_name in physical_available_node_names:
                 is_avl = True
             
             data.append([
                 node_name,
-                self.nodes[node_name].container_inst_id,
+                nodes[node_name].container_inst_id,
                 self.get_node_address(node_name),
                 f"✅ AVAILABLE" if is_avl else f"⬜ UNAVAILABLE"
             ])
@@ -0,0 +1,156 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Set
+
+from task_manager import TaskManager
+
+
+# Adaptive polling interval: reset to MIN whenever something changes, grow by
+# BACKOFF while all prechecks are still running, capped at MAX
+PRECHECK_POLL_MIN = float(os.environ.get('PRECHECK_POLL_MIN', 2))
+PRECHECK_POLL_MAX = float(os.environ.get('PRECHECK_POLL_MAX', 15))
+PRECHECK_POLL_BACKOFF = 1.5
+PRECHECK_TIMEOUT = float(os.environ.get('PRECHECK_TIMEOUT', 600))
+
+
+@dataclass
+class PrecheckWatch:
+    precheck_job_id: str
+    task_ids: List[str]
+    on_success: Callable[[], None]
+    on_failure: Callable[[str], None]
+    deadline: float
+    succeeded: Set[str] = field(default_factory=set)
+
+
+class PrecheckWatcher:
+    """
+    One shared background thread watching the tasks of every outstanding
+    precheck job.
+
+    Each round describes all pending precheck tasks together (up to 100 IDs
+    per describe-tasks call) and fires the job's callback on a small worker
+    pool as soon as its outcome is known.
+    """
+    _watches: Dict[str, PrecheckWatch] = {}
+    _lock = threading.Lock()
+    _wakeup = threading.Event()
+    _thread = None
+    _callback_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='precheck-callback')
+
+    @staticmethod
+    def watch(precheck_job_id: str,
+              task_ids: List[str],
+              on_success: Callable[[], None],
+              on_failure: Callable[[str], None],
+              timeout: float = PRECHECK_TIMEOUT) -> None:
+        """
+        Start watching a precheck job.
+
+        Args:
+            precheck_job_id: Job ID of the precheck
+            task_ids: ECS task IDs of the precheck
+            on_success: Called once every task stopped with exit code 0
+            on_failure: Called with a reason on the first failed task or on timeout
+            timeout: Seconds before the precheck is given up
+        """
+        with PrecheckWatcher._lock:
+            PrecheckWatcher._watches[precheck_job_id] = PrecheckWatch(
+                precheck_job_id=precheck_job_id,
+                task_ids=list(task_ids),
+                on_success=on_success,
+                on_failure=on_failure,
+                deadline=time.monotonic() + timeout
+            )
+            if PrecheckWatcher._thread is None or not PrecheckWatcher._thread.is_alive():
+                PrecheckWatcher._thread = threading.Thread(target=PrecheckWatcher._run,
+                                                           name='precheck-watcher',
+                                                           daemon=True)
+                PrecheckWatcher._thread.start()
+
+        PrecheckWatcher.notify()
+
+    @staticmethod
+    def notify() -> None:
+        """Wake the watcher for an immediate round, e.g. when a task state change is known."""
+        PrecheckWatcher._wakeup.set()
+
+    @staticmethod
+    def _run() -> None:
+        interval = PRECHECK_POLL_MIN
+
+        while True:
+            PrecheckWatcher._wakeup.wait(interval)
+            if PrecheckWatcher._wakeup.is_set():
+                PrecheckWatcher._wakeup.clear()
+                interval = PRECHECK_POLL_MIN
+
+            with PrecheckWatcher._lock:
+                watches = list(PrecheckWatcher._watches.values())
+            if not watches:
+                interval = PRECHECK_POLL_MAX
+                continue
+
+            try:
+                changed = PrecheckWatcher._poll_once(watches)
+            except Exception as e:
+                print(f"PrecheckWatcher polling error: {e}")
+                changed = False
+
+            interval = PRECHECK_POLL_MIN if changed else min(interval * PRECHECK_POLL_BACKOFF, PRECHECK_POLL_MAX)
+
+    @staticmethod
+    def _poll_once(watches: List[PrecheckWatch]) -> bool:
+        pending_task_ids = [
+            task_id for watch in watches for task_id in watch.task_ids if task_id not in watch.succeeded
+        ]
+        print(f"PrecheckWatcher polling {len(pending_task_ids)} tasks of {len(watches)} precheck jobs")
+        task_statuses = TaskManager.get_tasks_status(pending_task_ids)
+
+        changed = False
+        now = time.monotonic()
+        for watch in watches:
+            failures = []
+            for task_id in watch.task_ids:
+                if task_id in watch.succeeded or task_id not in task_statuses:
+                    continue
+                task_status = task_statuses[task_id]
+                if task_status['stop_status'] == 'SUCCESS':
+                    watch.succeeded.add(task_id)
+                    changed = True
+                elif task_status['stop_status'] == 'FAIL':
+                    failures.append(
+                        f"task {task_id} failed (exit codes {task_status['exit_codes']}, "
+                        f"{task_status['stopped_reason']})"
+                    )
+                elif task_status['stop_status'] == 'NO_TASK':
+                    ## ECS forgot the task, it stopped too long ago to tell whether it passed
+                    failures.append(f"task {task_id} is no longer known to ECS ({task_status['stopped_reason']})")
+
+            if failures:
+                PrecheckWatcher._finish(watch, watch.on_failure, '; '.join(failures))
+                changed = True
+            elif len(watch.succeeded) == len(set(watch.task_ids)):
+                PrecheckWatcher._finish(watch, watch.on_success)
+                changed = True
+            elif now > watch.deadline:
+                PrecheckWatcher._finish(watch, watch.on_failure, "timeout")
+                changed = True
+
+        return changed
+
+    @staticmethod
+    def _finish(watch: PrecheckWatch, callback, *args) -> None:
+        with PrecheckWatcher._lock:
+            PrecheckWatcher._watches.pop(watch.precheck_job_id, None)
+        PrecheckWatcher._callback_pool.submit(PrecheckWatcher._run_callback, watch, callback, *args)
+
+    @staticmethod
+    def _run_callback(watch: PrecheckWatch, callback, *args) -> None:
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"PrecheckWatcher callback for {watch.precheck_job_id} failed: {e}")
@@ -0,0 +1,87 @@
+import os
+import time
+import threading
+from typing import Any, Callable, Dict
+
+
+# Set CONSOLE_PROFILE_STARTUP=1 to print import / construction / first render timings.
+# Point AWS_ENDPOINT_URL at a local stub to profile without a real account.
+CONSOLE_PROFILE_STARTUP = os.environ.get('CONSOLE_PROFILE_STARTUP', '').lower() in ('1', 'true', 'yes')
+
+
+class StartupProfile:
+    """Named timings collected while the console starts, printed once it is up."""
+    _timings: Dict[str, float] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def record(name: str, seconds: float) -> None:
+        if not CONSOLE_PROFILE_STARTUP:
+            return
+        with StartupProfile._lock:
+            StartupProfile._timings[name] = StartupProfile._timings.get(name, 0.0) + seconds
+
+    @staticmethod
+    def report() -> str:
+        with StartupProfile._lock:
+            timings = dict(StartupProfile._timings)
+        lines = [f"  {name:<32} {seconds * 1000:8.1f} ms" for name, seconds in timings.items()]
+        return "Startup profile:\n" + "\n".join(lines)
+
+
+class Services:
+    """
+    Lazy, process wide instances of the console managers.
+
+    Each manager is constructed on first use and then shared, so opening the
+    console does no AWS work and launch clicks reuse the loaded templates.
+    Manager modules are imported inside the accessors, which keeps this
+    module free of import cycles and defers their import cost too.
+    """
+    _instances: Dict[str, Any] = {}
+    _lock = threading.RLock()
+
+    @staticmethod
+    def _get(name: str, factory: Callable[[], Any]) -> Any:
+        instance = Services._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with Services._lock:
+            instance = Services._instances.get(name)
+            if instance is None:
+                started_at = time.perf_counter()
+                instance = factory()
+                StartupProfile.record(f"construct {name}", time.perf_counter() - started_at)
+                Services._instances[name] = instance
+        return instance
+
+    @staticmethod
+    def task_manager():
+        from task_manager import TaskManager
+        return Services._get('task_manager', TaskManager)
+
+    @staticmethod
+    def node_manager():
+        from node_manager import NodeManager
+        return Services._get('node_manager', NodeManager)
+
+    @staticmethod
+    def job_manager():
+        from job_manager import JobManager
+        return Services._get('job_manager', JobManager)
+
+    @staticmethod
+    def health_manager():
+        from health_manager import HealthManager
+        return Services._get('health_manager', HealthManager)
+
+    @staticmethod
+    def cloudwatch_manager():
+        from cloudwatch_manager import CloudWatchManager
+        return Services._get('cloudwatch_manager', CloudWatchManager)
+
+    @staticmethod
+    def training_manager():
+        from training_manager import TrainingManager
+        return Services._get('training_manager', TrainingManager)
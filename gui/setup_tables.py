@@ -0,0 +1,70 @@
+"""
+Provision the DynamoDB tables and indexes the console reads, run once per cluster
+and again after an upgrade that adds an index (start_gui.sh runs it on every start,
+each step is a no-op when the table and its indexes already exist).
+
+    python gui/setup_tables.py                  # tables and indexes
+    python gui/setup_tables.py --backfill-jobs  # once, after adding the job time index
+"""
+import os
+import sys
+
+from ddb_handler import DynamoDBHandler
+from job_manager import JobManager
+from job_queue import JobQueue
+from node_lease import NodeLease
+from ecs_state_store import EcsStateStore
+from health_manager import HealthManager, HEALTH_HISTORY_TABLE
+
+
+def backfill_job_index_keys() -> int:
+    """
+    Give job rows written before the time ordered index its keys, so they show
+    up in get_latest_jobs. Scans the whole job table, run it once.
+
+    Returns:
+        int: number of rows updated
+    """
+    table_name = os.environ['JOB_MANAGE_TABLE']
+    updated = 0
+    for job in DynamoDBHandler.iter_scan(table_name):
+        if job.get('created_at') and job.get('cluster_name'):
+            continue
+        created_at = job.get('created_at') or job.get('updated_at') or job.get('job_timestamp', '')
+        if DynamoDBHandler.update_item(
+            table_name=table_name,
+            key={'job_id': job['job_id']},
+            update_expression="SET created_at = :t, cluster_name = if_not_exists(cluster_name, :c)",
+            expression_values={':t': created_at, ':c': os.environ['CLUSTER_NAME']}
+        ):
+            updated += 1
+    return updated
+
+
+def setup_tables() -> bool:
+    """Create every configured table, or add what is missing to existing ones."""
+    steps = [('JOB_MANAGE_TABLE', JobManager.create_job_table)]
+    if JobQueue.is_persistent():
+        steps.append(('JOB_QUEUE_TABLE', JobQueue.create_table))
+    if NodeLease.is_enabled():
+        steps.append(('NODE_LEASE_TABLE', NodeLease.create_table))
+    if EcsStateStore.is_enabled():
+        steps.append(('ECS_STATE_TABLE', EcsStateStore.create_table))
+    if HEALTH_HISTORY_TABLE:
+        steps.append(('HEALTH_HISTORY_TABLE', HealthManager.create_health_history_table))
+
+    ok = True
+    for env_name, create in steps:
+        if create():
+            print(f"{env_name} ready")
+        else:
+            print(f"{env_name} could not be provisioned")
+            ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    ok = setup_tables()
+    if ok and '--backfill-jobs' in sys.argv[1:]:
+        print(f"Backfilled {backfill_job_index_keys()} job rows into the time ordered index")
+    sys.exit(0 if ok else 1)
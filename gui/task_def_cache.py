@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from client_manager import ClientManager
+
+
+TASK_DEF_CACHE_PATH = os.environ.get(
+    'TASK_DEF_CACHE_PATH', os.path.expanduser('~/.cache/hybrid-gpu-console/task_def_cache.json')
+)
+# Seconds a cached ARN is trusted before it is checked to still be ACTIVE
+TASK_DEF_CACHE_VERIFY_TTL = float(os.environ.get('TASK_DEF_CACHE_VERIFY_TTL', 3600))
+TASK_DEF_CACHE_MAX_ENTRIES = 1000
+
+
+def canonical_task_def_hash(task_def: Dict[str, Any]) -> str:
+    """sha256 of the task definition serialized with sorted keys and no whitespace."""
+    canonical = json.dumps(task_def, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class TaskDefCache:
+    """
+    Content addressed cache of registered task definitions, persisted to
+    TASK_DEF_CACHE_PATH.
+
+    A definition whose canonical JSON was registered before reuses that
+    revision's ARN instead of creating a new revision. Cached ARNs are
+    verified against ECS lazily, once per TASK_DEF_CACHE_VERIFY_TTL, and
+    dropped when the revision is no longer ACTIVE.
+    """
+    # content hash -> {'arn', 'family', 'verified_at'}
+    _entries: Optional[Dict[str, Dict[str, Any]]] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _load() -> Dict[str, Dict[str, Any]]:
+        if TaskDefCache._entries is None:
+            try:
+                with open(TASK_DEF_CACHE_PATH, 'r') as f:
+                    TaskDefCache._entries = json.load(f)
+            except FileNotFoundError:
+                TaskDefCache._entries = {}
+            except (OSError, ValueError) as e:
+                print(f"TaskDefCache ignoring unreadable {TASK_DEF_CACHE_PATH}: {e}")
+                TaskDefCache._entries = {}
+        return TaskDefCache._entries
+
+    @staticmethod
+    def _save() -> None:
+        entries = TaskDefCache._entries
+        if len(entries) > TASK_DEF_CACHE_MAX_ENTRIES:
+            newest = sorted(entries.items(), key=lambda item: item[1]['verified_at'])[-TASK_DEF_CACHE_MAX_ENTRIES:]
+            TaskDefCache._entries = entries = dict(newest)
+
+        try:
+            os.makedirs(os.path.dirname(TASK_DEF_CACHE_PATH), exist_ok=True)
+            tmp_path = f"{TASK_DEF_CACHE_PATH}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(entries, f, indent=2)
+            os.replace(tmp_path, TASK_DEF_CACHE_PATH)
+        except OSError as e:
+            print(f"TaskDefCache failed to persist {TASK_DEF_CACHE_PATH}: {e}")
+
+    @staticmethod
+    def _is_active(task_def_arn: str) -> bool:
+        try:
+            response = ClientManager.get_client('ecs').describe_task_definition(taskDefinition=task_def_arn)
+            return response['taskDefinition'].get('status') == 'ACTIVE'
+        except Exception as e:
+            print(f"TaskDefCache could not verify {task_def_arn}: {e}")
+            return False
+
+    @staticmethod
+    def lookup(content_hash: str) -> Optional[str]:
+        """
+        ARN registered for this content, or None when unknown or no longer ACTIVE.
+        """
+        with TaskDefCache._lock:
+            entry = TaskDefCache._load().get(content_hash)
+        if entry is None:
+            return None
+
+        if time.time() - entry['verified_at'] < TASK_DEF_CACHE_VERIFY_TTL:
+            return entry['arn']
+
+        active = TaskDefCache._is_active(entry['arn'])
+        with TaskDefCache._lock:
+            entries = TaskDefCache._load()
+            if active:
+                entries[content_hash] = dict(entry, verified_at=time.time())
+            else:
+                entries.pop(content_hash, None)
+            TaskDefCache._save()
+        return entry['arn'] if active else None
+
+    @staticmethod
+    def store(content_hash: str, task_def_arn: str, family: str) -> None:
+        with TaskDefCache._lock:
+            TaskDefCache._load()[content_hash] = {
+                'arn': task_def_arn,
+                'family': family,
+                'verified_at': time.time()
+            }
+            TaskDefCache._save()
+
+    @staticmethod
+    def invalidate(task_def: Dict[str, Any]) -> None:
+        """Forget the ARN cached for this content, e.g. after ECS rejected it as deregistered."""
+        with TaskDefCache._lock:
+            if TaskDefCache._load().pop(canonical_task_def_hash(task_def), None) is not None:
+                TaskDefCache._save()
+
+    @staticmethod
+    def register(task_def: Dict[str, Any], register_fn) -> Tuple[str, bool]:
+        """
+        Return the ARN of a revision with exactly this content, registering
+        one through `register_fn(task_def) -> arn` only when none is cached.
+
+        Returns:
+            Tuple[str, bool]: (task definition ARN, whether it was reused)
+        """
+        content_hash = canonical_task_def_hash(task_def)
+        task_def_arn = TaskDefCache.lookup(content_hash)
+        if task_def_arn is not None:
+            print(f"TaskDefCache reusing {task_def_arn} for content {content_hash[:12]}")
+            return task_def_arn, True
+
+        task_def_arn = register_fn(task_def)
+        TaskDefCache.store(content_hash, task_def_arn, task_def.get('family', ''))
+        return task_def_arn, False
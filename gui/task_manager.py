@@ -1,29 +1,35 @@
 from typing import Dict, Any, List
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
-import subprocess
 import json
+import shlex
+import time
 
 from file_manager import FileManager
 from ddb_handler import DynamoDBHandler
 from node_manager import NodeManager
+from client_manager import ClientManager
+from task_def_cache import TaskDefCache, canonical_task_def_hash
 
 from datetime import datetime
 import boto3
+from botocore.exceptions import ClientError
 
 
-def _run_aws_cli(cmd):
+def _run_ecs_api(cmd, operation, **kwargs):
+    """
+    Call an ECS API through the shared in-process client.
+
+    `cmd` is the equivalent aws CLI command, kept for logging and for the
+    execution_history.sh audit trail.
+    """
     cmdstr = ' '.join(cmd)
     print(f"TaskManager Executing: {cmdstr}")
-    
-    result = subprocess.run(
-        cmd,
-        capture_output=True,
-        text=True,
-        check=True  # This will raise CalledProcessError if the command fails
-    )
-    
-    # Parse the JSON output
-    response = json.loads(result.stdout)
+
+    ecs_client = ClientManager.get_client('ecs')
+    response = getattr(ecs_client, operation)(**kwargs)
+    response.pop('ResponseMetadata', None)
 
     print(f"TaskManager Execution Result: {response}")
 
@@ -33,13 +39,126 @@ def _run_aws_cli(cmd):
 def _get_arn_id(arn):
     return arn.split('/')[-1]
 
-session = boto3.Session()
-region = session.region_name
-print(f"Get Default AWS REGION from configure {region}")
-if region.startswith('cn-'):
-    LAUNCH_TYPE = 'EXTERNAL'
-else:
-    LAUNCH_TYPE = 'EC2'
+
+def _classify_stop_status(task):
+    # First check if the task is actually stopped
+    if task.get('lastStatus') != 'STOPPED':
+        return "RUNNING"
+
+    # Check containers for exit codes
+    for container in task.get('containers', []):
+        exit_code = container.get('exitCode')
+        if exit_code is None or exit_code != 0:
+            return 'FAIL'
+
+    return 'SUCCESS'
+
+
+def _summarize_task(task):
+    return {
+        'last_status': task.get('lastStatus'),
+        'desired_status': task.get('desiredStatus'),
+        'running': task.get('lastStatus') == 'RUNNING' and task.get('desiredStatus') == 'RUNNING',
+        'stop_status': _classify_stop_status(task),
+        'stop_code': task.get('stopCode'),
+        'stopped_reason': task.get('stoppedReason'),
+        'stopped_at': task.get('stoppedAt'),
+        'exit_codes': {c.get('name'): c.get('exitCode') for c in task.get('containers', [])},
+        'container_reasons': {c.get('name'): c['reason'] for c in task.get('containers', []) if c.get('reason')},
+    }
+
+
+def _missing_task_status(reason=None):
+    return {
+        'last_status': None,
+        'desired_status': None,
+        'running': False,
+        'stop_status': 'NO_TASK',
+        'stop_code': None,
+        'stopped_reason': reason,
+        'stopped_at': None,
+        'exit_codes': {},
+        'container_reasons': {},
+    }
+
+
+def _is_stale_task_def_error(error):
+    """ECS rejecting a launch because its task definition revision is gone (deregistered / INACTIVE)."""
+    if not isinstance(error, ClientError) or error.response['Error']['Code'] != 'ClientException':
+        return False
+    message = error.response['Error'].get('Message', '').lower().replace(' ', '')
+    return 'taskdefinition' in message
+
+
+def _chunked(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _parse_launched_tasks(exec_result):
+    return [
+        (_get_arn_id(task['taskArn']), _get_arn_id(task['clusterArn']), _get_arn_id(task['containerInstanceArn']))
+        for task in exec_result.get('tasks', [])
+    ]
+
+_launch_type = None
+
+
+def get_launch_type():
+    """EXTERNAL in China regions (ECS Anywhere), EC2 elsewhere; resolved on first launch."""
+    global _launch_type
+    if _launch_type is None:
+        region = boto3.Session().region_name
+        print(f"Get Default AWS REGION from configure {region}")
+        _launch_type = 'EXTERNAL' if region and region.startswith('cn-') else 'EC2'
+    return _launch_type
+
+TASK_LAUNCH_WORKERS = int(os.environ.get('TASK_LAUNCH_WORKERS', 8))
+# 'batched' packs up to 10 tasks per run-task/start-task call, 'fanout' issues one call per node
+TASK_LAUNCH_MODE = os.environ.get('TASK_LAUNCH_MODE', 'batched')
+ECS_MAX_TASKS_PER_CALL = 10
+ECS_MAX_DESCRIBE_TASKS = 100
+TASK_STOP_POLL_INTERVAL = float(os.environ.get('TASK_STOP_POLL_INTERVAL', 2))
+# 'file' registers the generated task_def json of every job, 'overrides' launches a
+# canonical pre-registered definition and passes the job's command/env as containerOverrides
+TASK_DEF_MODE = os.environ.get('TASK_DEF_MODE', 'file')
+
+
+@dataclass
+class LaunchReport:
+    # seconds spent in each launch phase: register, launch, record
+    timings: Dict[str, float] = field(default_factory=dict)
+    # task items not yet written, see JobManager.gather_task_and_record_job
+    task_records: List[Dict[str, Any]] = field(default_factory=list)
+    # 'cold' for new tasks, 'warm' when the job was handed to warm pool standbys
+    launch_mode: str = 'cold'
+
+    def format_timings(self) -> str:
+        return ', '.join(f"{phase} {seconds:.2f}s" for phase, seconds in self.timings.items())
+
+
+@dataclass
+class TaskLaunchSpec:
+    """
+    A launch on a canonical task definition: everything job specific travels
+    in containerOverrides. portMappings cannot be overridden, so the canonical
+    definition is per master port (with networkMode host they only reserve the port).
+    """
+    task_def: Dict[str, Any]
+    container_name: str
+    command: List[str]
+    environment: Dict[str, str] = field(default_factory=dict)
+    is_training: bool = True
+
+    def overrides(self) -> Dict[str, Any]:
+        container_override = {'name': self.container_name, 'command': list(self.command)}
+        if self.environment:
+            container_override['environment'] = [
+                {'name': name, 'value': str(value)} for name, value in self.environment.items()
+            ]
+        return {'containerOverrides': [container_override]}
+
+    def __str__(self) -> str:
+        return f"{self.task_def.get('family')} with command override {' '.join(self.command)}"
 
 
 class TaskManager:
@@ -62,63 +181,148 @@ class TaskManager:
 
     @staticmethod
     def task_register(task_def_path):
+        """
+        Register the task definition at `task_def_path`, reusing the ARN of an
+        ACTIVE revision with identical content when TaskDefCache knows one.
+
+        Returns:
+            tuple: (task definition ARN, command for the execution history;
+                    a `#` comment when the revision was reused)
+        """
         reg_task_cmd = [
             'aws', 'ecs', 'register-task-definition',
             '--cli-input-json', f'file://{task_def_path}',
             '--output', 'json'
         ]
-        
-        reg_result = _run_aws_cli(reg_task_cmd)
 
-        return reg_result['taskDefinition']['taskDefinitionArn'], reg_task_cmd
+        return TaskManager._register_cached(FileManager.load_json(task_def_path), reg_task_cmd, task_def_path)
 
 
+    @staticmethod
+    def task_register_spec(launch_spec):
+        """Register (or reuse) the canonical definition of a TaskLaunchSpec, without writing a file."""
+        reg_task_cmd = [
+            'aws', 'ecs', 'register-task-definition',
+            '--cli-input-json', shlex.quote(json.dumps(launch_spec.task_def, separators=(',', ':'))),
+            '--output', 'json'
+        ]
+        return TaskManager._register_cached(launch_spec.task_def, reg_task_cmd, launch_spec.task_def.get('family'))
+
+
+    @staticmethod
+    def _register_cached(task_def, reg_task_cmd, source):
+        def register(task_def):
+            reg_result = _run_ecs_api(reg_task_cmd, 'register_task_definition', **task_def)
+            return reg_result['taskDefinition']['taskDefinitionArn']
+
+        task_def_arn, reused = TaskDefCache.register(task_def, register)
+        if reused:
+            reg_task_cmd = [
+                '#', 'reused', task_def_arn, 'for', source,
+                f'(content sha256 {canonical_task_def_hash(task_def)})'
+            ]
+
+        return task_def_arn, reg_task_cmd
+
 
     @staticmethod
-    def task_exec(task_def_arn, is_training):
+    def forget_stale_task_def(error, task_def):
+        """
+        Drop `task_def` from TaskDefCache when `error` says its cached revision is
+        gone, so the next registration creates a new one.
+
+        Returns:
+            bool: True when the cache entry was dropped
+        """
+        if not _is_stale_task_def_error(error):
+            return False
+        print(f"TaskManager dropping cached task definition {task_def.get('family')}: {error}")
+        TaskDefCache.invalidate(task_def)
+        return True
+
+
+
+    @staticmethod
+    def _run_task_request(task_def_arn, is_training, count=1, overrides=None):
+
+        run_task_kwargs = {
+            'cluster': os.environ['CLUSTER_NAME'],
+            'taskDefinition': task_def_arn,
+            'count': count,
+            'launchType': get_launch_type(),
+        }
 
         if is_training:
             exec_task_cmd = [
                 'aws', 'ecs', 'run-task',
                 '--cluster', os.environ['CLUSTER_NAME'],
                 '--task-definition', task_def_arn,
-                '--count', '1',
-                '--launch-type', LAUNCH_TYPE,
+                '--count', str(count),
+                '--launch-type', get_launch_type(),
                 '--tag', 'key=jobtype,value=training_job',
                 '--output', 'json'
             ]
+            run_task_kwargs['tags'] = [{'key': 'jobtype', 'value': 'training_job'}]
         else:
             exec_task_cmd = [
                 'aws', 'ecs', 'run-task',
                 '--cluster', os.environ['CLUSTER_NAME'],
                 '--task-definition', task_def_arn,
-                '--count', '1',
-                '--launch-type', LAUNCH_TYPE,
+                '--count', str(count),
+                '--launch-type', get_launch_type(),
                 '--output', 'json'
             ]
 
-        exec_result = _run_aws_cli(exec_task_cmd)
-        
-        task_id = _get_arn_id(exec_result['tasks'][0]['taskArn'])
-        # task_def_arn = _get_arn_id(exec_result['tasks'][0]['taskDefinitionArn'])
-        cluster_name = _get_arn_id(exec_result['tasks'][0]['clusterArn'])
-        container_inst_id = _get_arn_id(exec_result['tasks'][0]['containerInstanceArn'])
+        if overrides:
+            exec_task_cmd[-2:-2] = ['--overrides', shlex.quote(json.dumps(overrides))]
+            run_task_kwargs['overrides'] = overrides
+
+        exec_result = _run_ecs_api(exec_task_cmd, 'run_task', **run_task_kwargs)
+
+        return exec_result, exec_task_cmd
 
-        return task_id, cluster_name, container_inst_id, exec_result, exec_task_cmd
 
-    
     @staticmethod
-    def task_start(task_def_arn, container_inst_id):
+    def _start_task_request(task_def_arn, container_inst_ids, overrides=None):
         exec_task_cmd = [
             'aws', 'ecs', 'start-task',
             '--cluster', os.environ['CLUSTER_NAME'],
             '--task-definition', task_def_arn,
-            '--container-instances', container_inst_id,
+            '--container-instances', *container_inst_ids,
             '--tag', 'key=jobtype,value=training_job',
             '--output', 'json'
         ]
+        start_task_kwargs = {
+            'cluster': os.environ['CLUSTER_NAME'],
+            'taskDefinition': task_def_arn,
+            'containerInstances': list(container_inst_ids),
+            'tags': [{'key': 'jobtype', 'value': 'training_job'}]
+        }
+        if overrides:
+            exec_task_cmd[-2:-2] = ['--overrides', shlex.quote(json.dumps(overrides))]
+            start_task_kwargs['overrides'] = overrides
+
+        exec_result = _run_ecs_api(exec_task_cmd, 'start_task', **start_task_kwargs)
+
+        return exec_result, exec_task_cmd
+
+
+    @staticmethod
+    def task_exec(task_def_arn, is_training, overrides=None):
+
+        exec_result, exec_task_cmd = TaskManager._run_task_request(task_def_arn, is_training, overrides=overrides)
+        
+        task_id = _get_arn_id(exec_result['tasks'][0]['taskArn'])
+        # task_def_arn = _get_arn_id(exec_result['tasks'][0]['taskDefinitionArn'])
+        cluster_name = _get_arn_id(exec_result['tasks'][0]['clusterArn'])
+        container_inst_id = _get_arn_id(exec_result['tasks'][0]['containerInstanceArn'])
 
-        exec_result = _run_aws_cli(exec_task_cmd)
+        return task_id, cluster_name, container_inst_id, exec_result, exec_task_cmd
+
+    
+    @staticmethod
+    def task_start(task_def_arn, container_inst_id, overrides=None):
+        exec_result, exec_task_cmd = TaskManager._start_task_request(task_def_arn, [container_inst_id], overrides)
         
         task_id = _get_arn_id(exec_result['tasks'][0]['taskArn'])
         # task_def_arn = _get_arn_id(exec_result['tasks'][0]['taskDefinitionArn'])
@@ -129,7 +333,33 @@ class TaskManager:
 
 
     @staticmethod
-    def record_task_to_ddb(task_id,
+    def task_exec_batch(task_def_arn, is_training, count, overrides=None):
+        """
+        Launch up to ECS_MAX_TASKS_PER_CALL tasks with a single run-task call.
+
+        Returns:
+            list of (task_id, cluster_name, container_inst_id) actually placed,
+            which can be shorter than `count`, and the CLI command for history
+        """
+        exec_result, exec_task_cmd = TaskManager._run_task_request(task_def_arn, is_training, count, overrides)
+        for failure in exec_result.get('failures', []):
+            print(f"TaskManager run-task placement failure: {failure}")
+
+        return _parse_launched_tasks(exec_result), exec_task_cmd
+
+
+    @staticmethod
+    def task_start_batch(task_def_arn, container_inst_ids, overrides=None):
+        """Start one task on each of up to ECS_MAX_TASKS_PER_CALL container instances."""
+        exec_result, exec_task_cmd = TaskManager._start_task_request(task_def_arn, container_inst_ids, overrides)
+        for failure in exec_result.get('failures', []):
+            print(f"TaskManager start-task failure: {failure}")
+
+        return _parse_launched_tasks(exec_result), exec_task_cmd
+
+
+    @staticmethod
+    def build_task_record(task_id,
                         node_name_orchestrated,
                         node_index,
                         job_id,
@@ -140,35 +370,161 @@ class TaskManager:
                         container_inst_id,
                         # reg_result,
                            ):
+        return {
+            'ecs_task_id': task_id,
+            'node_name': node_name_orchestrated,
+            'node_index_in_job': node_index, #Decimal(rank),
+            'job_id': job_id,
+            'job_timestamp': job_timestamp,
+            'job_num_nodes': nnodes, #Decimal(nnodes),
+            'task_def_arn': task_def_arn,
+            'task_def_name': task_def_arn.split(':')[0],
+            'task_def_revision': task_def_arn.split(':')[-1],
+            'cluster_name': cluster_name,
+            'container_inst_id': container_inst_id,
+            # 'retry': 0,
+            # 'task_status': 'IN_PROGRESS',
+            'updated_at': datetime.now().isoformat(),
+            'created_at': datetime.now().isoformat(),
+            # 'metadata': _convert_floats_to_decimal({
+            #     'task_reg_result': reg_result,
+            #     'task_exec_result': exec_result
+            # })
+        }
+
+
+    @staticmethod
+    def record_task_to_ddb(**task_fields):
         task_ddb_table_name = os.environ.get('TASK_MANAGE_TABLE')
 
         resp = DynamoDBHandler.write_item(table_name = task_ddb_table_name,
-                                    item = {
-                                    'ecs_task_id': task_id,
-                                    'node_name': node_name_orchestrated,
-                                    'node_index_in_job': node_index, #Decimal(rank),
-                                    'job_id': job_id,
-                                    'job_timestamp': job_timestamp,
-                                    'job_num_nodes': nnodes, #Decimal(nnodes),
-                                    'task_def_arn': task_def_arn,
-                                    'task_def_name': task_def_arn.split(':')[0],
-                                    'task_def_revision': task_def_arn.split(':')[-1],
-                                    'cluster_name': cluster_name,
-                                    'container_inst_id': container_inst_id,
-                                    # 'retry': 0,
-                                    # 'task_status': 'IN_PROGRESS',
-                                    'updated_at': datetime.now().isoformat(),
-                                    'created_at': datetime.now().isoformat(),
-                                    # 'metadata': _convert_floats_to_decimal({
-                                    #     'task_reg_result': reg_result,
-                                    #     'task_exec_result': exec_result
-                                    # })
-                                }
-                            )
+                                          item = TaskManager.build_task_record(**task_fields))
         
         print('TaskManager Record Task to DDB Response: ', resp)
 
 
+    @staticmethod
+    def _launch_node_task(task_def_arn, is_training, container_inst_id=None, overrides=None):
+        if container_inst_id is None:
+            return TaskManager.task_exec(task_def_arn, is_training, overrides)
+        return TaskManager.task_start(task_def_arn, container_inst_id, overrides)
+
+
+    @staticmethod
+    def _launch_tasks_fanout(task_def_arn, is_training, num_nodes, container_instance_ids=None, overrides=None):
+        """
+        One run-task / start-task call per node through the worker pool.
+
+        Returns:
+            launched (task_id, cluster_name, container_inst_id) in rank order,
+            CLI commands for history, and the launch errors
+        """
+        launched = [None] * num_nodes
+        exec_task_cmds = [None] * num_nodes
+        launch_errors = []
+        max_workers = max(1, min(TASK_LAUNCH_WORKERS, num_nodes))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(TaskManager._launch_node_task,
+                            task_def_arn,
+                            is_training,
+                            None if container_instance_ids is None else container_instance_ids[nodei],
+                            overrides): nodei
+                for nodei in range(num_nodes)
+            }
+            for future in as_completed(futures):
+                nodei = futures[future]
+                try:
+                    task_id, cluster_name, container_inst_id, _, exec_task_cmd = future.result()
+                    launched[nodei] = (task_id, cluster_name, container_inst_id)
+                    exec_task_cmds[nodei] = exec_task_cmd
+                except Exception as e:
+                    print(f"TaskManager failed to launch task for node index {nodei}: {e}")
+                    launch_errors.append(e)
+
+        launched = [result for result in launched if result is not None]
+        exec_task_cmds = [cmd for cmd in exec_task_cmds if cmd is not None]
+        return launched, exec_task_cmds, launch_errors
+
+
+    @staticmethod
+    def _launch_tasks_batched(task_def_arn, is_training, num_nodes, container_instance_ids=None, overrides=None):
+        """
+        Pack launches into run-task --count / start-task calls of up to
+        ECS_MAX_TASKS_PER_CALL tasks, then fall back to per-instance start-task
+        for the nodes ECS could not place.
+
+        Returns the same shape as _launch_tasks_fanout.
+        """
+        if container_instance_ids is not None:
+            batch_requests = [
+                (TaskManager.task_start_batch, (task_def_arn, chunk, overrides))
+                for chunk in _chunked(list(container_instance_ids[:num_nodes]), ECS_MAX_TASKS_PER_CALL)
+            ]
+        else:
+            batch_requests = [
+                (TaskManager.task_exec_batch, (task_def_arn, is_training, len(chunk), overrides))
+                for chunk in _chunked(list(range(num_nodes)), ECS_MAX_TASKS_PER_CALL)
+            ]
+
+        launched = []
+        exec_task_cmds = []
+        batch_errors = []
+        max_workers = max(1, min(TASK_LAUNCH_WORKERS, len(batch_requests)))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(batch_fn, *batch_args) for batch_fn, batch_args in batch_requests]
+            for future in futures:
+                try:
+                    batch_launched, exec_task_cmd = future.result()
+                    launched.extend(batch_launched)
+                    exec_task_cmds.append(exec_task_cmd)
+                except Exception as e:
+                    print(f"TaskManager batched launch failed: {e}")
+                    batch_errors.append(e)
+
+        ## Fall back to per-instance start-task only for the missing nodes
+        used_inst_ids = {container_inst_id for _, _, container_inst_id in launched}
+        if container_instance_ids is not None:
+            missing_inst_ids = [inst_id for inst_id in container_instance_ids[:num_nodes] if inst_id not in used_inst_ids]
+        elif len(launched) < num_nodes:
+            node_manager = NodeManager()
+            spare_inst_ids = [node_manager.nodes[node_name].container_inst_id
+                              for node_name in node_manager.get_physical_available_node_names()]
+            missing_inst_ids = [inst_id for inst_id in spare_inst_ids
+                                if inst_id and inst_id not in used_inst_ids][:num_nodes - len(launched)]
+        else:
+            missing_inst_ids = []
+
+        if missing_inst_ids:
+            print(f"TaskManager falling back to start-task on {len(missing_inst_ids)} container instances")
+            fallback_launched, fallback_cmds, _ = TaskManager._launch_tasks_fanout(
+                task_def_arn, is_training, len(missing_inst_ids), missing_inst_ids, overrides
+            )
+            launched.extend(fallback_launched)
+            exec_task_cmds.extend(fallback_cmds)
+
+        launch_errors = []
+        if len(launched) < num_nodes:
+            launch_errors.append(RuntimeError(f"only {len(launched)} of {num_nodes} tasks could be placed"))
+            launch_errors.extend(batch_errors)
+
+        if container_instance_ids is not None:
+            rank_of_inst = {inst_id: rank for rank, inst_id in enumerate(container_instance_ids)}
+            launched.sort(key=lambda result: rank_of_inst.get(result[2], len(rank_of_inst)))
+
+        return launched, exec_task_cmds, launch_errors
+
+
+    @staticmethod
+    def stop_launched_tasks(task_ids):
+        """Best effort rollback of tasks already launched for a failed job."""
+        for task_id, error in TaskManager.stop_tasks(task_ids).items():
+            if error is not None:
+                print(f"TaskManager failed to stop launched task {task_id}: {error}")
+
+
     @staticmethod
     def register_task_and_run_all(
                       job_id,
@@ -176,10 +532,19 @@ class TaskManager:
                       num_nodes,
                       task_def_path,
                       exec_history_save_dir,
-                      container_instance_ids = None
+                      container_instance_ids = None,
+                      warm_pool = None
                     ):
-        
+        """
+        Register the job's task definition and launch one task per node.
+
+        With `warm_pool` (see warm_pool.WarmPool) a training TaskLaunchSpec
+        without `container_instance_ids` is first offered to the ready standbys;
+        when too few are ready the standbys are drained and the job cold starts.
+        Other launches leave the standbys running.
+        """
         node_manager = NodeManager()
+        launch_report = LaunchReport()
 
         all_commands = []
         container_inst_ids = []
@@ -191,56 +556,111 @@ class TaskManager:
         ## Read task_def_path and check if healthcheck container or training container
         ## and take flag to task_exec and task_start
 
-        is_training = True
-        taskdefdict = FileManager.load_json(task_def_path)
-        if taskdefdict['containerDefinitions'][0]['name'] == 'HealthCheckContainer':
-            is_training = False
-
-        task_def_arn, reg_task_cmd = TaskManager.task_register(task_def_path)
+        ## task_def_path is either a generated task_def json or a TaskLaunchSpec (TASK_DEF_MODE=overrides)
+        phase_start = time.perf_counter()
+        if isinstance(task_def_path, TaskLaunchSpec):
+            is_training = task_def_path.is_training
+            overrides = task_def_path.overrides()
+            task_def = task_def_path.task_def
+            register = lambda: TaskManager.task_register_spec(task_def_path)
+        else:
+            is_training = True
+            task_def = FileManager.load_json(task_def_path)
+            if task_def['containerDefinitions'][0]['name'] == 'HealthCheckContainer':
+                is_training = False
+            overrides = None
+            register = lambda: TaskManager.task_register(task_def_path)
+        task_def_arn, reg_task_cmd = register()
         all_commands.append(reg_task_cmd)
-
-        for nodei in range(num_nodes):
-            if container_instance_ids is None:
-                task_id, cluster_name, container_inst_id, exec_result, exec_task_cmd = TaskManager.task_exec(task_def_arn, is_training)
-            else:
-                task_id, cluster_name, container_inst_id, exec_result, exec_task_cmd = TaskManager.task_start(task_def_arn, container_instance_ids[nodei])
-
+        launch_report.timings['register'] = time.perf_counter() - phase_start
+
+        phase_start = time.perf_counter()
+        dispatched = None
+        if warm_pool is not None and isinstance(task_def_path, TaskLaunchSpec) \
+                and is_training and container_instance_ids is None:
+            dispatched = warm_pool.dispatch(task_def_path, num_nodes, job_id)
+            if dispatched is None:
+                ## ECS places this cold start, the standbys' GPUs must be free for it. Launches on
+                ## explicit instances target nodes without standbys, the scheduler drains for those
+                warm_pool.drain()
+
+        launch_tasks = TaskManager._launch_tasks_batched if TASK_LAUNCH_MODE == 'batched' \
+            else TaskManager._launch_tasks_fanout
+        if dispatched is not None:
+            launched, exec_task_cmds = dispatched
+            launch_errors = []
+            launch_report.launch_mode = 'warm'
+        else:
+            launched, exec_task_cmds, launch_errors = launch_tasks(
+                task_def_arn, is_training, num_nodes, container_instance_ids, overrides
+            )
+            ## a reused revision deregistered since it was last verified: register again and retry once.
+            ## Only ECS errors tell, batched launches add a placement count summary next to them
+            stale_error = next((error for error in launch_errors if _is_stale_task_def_error(error)), None)
+            if reg_task_cmd[0] == '#' and stale_error is not None and \
+                    TaskManager.forget_stale_task_def(stale_error, task_def):
+                TaskManager.stop_launched_tasks([task_id for task_id, _, _ in launched])
+                task_def_arn, reg_task_cmd = register()
+                all_commands.append(reg_task_cmd)
+                launched, exec_task_cmds, launch_errors = launch_tasks(
+                    task_def_arn, is_training, num_nodes, container_instance_ids, overrides
+                )
+        launch_report.timings['launch'] = time.perf_counter() - phase_start
+        node_manager.invalidate_inventory()
+
+        if launch_errors:
+            launched_task_ids = [task_id for task_id, _, _ in launched]
+            TaskManager.stop_launched_tasks(launched_task_ids)
+            raise RuntimeError(f"{len(launch_errors)} errors launching {num_nodes} tasks, "
+                               f"stopped {len(launched_task_ids)} launched tasks: {launch_errors[0]}")
+
+        all_commands.extend(exec_task_cmds)
+
+        for task_id, cluster_name, container_inst_id in launched:
             node_name_orchestrated = node_manager.fetch_node_name(container_inst_id)
             print(f"Training task {task_id} launched for node {node_name_orchestrated}")
 
-            TaskManager.record_task_to_ddb(
-                task_id = task_id,
-                node_name_orchestrated = node_name_orchestrated,
+            container_inst_ids.append(container_inst_id)
+            ecs_task_ids.append(task_id)
+            orch_node_names.append(node_name_orchestrated)
+
+        ## ECS chooses placement for run-task, keep ranks in the configured node order
+        if container_instance_ids is None:
+            node_order = {node_name: i for i, node_name in enumerate(node_manager.node_names)}
+            rank_order = sorted(range(num_nodes), key=lambda i: node_order.get(orch_node_names[i], len(node_order)))
+            launched = [launched[i] for i in rank_order]
+            container_inst_ids = [container_inst_ids[i] for i in rank_order]
+            ecs_task_ids = [ecs_task_ids[i] for i in rank_order]
+            orch_node_names = [orch_node_names[i] for i in rank_order]
+
+        ## Task records are buffered and written together with the job row by JobManager
+        launch_report.task_records = [
+            TaskManager.build_task_record(
+                task_id = ecs_task_ids[nodei],
+                node_name_orchestrated = orch_node_names[nodei],
                 node_index = -1,
                 job_id = job_id,
                 job_timestamp = job_timestamp,
                 nnodes = num_nodes,
                 task_def_arn = task_def_arn,
-                cluster_name = cluster_name,
-                container_inst_id = container_inst_id,
+                cluster_name = launched[nodei][1],
+                container_inst_id = container_inst_ids[nodei],
             )
-
-            all_commands.append(exec_task_cmd)
-            container_inst_ids.append(container_inst_id)
-            ecs_task_ids.append(task_id)
-            orch_node_names.append(node_name_orchestrated)
+            for nodei in range(num_nodes)
+        ]
 
         history_file = FileManager.create_execution_history(exec_history_save_dir, all_commands)
         print('TaskManager Save history_file: ', history_file)
+        print('TaskManager Launch timings: ', launch_report.format_timings())
 
-        return ecs_task_ids, orch_node_names, container_inst_ids, history_file
+        return ecs_task_ids, orch_node_names, container_inst_ids, history_file, launch_report
 
 
     @staticmethod
     def task_register_and_exec(task_def_path):
 
-        reg_task_cmd = [
-            'aws', 'ecs', 'register-task-definition',
-            '--cli-input-json', f'file://{task_def_path}',
-            '--output', 'json'
-        ]
-        
-        reg_result = _run_aws_cli(reg_task_cmd)
+        task_def_arn, reg_task_cmd = TaskManager.task_register(task_def_path)
+        reg_result = {'taskDefinition': {'taskDefinitionArn': task_def_arn}}
         # reg_result = {'taskDefinition': {'taskDefinitionArn': 'arn:aws-cn:ecs:cn-northwest-1:455385591292:task-definition/TrainingTask:453', 'containerDefinitions': [{'name': 'TrainingContainer', 'image': '455385591292.dkr.ecr.cn-northwest-1.amazonaws.com.cn/hybridgpu-training-torch260:latest', 'cpu': 0, 'portMappings': [{'containerPort': 10086, 'hostPort': 10086, 'protocol': 'tcp'}], 'essential': True, 'entryPoint': ['/bin/sh'], 'command': ['/workspace/training_output_20250222-073224/training-node002.sh'], 'environment': [], 'mountPoints': [{'sourceVolume': 'mylustre', 'containerPath': '/workspace', 'readOnly': False}, {'sourceVolume': 'mylustremodel', 'containerPath': '/modeldatas', 'readOnly': False}, {'sourceVolume': 'mylustredata', 'containerPath': '/datafiles', 'readOnly': False}, {'sourceVolume': 'instancelocaldata', 'containerPath': '/localdata', 'readOnly': False}], 'volumesFrom': [], 'linuxParameters': {'devices': [{'hostPath': '/dev/infiniband', 'containerPath': '/dev/infiniband', 'permissions': ['read', 'write']}], 'sharedMemorySize': 16384}, 'privileged': True, 'ulimits': [{'name': 'memlock', 'softLimit': -1, 'hardLimit': -1}], 'logConfiguration': {'logDriver': 'awslogs', 'options': {'awslogs-group': '/ecs/ECSHybridGpuTraining', 'mode': 'non-blocking', 'awslogs-create-group': 'true', 'max-buffer-size': '25m', 'awslogs-region': 'cn-northwest-1', 'awslogs-stream-prefix': 'ecs'}, 'secretOptions': []}, 'systemControls': [], 'resourceRequirements': [{'value': '8', 'type': 'GPU'}]}], 'family': 'TrainingTask', 'taskRoleArn': 'arn:aws-cn:iam::455385591292:role/ecsanywhereTaskRole', 'executionRoleArn': 'arn:aws-cn:iam::455385591292:role/ecsanywhereTaskExecutionRole', 'networkMode': 'host', 'revision': 453, 'volumes': [{'name': 'mylustre', 'host': {'sourcePath': '/fsx/hzworkspace/ecs-gpu-console-v2'}}, {'name': 'mylustremodel', 'host': {'sourcePath': '/fsx/hzworkspace/modeldatas'}}, {'name': 'mylustredata', 'host': {'sourcePath': '/fsx/hzworkspace/datafiles'}}, {'name': 'instancelocaldata', 'host': {'sourcePath': '/home/node-user/local-data-test'}}], 'status': 'ACTIVE', 'requiresAttributes': [{'name': 'ecs.capability.execution-role-awslogs'}, {'name': 'com.amazonaws.ecs.capability.task-iam-role-network-host'}, {'name': 'com.amazonaws.ecs.capability.ecr-auth'}, {'name': 'com.amazonaws.ecs.capability.privileged-container'}, {'name': 'com.amazonaws.ecs.capability.docker-remote-api.1.17'}, {'name': 'com.amazonaws.ecs.capability.docker-remote-api.1.28'}, {'name': 'com.amazonaws.ecs.capability.task-iam-role'}, {'name': 'com.amazonaws.ecs.capability.docker-remote-api.1.22'}, {'name': 'ecs.capability.execution-role-ecr-pull'}, {'name': 'com.amazonaws.ecs.capability.docker-remote-api.1.18'}, {'name': 'com.amazonaws.ecs.capability.docker-remote-api.1.29'}, {'name': 'com.amazonaws.ecs.capability.logging-driver.awslogs'}, {'name': 'com.amazonaws.ecs.capability.docker-remote-api.1.19'}, {'name': 'ecs.capability.pid-ipc-namespace-sharing'}], 'placementConstraints': [{'type': 'memberOf', 'expression': 'attribute:node==node002'}], 'compatibilities': ['EXTERNAL', 'EC2'], 'runtimePlatform': {'cpuArchitecture': 'X86_64', 'operatingSystemFamily': 'LINUX'}, 'requiresCompatibilities': ['EXTERNAL'], 'memory': '1843200', 'ipcMode': 'host', 'registeredAt': 1740236698.253, 'registeredBy': 'arn:aws-cn:iam::455385591292:user/zhenghao'}}
 
         exec_task_cmd = [
@@ -248,11 +668,15 @@ class TaskManager:
             '--cluster', os.environ['CLUSTER_NAME'],
             '--task-definition', reg_result['taskDefinition']['taskDefinitionArn'],
             '--count', '1',
-            '--launch-type', LAUNCH_TYPE,
+            '--launch-type', get_launch_type(),
             '--output', 'json'
         ]
 
-        exec_result = _run_aws_cli(exec_task_cmd)
+        exec_result = _run_ecs_api(exec_task_cmd, 'run_task',
+                                   cluster=os.environ['CLUSTER_NAME'],
+                                   taskDefinition=reg_result['taskDefinition']['taskDefinitionArn'],
+                                   count=1,
+                                   launchType=get_launch_type())
         
         # exec_result = {'tasks': [{'attachments': [], 'attributes': [{'name': 'ecs.cpu-architecture', 'value': 'x86_64'}], 'clusterArn': 'arn:aws-cn:ecs:cn-northwest-1:455385591292:cluster/nwcd-gpu-testing', 'containerInstanceArn': 'arn:aws-cn:ecs:cn-northwest-1:455385591292:container-instance/nwcd-gpu-testing/2c0cf09946f8409b94f0494dc059bd39', 'containers': [{'containerArn': 'arn:aws-cn:ecs:cn-northwest-1:455385591292:container/nwcd-gpu-testing/595b16b4d57f4efc8bf65692164b2c71/5180808f-49cf-469b-872c-454b853fb736', 'taskArn': 'arn:aws-cn:ecs:cn-northwest-1:455385591292:task/nwcd-gpu-testing/595b16b4d57f4efc8bf65692164b2c71', 'name': 'TrainingContainer', 'image': '455385591292.dkr.ecr.cn-northwest-1.amazonaws.com.cn/hybridgpu:training', 'lastStatus': 'PENDING', 'networkInterfaces': [], 'cpu': '0', 'gpuIds': ['GPU-01d4f7d4-1ec5-2a06-c2d0-20a6dd73f53a', 'GPU-32eba458-d805-fa5e-2394-83ffbee5ecef', 'GPU-3a76ac8a-8175-09e2-50ec-6fea87363da2', 'GPU-3d686c9d-4e09-6cc8-3ed6-e5c200ae8366', 'GPU-7780ccd7-d529-ab9e-176e-39abd92b551b', 'GPU-b79120c4-b809-2edb-9d9a-8f3c77b707c0', 'GPU-c2547f54-68ff-a581-8669-e3fd61cd9dee', 'GPU-cb9055ed-c530-853a-027e-53256bd3e32a']}], 'cpu': '0', 'createdAt': 174072, 'desiredStatus': 'RUNNING', 'enableExecuteCommand': False, 'group': 'family:TrainingTask', 'lastStatus': 'PENDING', 'launchType': 'EXTERNAL', 'memory': '1843200', 'overrides': {'containerOverrides': [{'name': 'TrainingContainer'}], 'inferenceAcceleratorOverrides': []}, 'tags': [], 'taskArn': 'arn:aws-cn:ecs:cn-northwest-1:455385591292:task/nwcd-gpu-testing/595b16b4d57f4efc8bf65692164b2c71', 'taskDefinitionArn': 'arn:aws-cn:ecs:cn-northwest-1:455385591292:task-definition/TrainingTask:411', 'version': 1}], 'failures': []}
         
@@ -274,11 +698,64 @@ class TaskManager:
             '--output', 'json'
         ]
 
-        exec_result = _run_aws_cli(stop_task_cmd)
+        exec_result = _run_ecs_api(stop_task_cmd, 'stop_task',
+                                   cluster=os.environ['CLUSTER_NAME'],
+                                   task=task_id)
 
         return exec_result
 
 
+    @staticmethod
+    def stop_tasks(task_ids):
+        """
+        Issue stop-task for every task concurrently, TASK_LAUNCH_WORKERS calls in flight.
+
+        Returns:
+            dict: task_id -> None if the stop was accepted, else the error
+        """
+        task_ids = list(task_ids)
+        if not task_ids:
+            return {}
+
+        stop_errors = {}
+        with ThreadPoolExecutor(max_workers=min(TASK_LAUNCH_WORKERS, len(task_ids))) as executor:
+            futures = {executor.submit(TaskManager.stop_ecs_task, task_id): task_id for task_id in task_ids}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    stop_errors[futures[future]] = None
+                except Exception as e:
+                    stop_errors[futures[future]] = e
+
+        return stop_errors
+
+
+    @staticmethod
+    def wait_tasks_stopped(task_ids, timeout, poll_interval=TASK_STOP_POLL_INTERVAL):
+        """
+        Poll get_tasks_status until every task is STOPPED (or unknown to ECS)
+        or the timeout passes.
+
+        Returns:
+            dict: task_id -> latest status, see get_tasks_status
+        """
+        deadline = time.monotonic() + timeout
+        task_statuses = {}
+        pending_task_ids = list(task_ids)
+
+        while pending_task_ids:
+            task_statuses.update(TaskManager.get_tasks_status(pending_task_ids))
+            pending_task_ids = [
+                task_id for task_id in pending_task_ids
+                if task_statuses[task_id]['stop_status'] not in ('SUCCESS', 'FAIL', 'NO_TASK')
+            ]
+            if not pending_task_ids or time.monotonic() + poll_interval > deadline:
+                break
+            time.sleep(poll_interval)
+
+        return task_statuses
+
+
     @staticmethod
     def is_task_running(task_id):
         """
@@ -290,27 +767,8 @@ class TaskManager:
         Returns:
             bool: True if the task is running, False otherwise (stopped, crashed, etc.)
         """
-        describe_task_cmd = [
-            'aws', 'ecs', 'describe-tasks',
-            '--cluster', os.environ['CLUSTER_NAME'],
-            '--tasks', task_id,
-            '--output', 'json'
-        ]
-        
         try:
-            result = _run_aws_cli(describe_task_cmd)
-            
-            # Check if we got task information back
-            if not result.get('tasks'):
-                return False
-                
-            task = result['tasks'][0]
-            last_status = task.get('lastStatus')
-            desired_status = task.get('desiredStatus')
-            
-            # Task is running if both lastStatus and desiredStatus are "RUNNING"
-            return last_status == 'RUNNING' and desired_status == 'RUNNING'
-            
+            return TaskManager.get_tasks_status([task_id])[task_id]['running']
         except Exception as e:
             print(f"Error checking task status: {e}")
             return False
@@ -325,37 +783,92 @@ class TaskManager:
             task_id (str): The ID of the task to check
             
         """
-        describe_task_cmd = [
-            'aws', 'ecs', 'describe-tasks',
-            '--cluster', os.environ['CLUSTER_NAME'],
-            '--tasks', task_id,
-            '--output', 'json'
-        ]
-        
         try:
-            result = _run_aws_cli(describe_task_cmd)
-            
-            # Check if we got task information back
-            if not result.get('tasks'):
+            task_status = TaskManager.get_tasks_status([task_id])[task_id]
+            if task_status['stop_status'] == 'NO_TASK':
                 print(f"While check task stop status, task {task_id} not found")
-                return "NO_TASK"
-                
-            task = result['tasks'][0]
-            last_status = task.get('lastStatus')
-            
-            # First check if the task is actually stopped
-            if last_status != 'STOPPED':
-                return "RUNNING"
-                
-            # Check containers for exit codes
-            containers = task.get('containers', [])
-            for container in containers:
-                exit_code = container.get('exitCode')
-                if exit_code is None or exit_code != 0:
-                    return 'FAIL'
-
-            return 'SUCCESS'
-            
+            return task_status['stop_status']
         except Exception as e:
             print(f"Error checking task status: {e}")
             return False
+
+
+    @staticmethod
+    def describe_tasks(task_ids):
+        """
+        Describe any number of tasks with describe-tasks calls of up to
+        ECS_MAX_DESCRIBE_TASKS IDs each.
+
+        Returns:
+            tuple: (task_id -> task description, task_id -> failure reason) for
+                   the tasks ECS did and did not return
+        """
+        described = {}
+        failures = {}
+
+        for chunk in _chunked(list(dict.fromkeys(task_ids)), ECS_MAX_DESCRIBE_TASKS):
+            describe_task_cmd = [
+                'aws', 'ecs', 'describe-tasks',
+                '--cluster', os.environ['CLUSTER_NAME'],
+                '--tasks', *chunk,
+                '--output', 'json'
+            ]
+            result = _run_ecs_api(describe_task_cmd, 'describe_tasks',
+                                  cluster=os.environ['CLUSTER_NAME'],
+                                  tasks=chunk)
+            for task in result.get('tasks', []):
+                described[_get_arn_id(task['taskArn'])] = task
+            for failure in result.get('failures', []):
+                failures[_get_arn_id(failure.get('arn', ''))] = failure.get('reason')
+
+        return described, failures
+
+
+    @staticmethod
+    def get_tasks_status(task_ids):
+        """
+        Status of many tasks at once, one describe-tasks call per
+        ECS_MAX_DESCRIBE_TASKS IDs.
+
+        Args:
+            task_ids (list): ECS task IDs
+
+        Returns:
+            dict: task_id -> {
+                'last_status', 'desired_status', 'running',
+                'stop_status': "RUNNING" / "SUCCESS" / "FAIL" / "NO_TASK",
+                'stop_code', 'stopped_reason', 'stopped_at',
+                'exit_codes': container name -> exit code,
+                'container_reasons': container name -> reason
+            }
+        """
+        described, failures = TaskManager.describe_tasks(task_ids)
+        return {
+            task_id: _summarize_task(described[task_id]) if task_id in described
+                     else _missing_task_status(failures.get(task_id))
+            for task_id in task_ids
+        }
+
+
+    @staticmethod
+    def are_tasks_running(task_ids):
+        """
+        Bulk is_task_running.
+
+        Returns:
+            dict: task_id -> bool
+        """
+        return {task_id: task_status['running']
+                for task_id, task_status in TaskManager.get_tasks_status(task_ids).items()}
+
+
+    @staticmethod
+    def check_tasks_stop_status(task_ids):
+        """
+        Bulk check_task_stop_status.
+
+        Returns:
+            dict: task_id -> "RUNNING" / "SUCCESS" / "FAIL" / "NO_TASK"
+        """
+        return {task_id: task_status['stop_status']
+                for task_id, task_status in TaskManager.get_tasks_status(task_ids).items()}
@@ -6,7 +6,9 @@ from typing import List, Dict, Any, Tuple, Optional
 from file_manager import FileManager
 from dist_command_generator import DistCommandGenerator
 from node_manager import NodeManager
-from task_manager import TaskManager
+from task_manager import TaskManager, TaskLaunchSpec, TASK_DEF_MODE
+from warm_pool import FirstStepTracker
+from service_container import Services
 from job_manager import JobManager
 # from job_manager import Job
 from health_manager import HealthManager
@@ -19,9 +21,14 @@ from decimal import Decimal
 
 import subprocess
 import json
+import copy
 import boto3
 
 
+# Master ports whose canonical training definition is registered at startup in TASK_DEF_MODE=overrides
+CANONICAL_MASTER_PORTS = [port for port in os.environ.get('CANONICAL_MASTER_PORTS', '10000').split(',') if port]
+
+
 def _convert_floats_to_decimal(obj):
     if isinstance(obj, float):
         return Decimal(str(obj))  # Convert float to string first for precision
@@ -40,11 +47,49 @@ class TrainingManager:
         self.job_ddb_table_name = os.environ.get('JOB_MANAGE_TABLE')
         self.task_ddb_table_name = os.environ.get('TASK_MANAGE_TABLE')
         self.node_manager = NodeManager()
-        self.health_manager = HealthManager()
-        self.task_manager = TaskManager()
+        self.health_manager = Services.health_manager()
+        self.task_manager = Services.task_manager()
         self.command_generator = DistCommandGenerator()
         # self.nodes = self.node_manager.get_node_names()
-        self.job_manager = JobManager()
+        self.job_manager = Services.job_manager()
+
+        if TASK_DEF_MODE == 'overrides':
+            self.register_canonical_task_defs()
+
+
+    def register_canonical_task_defs(self, master_ports=CANONICAL_MASTER_PORTS):
+        """Register the canonical training definitions up front, so launches only pass overrides."""
+        for master_port in master_ports:
+            try:
+                launch_spec = self.build_training_launch_spec(master_port, command=[])
+                task_def_arn, _ = TaskManager.task_register_spec(launch_spec)
+                print(f"Canonical training task definition for port {master_port}: {task_def_arn}")
+            except Exception as e:
+                print(f"Failed to register canonical task definition for port {master_port}: {e}")
+
+
+    def build_training_launch_spec(self, master_port, command, environment=None) -> TaskLaunchSpec:
+        """
+        Canonical training definition for `master_port`, with the job's command
+        and environment carried as containerOverrides.
+        """
+        ecs_task_def = self.task_manager.get_ecs_task_def()
+
+        training_container_def = copy.deepcopy(self.task_manager.get_training_container_def())
+        training_container_def['portMappings'][0]['containerPort'] = int(master_port)
+        training_container_def['portMappings'][0]['hostPort'] = int(master_port)
+        ## Job specific, always overridden
+        training_container_def.pop('command', None)
+
+        ecs_task_def['containerDefinitions'] = [training_container_def]
+
+        return TaskLaunchSpec(
+            task_def=ecs_task_def,
+            container_name=training_container_def['name'],
+            command=list(command),
+            environment=environment or {},
+            is_training=True
+        )
 
 
     def generate_job_id(self, base_job_name):
@@ -56,15 +101,8 @@ class TrainingManager:
 
 
     def assign_job_nodes(self, num_nodes):
-        master_node_name = self.node_manager.assign_a_node_name()
-
-        all_node_names = [master_node_name]
-
-        for _ in range(num_nodes-1):
-            node_name = self.node_manager.assign_a_node_name()
-            all_node_names.append(node_name)
-
-        return all_node_names
+        ## placed as one gang so the allocator can keep the job within a topology group, first node is the master
+        return self.node_manager.assign_node_names(num_nodes)
 
     def assign_master_node(self):
         master_node_name = self.node_manager.assign_a_node_name()
@@ -97,6 +135,11 @@ class TrainingManager:
         
         FileManager.write_script(wrap_script_path, script_content)
 
+        if TASK_DEF_MODE == 'overrides':
+            return self.build_training_launch_spec(master_port,
+                                                   ['/workspace/'+wrap_script_path],
+                                                   FirstStepTracker.marker_env(exec_history_save_dir))
+
         node_task_def_path = self.construct_node_task_def(None, -99, master_port, wrap_script_path, None, exec_history_save_dir)
 
         return node_task_def_path
@@ -0,0 +1,321 @@
+import os
+import time
+import uuid
+import shlex
+import threading
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+
+from client_manager import ClientManager
+from node_manager import NodeManager
+from node_lease import NodeLease, LEASE_ASSIGN
+from task_manager import TaskManager, TaskLaunchSpec
+
+
+WARM_POOL_ENABLED = os.environ.get('WARM_POOL_ENABLED', '').lower() in ('1', 'true', 'yes')
+# Control directory on the shared filesystem, relative to the console workspace
+# (the directory mounted as /workspace in the task containers)
+WARM_POOL_DIR = os.environ.get('WARM_POOL_DIR', '_warm_pool')
+WARM_POOL_STANDBY_SCRIPT = os.environ.get('WARM_POOL_STANDBY_SCRIPT', 'PortalScripts/warm_standby.sh')
+# Run once by each standby before it reports ready, e.g. a pip install of the training requirements
+WARM_POOL_PREPARE_CMD = os.environ.get('WARM_POOL_PREPARE_CMD', '')
+WARM_POOL_DRAIN_TIMEOUT = float(os.environ.get('WARM_POOL_DRAIN_TIMEOUT', 60))
+FIRST_STEP_TIMEOUT = float(os.environ.get('FIRST_STEP_TIMEOUT', 3600))
+FIRST_STEP_POLL_INTERVAL = 5
+METRIC_NAMESPACE = os.environ.get('METRIC_NAMESPACE', 'HybridGPU/Console')
+
+
+def _container_path(path: str) -> str:
+    return '/workspace/' + path
+
+
+@dataclass
+class Standby:
+    node_name: str
+    standby_id: str
+    task_id: str
+    container_inst_id: str
+
+
+@dataclass
+class FirstStepWatch:
+    job_id: str
+    marker_path: str
+    submitted_at: float
+    launch_mode: str
+
+
+class WarmPool:
+    """
+    Optional pool of standby tasks, one per idle node, that already pulled the
+    training image and ran WARM_POOL_PREPARE_CMD.
+
+    A standby waits on its node directory under WARM_POOL_DIR; a job is handed
+    to it by writing job.env and job.sh there, and the standby execs the job
+    in place, so the standby's ECS task becomes the job's task. See
+    PortalScripts/warm_standby.sh for the container side of the protocol.
+    """
+    _standbys: Dict[str, Standby] = {}
+    _lock = threading.Lock()
+    _replenishing = False
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return WARM_POOL_ENABLED
+
+    @staticmethod
+    def node_dir(node_name: str) -> str:
+        return os.path.join(WARM_POOL_DIR, node_name)
+
+    @staticmethod
+    def _is_ready(standby: Standby) -> bool:
+        try:
+            with open(os.path.join(WarmPool.node_dir(standby.node_name), 'ready'), 'r') as f:
+                return f.read().strip() == standby.standby_id
+        except OSError:
+            return False
+
+    @staticmethod
+    def _prune() -> None:
+        """Forget standbys whose task is no longer running."""
+        with WarmPool._lock:
+            standbys = list(WarmPool._standbys.values())
+        if not standbys:
+            return
+
+        task_statuses = TaskManager.get_tasks_status([standby.task_id for standby in standbys])
+        with WarmPool._lock:
+            for standby in standbys:
+                if not task_statuses[standby.task_id]['running'] and task_statuses[standby.task_id]['last_status'] != 'PENDING':
+                    print(f"WarmPool standby {standby.task_id} on {standby.node_name} is gone")
+                    WarmPool._standbys.pop(standby.node_name, None)
+
+    @staticmethod
+    def get_ready_node_names() -> List[str]:
+        WarmPool._prune()
+        node_order = {node_name: i for i, node_name in enumerate(NodeManager().node_names)}
+        with WarmPool._lock:
+            ready = [standby.node_name for standby in WarmPool._standbys.values() if WarmPool._is_ready(standby)]
+        return sorted(ready, key=lambda node_name: node_order.get(node_name, len(node_order)))
+
+    @staticmethod
+    def replenish(standby_spec: TaskLaunchSpec) -> None:
+        """
+        Start a standby on every idle node that has none, in the background.
+
+        Args:
+            standby_spec: canonical training launch spec the standbys run
+        """
+        with WarmPool._lock:
+            if WarmPool._replenishing:
+                return
+            WarmPool._replenishing = True
+
+        threading.Thread(target=WarmPool._replenish, args=(standby_spec,),
+                         name='warm-pool-replenish', daemon=True).start()
+
+    @staticmethod
+    def _replenish(standby_spec: TaskLaunchSpec) -> None:
+        try:
+            node_manager = NodeManager()
+            node_manager.refresh_all_node_status(force=True)
+            leased_node_names = NodeLease.get_foreign_leased_node_names(node_manager.nodes) | node_manager.assigned_nodes
+            with WarmPool._lock:
+                idle_nodes = [
+                    node for node_name, node in node_manager.nodes.items()
+                    if node.status and node.container_inst_id and node_name not in WarmPool._standbys
+                    and node.container_inst_id not in node_manager.healthcheck_locked_instances
+                    and node_name not in leased_node_names
+                ]
+
+            for node in idle_nodes:
+                standby_id = uuid.uuid4().hex
+                ## reserved like a job's nodes, so neither the scheduler nor another console takes it meanwhile
+                if not node_manager.reserve_node_names([node.name], f"standby-{standby_id}"):
+                    print(f"WarmPool skipping {node.name}, it was assigned meanwhile")
+                    continue
+                try:
+                    WarmPool._start_standby(standby_spec, node, standby_id)
+                finally:
+                    ## the standby now holds the GPUs, the next refresh keeps the node out of spare
+                    node_manager.invalidate_inventory()
+                    node_manager.release_node_names([node.name])
+        finally:
+            with WarmPool._lock:
+                WarmPool._replenishing = False
+
+    @staticmethod
+    def _start_standby(standby_spec: TaskLaunchSpec, node, standby_id: str) -> None:
+        node_dir = WarmPool.node_dir(node.name)
+        os.makedirs(node_dir, exist_ok=True)
+        for stale in ('ready', 'job.sh', 'job.env'):
+            try:
+                os.remove(os.path.join(node_dir, stale))
+            except FileNotFoundError:
+                pass
+
+        launch_spec = replace(
+            standby_spec,
+            command=[_container_path(WARM_POOL_STANDBY_SCRIPT)],
+            environment={
+                'WARM_POOL_NODE_DIR': _container_path(node_dir),
+                'WARM_POOL_STANDBY_ID': standby_id,
+                'WARM_POOL_PREPARE_CMD': WARM_POOL_PREPARE_CMD,
+            }
+        )
+        try:
+            task_def_arn, _ = TaskManager.task_register_spec(launch_spec)
+            task_id, _, container_inst_id, _, _ = TaskManager.task_start(
+                task_def_arn, node.container_inst_id, launch_spec.overrides()
+            )
+        except Exception as e:
+            print(f"WarmPool failed to start standby on {node.name}: {e}")
+            TaskManager.forget_stale_task_def(e, launch_spec.task_def)
+            return
+
+        with WarmPool._lock:
+            WarmPool._standbys[node.name] = Standby(node.name, standby_id, task_id, container_inst_id)
+        print(f"WarmPool started standby {task_id} on {node.name}")
+
+    @staticmethod
+    def dispatch(launch_spec: TaskLaunchSpec, num_nodes: int,
+                 job_id: str = '') -> Optional[Tuple[List[Tuple[str, str, str]], List[List[str]]]]:
+        """
+        Hand a job to `num_nodes` ready standbys, placed by the NodeManager's allocator
+        and leased for `job_id` like a cold assignment.
+
+        Returns:
+            (launched (task_id, cluster_name, container_inst_id) in rank order,
+             commands for the execution history), or None when not enough
+            standbys are ready or another console leases some of them
+        """
+        node_manager = NodeManager()
+        ready_node_names = WarmPool.get_ready_node_names()
+        foreign_leased = NodeLease.get_foreign_leased_node_names(ready_node_names)
+        free_node_names = [node_name for node_name in ready_node_names if node_name not in foreign_leased]
+        if len(free_node_names) < num_nodes:
+            print(f"WarmPool has {len(free_node_names)} ready standbys, {num_nodes} needed")
+            return None
+
+        node_names = node_manager.allocator.allocate(free_node_names, num_nodes, node_manager.load_node_topology())
+        with WarmPool._lock:
+            if any(node_name not in WarmPool._standbys for node_name in node_names):
+                print(f"WarmPool standbys on {node_names} were taken meanwhile")
+                return None
+            standbys = [WarmPool._standbys.pop(node_name) for node_name in node_names]
+
+        if not NodeLease.acquire(node_names, job_id, LEASE_ASSIGN):
+            with WarmPool._lock:
+                WarmPool._standbys.update((standby.node_name, standby) for standby in standbys)
+            return None
+
+        job_script = 'exec ' + ' '.join(shlex.quote(arg) for arg in launch_spec.command) + '\n'
+        job_env = ''.join(f"export {name}={shlex.quote(str(value))}\n"
+                          for name, value in launch_spec.environment.items())
+
+        launched = []
+        history_cmds = []
+        for standby in standbys:
+            node_dir = WarmPool.node_dir(standby.node_name)
+            with open(os.path.join(node_dir, 'job.env'), 'w') as f:
+                f.write(job_env)
+            ## job.sh appears atomically, it is the standby's signal to start
+            with open(os.path.join(node_dir, 'job.sh.tmp'), 'w') as f:
+                f.write(job_script)
+            os.replace(os.path.join(node_dir, 'job.sh.tmp'), os.path.join(node_dir, 'job.sh'))
+
+            launched.append((standby.task_id, os.environ['CLUSTER_NAME'], standby.container_inst_id))
+            history_cmds.append(['#', 'dispatched to warm standby', standby.task_id, 'on', standby.node_name,
+                                 ':', job_script.strip()])
+
+        ## the job now runs in the standbys' tasks, the leases only bridge other consoles' inventory lag
+        NodeLease.release(node_names, LEASE_ASSIGN)
+        return launched, history_cmds
+
+    @staticmethod
+    def drain(timeout: float = WARM_POOL_DRAIN_TIMEOUT) -> None:
+        """Stop every standby so a cold launch can use their GPUs."""
+        with WarmPool._lock:
+            standbys = list(WarmPool._standbys.values())
+            WarmPool._standbys.clear()
+        if not standbys:
+            return
+
+        task_ids = [standby.task_id for standby in standbys]
+        print(f"WarmPool draining {len(task_ids)} standbys")
+        TaskManager.stop_tasks(task_ids)
+        TaskManager.wait_tasks_stopped(task_ids, timeout)
+        NodeManager().invalidate_inventory()
+
+
+class FirstStepTracker:
+    """
+    Publishes the time from job submission to its first training step as the
+    CloudWatch metric TimeToFirstStep, with a LaunchMode dimension (warm/cold).
+
+    Jobs get the FIRST_STEP_MARKER environment variable; the training script
+    touches that file after its first optimizer step.
+    """
+    _watches: List[FirstStepWatch] = []
+    _lock = threading.Lock()
+    _thread = None
+
+    @staticmethod
+    def marker_path(exec_history_save_dir: str) -> str:
+        return os.path.join(exec_history_save_dir, 'first_step')
+
+    @staticmethod
+    def marker_env(exec_history_save_dir: str) -> Dict[str, str]:
+        return {'FIRST_STEP_MARKER': _container_path(FirstStepTracker.marker_path(exec_history_save_dir))}
+
+    @staticmethod
+    def watch(job_id: str, exec_history_save_dir: str, submitted_at: float, launch_mode: str) -> None:
+        with FirstStepTracker._lock:
+            FirstStepTracker._watches.append(FirstStepWatch(
+                job_id, FirstStepTracker.marker_path(exec_history_save_dir), submitted_at, launch_mode
+            ))
+            if FirstStepTracker._thread is None or not FirstStepTracker._thread.is_alive():
+                FirstStepTracker._thread = threading.Thread(target=FirstStepTracker._run,
+                                                            name='first-step-tracker', daemon=True)
+                FirstStepTracker._thread.start()
+
+    @staticmethod
+    def _run() -> None:
+        while True:
+            time.sleep(FIRST_STEP_POLL_INTERVAL)
+            with FirstStepTracker._lock:
+                watches = list(FirstStepTracker._watches)
+            if not watches:
+                return
+
+            for watch in watches:
+                done = False
+                try:
+                    first_step_at = os.path.getmtime(watch.marker_path)
+                    FirstStepTracker._publish(watch, first_step_at - watch.submitted_at)
+                    done = True
+                except FileNotFoundError:
+                    done = time.time() - watch.submitted_at > FIRST_STEP_TIMEOUT
+                except Exception as e:
+                    print(f"FirstStepTracker failed for job {watch.job_id}: {e}")
+                    done = True
+
+                if done:
+                    with FirstStepTracker._lock:
+                        FirstStepTracker._watches.remove(watch)
+
+    @staticmethod
+    def _publish(watch: FirstStepWatch, seconds: float) -> None:
+        print(f"Job {watch.job_id} time to first step {seconds:.1f}s ({watch.launch_mode} start)")
+        ClientManager.get_client('cloudwatch').put_metric_data(
+            Namespace=METRIC_NAMESPACE,
+            MetricData=[{
+                'MetricName': 'TimeToFirstStep',
+                'Dimensions': [
+                    {'Name': 'ClusterName', 'Value': os.environ.get('CLUSTER_NAME', 'default-cluster')},
+                    {'Name': 'LaunchMode', 'Value': watch.launch_mode},
+                ],
+                'Value': seconds,
+                'Unit': 'Seconds',
+            }]
+        )
@@ -38,6 +38,10 @@ def demo_basic():
         labels = torch.randn(20, 5).to(device_id)
         loss_fn(outputs, labels).backward()
         optimizer.step()
+
+        # Tell the console the first step is done (time-to-first-step metric)
+        if i == 0 and rank == 0 and os.environ.get("FIRST_STEP_MARKER"):
+            open(os.environ["FIRST_STEP_MARKER"], "a").close()
     
     dist.destroy_process_group()
 
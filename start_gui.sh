@@ -8,6 +8,21 @@ aws configure set default.region cn-north-1
 export CLUSTER_NAME="2025-ECS-Anywhere-Sinnet"
 export JOB_MANAGE_TABLE="my_ecs_job"
 export TASK_MANAGE_TABLE="my_ecs_task"
+# Persist the job queue; unset keeps queued jobs in memory only
+# export JOB_QUEUE_TABLE="my_job_queue"
+# Share node reservations between console replicas through conditional-write leases
+# export NODE_LEASE_TABLE="my_node_lease"
+# Keep structured health check results (FSx / TCP / ping / DCGM / NCCL per node)
+# export HEALTH_HISTORY_TABLE="my_health_history"
+# State table fed by ecs-monitor lambda, enables event driven node/task status
+# export ECS_STATE_TABLE="my_ecs_state"
+# Launch canonical task definitions with containerOverrides instead of registering one per job
+# export TASK_DEF_MODE="overrides"
+# Keep a standby task on every idle node and hand jobs to it (needs TASK_DEF_MODE=overrides)
+# export WARM_POOL_ENABLED="true"
+# export WARM_POOL_PREPARE_CMD="pip install -r /workspace/sample-ddp-training/requirements.txt"
+# Print import / manager construction / first render timings
+# export CONSOLE_PROFILE_STARTUP="1"
 
 export IB_DEV_LIST="mlx_aws_100,mlx_aws_101,mlx_aws_102,mlx_aws_103"
 export NODE_NAME_LIST="A800-10-204-9-8,A800-10-204-9-9"
@@ -16,6 +31,9 @@ export ECS_CLUSTER_CONF_PATH="HYBRID_GPU_PRE_SETTINGS"
 export ECS_TASK_DEF="$ECS_CLUSTER_CONF_PATH/ecs_task_def.json"
 export TRAINING_CONTAINER_DEF="$ECS_CLUSTER_CONF_PATH/training_container_def.json"
 export HEALTH_CONTAINER_DEF="$ECS_CLUSTER_CONF_PATH/healthcheck_container_def.json"
+# Node placement: switch/subnet groups from node_mapping_info.yaml or the TopologyGroup instance attribute
+# export NODE_MAPPING_PATH="${ECS_CLUSTER_CONF_PATH}/node_mapping_info.yaml"
+# export NODE_BANDWIDTH_PATH="/fsx/nccl_bandwidth.json"
 
 
 
@@ -39,6 +57,9 @@ echo "Current time: $(date +%H:%M)"
 echo "Starting Gradio interface on port: $PORT"
 # echo "Access the interface at: http://localhost:$PORT"
 
+# Create the configured DynamoDB tables / indexes, a no-op once they exist
+python gui/setup_tables.py || exit 1
+
 # Choose interface version
 echo "Using UI appUI.py"
 # python gui/appui.py
@@ -0,0 +1,11 @@
+import os
+import sys
+
+## the console modules import each other by bare name from gui/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gui'))
+
+## placeholder settings, every AWS call made by a test is monkeypatched
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+os.environ.setdefault('CLUSTER_NAME', 'test-cluster')
@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+import pytest
+from botocore.exceptions import EndpointConnectionError
+from botocore.stub import Stubber
+
+from client_manager import ClientManager
+from ddb_handler import DynamoDBHandler
+
+
+@pytest.fixture
+def dynamodb():
+    with Stubber(ClientManager.get_client('dynamodb')) as stubber:
+        yield stubber
+        stubber.assert_no_pending_responses()
+
+
+def test_item_calls_go_through_the_shared_client(dynamodb):
+    dynamodb.add_response('put_item', {}, {
+        'TableName': 'jobs', 'Item': {'job_id': {'S': 'job-1'}, 'num_nodes': {'N': '2'}}
+    })
+    dynamodb.add_response('get_item', {'Item': {'job_id': {'S': 'job-1'}, 'num_nodes': {'N': '2'}}}, {
+        'TableName': 'jobs', 'Key': {'job_id': {'S': 'job-1'}}
+    })
+    dynamodb.add_response('get_item', {}, {'TableName': 'jobs', 'Key': {'job_id': {'S': 'job-2'}}})
+
+    assert DynamoDBHandler.write_item('jobs', {'job_id': 'job-1', 'num_nodes': 2})
+    assert DynamoDBHandler.get_item('jobs', {'job_id': 'job-1'}) == {'job_id': 'job-1', 'num_nodes': Decimal(2)}
+    assert DynamoDBHandler.get_item('jobs', {'job_id': 'job-2'}) is None
+
+
+def test_failed_condition_returns_false(dynamodb):
+    dynamodb.add_client_error('update_item', 'ConditionalCheckFailedException', expected_params={
+        'TableName': 'queue', 'Key': {'queue_id': {'S': 'q-1'}},
+        'UpdateExpression': 'SET queue_status = :s', 'ExpressionAttributeValues': {':s': {'S': 'DISPATCHING'}},
+        'ConditionExpression': 'queue_status = :from', 'ReturnValues': 'UPDATED_NEW',
+    })
+    assert not DynamoDBHandler.update_item('queue', {'queue_id': 'q-1'}, 'SET queue_status = :s',
+                                           {':s': 'DISPATCHING'}, condition_expression='queue_status = :from')
+
+
+def test_query_follows_pages_and_deserializes(dynamodb):
+    params = {
+        'TableName': 'jobs', 'IndexName': 'by-time', 'KeyConditionExpression': 'cluster_name = :c',
+        'ExpressionAttributeValues': {':c': {'S': 'test-cluster'}},
+    }
+    dynamodb.add_response('query', {'Items': [{'job_id': {'S': 'job-1'}}],
+                                    'LastEvaluatedKey': {'job_id': {'S': 'job-1'}}}, params)
+    dynamodb.add_response('query', {'Items': [{'job_id': {'S': 'job-2'}}]},
+                          dict(params, ExclusiveStartKey={'job_id': {'S': 'job-1'}}))
+
+    items = DynamoDBHandler.query('jobs', 'cluster_name = :c', {':c': 'test-cluster'}, index_name='by-time')
+    assert items == [{'job_id': 'job-1'}, {'job_id': 'job-2'}]
+
+
+def test_missing_index_asks_for_setup_tables(dynamodb):
+    dynamodb.add_client_error('query', 'ResourceNotFoundException')
+    with pytest.raises(RuntimeError, match='setup_tables'):
+        DynamoDBHandler.query('jobs', 'cluster_name = :c', {':c': 'test-cluster'}, index_name='by-time')
+
+
+def test_parallel_scan_reraises_a_segment_connection_error(monkeypatch):
+    def iter_scan(table_name, filter_expression, expression_values, segment, total_segments):
+        yield {'task_id': f"task-{segment}"}
+        if segment == 1:
+            raise EndpointConnectionError(endpoint_url='https://dynamodb.us-east-1.amazonaws.com')
+
+    monkeypatch.setattr(DynamoDBHandler, 'iter_scan', iter_scan)
+    items = []
+    with pytest.raises(EndpointConnectionError):
+        for item in DynamoDBHandler.parallel_scan('tasks', total_segments=4):
+            items.append(item)
+    assert sorted(item['task_id'] for item in items) == ['task-0', 'task-1', 'task-2', 'task-3']
@@ -0,0 +1,200 @@
+import copy
+import importlib.util
+import json
+import os
+from decimal import Decimal
+
+import pytest
+from botocore.exceptions import ClientError
+
+import ecs_state_store
+from ecs_state_store import EcsStateStore
+
+ECS_MONITOR_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ecs-monitor')
+CLUSTER = 'nwcd-gpu-testing'
+TASK_ID = '595b16b4d57f4efc8bf65692164b2c71'
+INSTANCE_ID = '2c0cf09946f8409b94f0494dc059bd39'
+
+
+def _load_lambda():
+    spec = importlib.util.spec_from_file_location(
+        'lambda_function', os.path.join(ECS_MONITOR_DIR, 'lambda_function.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+lambda_function = _load_lambda()
+
+
+def recorded_event(name):
+    """The ECS event carried in a recorded SNS notification under ecs-monitor/events."""
+    with open(os.path.join(ECS_MONITOR_DIR, 'events', f"{name}.json")) as f:
+        return json.loads(json.load(f)['Records'][0]['Sns']['Message'])
+
+
+def task_event(version, last_status):
+    event = recorded_event('task-state-change-stopped')
+    event['detail'].update(version=version, lastStatus=last_status)
+    if last_status != 'STOPPED':
+        for key in ('stopCode', 'stoppedReason', 'stoppedAt', 'stoppingAt'):
+            event['detail'].pop(key)
+        for container in event['detail']['containers']:
+            container.pop('exitCode', None)
+    return event
+
+
+def instance_event(version, remaining_gpus):
+    event = recorded_event('container-instance-state-change-active')
+    event['detail']['version'] = version
+    for resource in event['detail']['remainingResources']:
+        if resource['name'] == 'GPU':
+            resource['stringSetValue'] = resource['stringSetValue'][:remaining_gpus]
+    return event
+
+
+class FakeStateTable:
+    """ECS_STATE_TABLE as the lambda writes it: an atomic seq counter and conditional puts on event_version."""
+
+    def __init__(self):
+        self.items = {}
+        ## puts taken while holding, to land a record after one with a higher seq
+        self.held = None
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues, ReturnValues):
+        assert UpdateExpression == 'ADD seq :one'
+        item = self.items.setdefault(Key['resource_id'], dict(Key, seq=Decimal(0)))
+        item['seq'] += ExpressionAttributeValues[':one']
+        return {'Attributes': {'seq': item['seq']}}
+
+    def put_item(self, Item, ConditionExpression, ExpressionAttributeValues):
+        if self.held is not None:
+            self.held.append((Item, ExpressionAttributeValues))
+        else:
+            self._put(Item, ExpressionAttributeValues)
+
+    def release(self):
+        held, self.held = self.held, None
+        for item, values in held:
+            self._put(item, values)
+
+    def _put(self, item, values):
+        current = self.items.get(item['resource_id'])
+        if current is not None and not current['event_version'] < values[':v']:
+            raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException'}}, 'PutItem')
+        self.items[item['resource_id']] = copy.deepcopy(item)
+
+    def query_seq_index(self, table_name, key_condition, expression_values, index_name=None, **kwargs):
+        assert index_name == ecs_state_store.STATE_SEQ_INDEX
+        return sorted(
+            (copy.deepcopy(item) for item in self.items.values()
+             if item.get('cluster_name') == expression_values[':c'] and item['seq'] > expression_values[':s']),
+            key=lambda item: item['seq']
+        )
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = FakeStateTable()
+    monkeypatch.setenv('ECS_STATE_TABLE', 'ecs-state')
+    monkeypatch.setenv('CLUSTER_NAME', CLUSTER)
+    monkeypatch.setattr(lambda_function.dynamodb, 'Table', lambda name: table)
+    monkeypatch.setattr(ecs_state_store.DynamoDBHandler, 'query', table.query_seq_index)
+    monkeypatch.setattr(EcsStateStore, '_last_seq', 0)
+    monkeypatch.setattr(EcsStateStore, '_applied_version', 0)
+    monkeypatch.setattr(EcsStateStore, '_tasks', {})
+    monkeypatch.setattr(EcsStateStore, '_task_stopped_seen_at', {})
+    monkeypatch.setattr(EcsStateStore, '_instances', {})
+    monkeypatch.setattr(EcsStateStore, '_instance_versions', {})
+    return table
+
+
+def upsert(event):
+    lambda_function.upsert_state_record(lambda_function.build_state_record(event))
+
+
+def test_recorded_events_build_compact_records():
+    task = lambda_function.build_state_record(recorded_event('task-state-change-stopped'))
+    assert task['resource_id'] == TASK_ID
+    assert task['resource_type'] == 'TASK'
+    assert task['cluster_name'] == CLUSTER
+    assert task['container_instance_id'] == INSTANCE_ID
+    assert (task['last_status'], task['stop_code'], task['event_version']) == ('STOPPED', 'EssentialContainerExited', 5)
+    assert task['exit_codes'] == {'TrainingContainer': 1}
+    assert 'expires_at' in task
+
+    instance = lambda_function.build_state_record(recorded_event('container-instance-state-change-active'))
+    assert instance['resource_id'] == INSTANCE_ID
+    assert instance['resource_type'] == 'CONTAINER_INSTANCE'
+    assert (instance['status'], instance['agent_connected'], instance['node_name']) == ('ACTIVE', True, 'A800-10-204-9-8')
+    assert (instance['registered_gpu'], instance['remaining_gpu'], instance['event_version']) == (8, 8, 42)
+    assert 'expires_at' not in instance
+
+
+def test_running_task_has_no_expiry_and_other_events_are_skipped():
+    assert 'expires_at' not in lambda_function.build_state_record(task_event(3, 'RUNNING'))
+    event = recorded_event('task-state-change-stopped')
+    event['detail-type'] = 'ECS Deployment State Change'
+    assert lambda_function.build_state_record(event) is None
+
+
+def test_older_event_delivered_late_is_dropped(table):
+    upsert(task_event(5, 'STOPPED'))
+    upsert(task_event(3, 'RUNNING'))
+    upsert(instance_event(42, 8))
+    upsert(instance_event(41, 2))
+
+    assert table.items[TASK_ID]['last_status'] == 'STOPPED'
+    assert table.items[INSTANCE_ID]['remaining_gpu'] == 8
+    ## every invocation takes a seq, written or not
+    assert table.items[lambda_function.STATE_SEQUENCE_KEY]['seq'] == 4
+    assert (table.items[TASK_ID]['seq'], table.items[INSTANCE_ID]['seq']) == (1, 3)
+
+
+def test_sync_reads_changes_after_the_seq_cursor(table):
+    upsert(task_event(3, 'RUNNING'))
+    upsert(instance_event(41, 0))
+    assert [record['resource_id'] for record in EcsStateStore.sync()] == [TASK_ID, INSTANCE_ID]
+    assert EcsStateStore.get_last_seq() == 2
+    instances, cursor = EcsStateStore.get_instance_changes(0)
+    assert [record['remaining_gpu'] for record in instances] == [0]
+
+    ## a re-read of records already applied changes nothing
+    assert EcsStateStore.sync() == []
+    assert EcsStateStore.get_instance_changes(cursor) == ([], cursor)
+
+    upsert(task_event(5, 'STOPPED'))
+    upsert(instance_event(42, 8))
+    changes = EcsStateStore.sync()
+    assert [(record['resource_id'], record['event_version']) for record in changes] == [(TASK_ID, 5), (INSTANCE_ID, 42)]
+    assert EcsStateStore.get_task_state(TASK_ID)['last_status'] == 'STOPPED'
+    instances, _ = EcsStateStore.get_instance_changes(cursor)
+    assert [record['remaining_gpu'] for record in instances] == [8]
+
+
+def test_record_landing_below_the_cursor_is_picked_up(table):
+    ## the task invocation takes seq 1 but writes after the instance invocation wrote seq 2
+    table.held = []
+    upsert(task_event(5, 'STOPPED'))
+    late_put = table.held.pop()
+    table.held = None
+    upsert(instance_event(42, 8))
+
+    assert [record['resource_id'] for record in EcsStateStore.sync()] == [INSTANCE_ID]
+    assert EcsStateStore.get_last_seq() == 2
+
+    table.held = [late_put]
+    table.release()
+    assert [record['resource_id'] for record in EcsStateStore.sync()] == [TASK_ID]
+    assert EcsStateStore.get_task_state(TASK_ID)['seq'] == 1
+
+
+def test_sync_never_rolls_a_resource_back(table):
+    upsert(instance_event(42, 8))
+    EcsStateStore.sync()
+    ## an older version with a higher seq, as when the table was rewritten by hand
+    table.items[INSTANCE_ID] = dict(table.items[INSTANCE_ID], event_version=40, remaining_gpu=0, seq=Decimal(7))
+
+    assert EcsStateStore.sync() == []
+    assert EcsStateStore.get_instance_state(INSTANCE_ID)['remaining_gpu'] == 8
+    assert EcsStateStore.get_last_seq() == 7
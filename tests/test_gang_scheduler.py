@@ -0,0 +1,106 @@
+import pytest
+
+import job_queue
+import warm_pool
+from job_queue import GangScheduler, JobQueue
+
+
+class FakeNodeManager:
+    """The slice of NodeManager the scheduler uses, over a fixed set of free nodes."""
+
+    def __init__(self, num_nodes, free_nodes):
+        self.node_names = [f"node{i:02d}" for i in range(num_nodes)]
+        self.free = set(self.node_names[:free_nodes])
+
+    def refresh_all_node_status(self):
+        pass
+
+    def get_spare_node_names(self):
+        return sorted(self.free)
+
+    def assign_node_names(self, num_nodes, job_id=''):
+        node_names = sorted(self.free)[:num_nodes]
+        self.free.difference_update(node_names)
+        return node_names
+
+    def get_container_inst_id(self, node_name):
+        return f"inst-{node_name}"
+
+    def invalidate_inventory(self):
+        pass
+
+    def release_node_names(self, node_names):
+        pass
+
+
+@pytest.fixture
+def cluster(monkeypatch):
+    """16 node cluster with 4 free nodes, an in-memory queue and no warm pool."""
+    node_manager = FakeNodeManager(16, 4)
+    monkeypatch.setattr(job_queue, 'NodeManager', lambda: node_manager)
+    monkeypatch.setattr(job_queue, 'JOB_QUEUE_TABLE', '')
+    monkeypatch.setattr(job_queue, 'JOB_QUEUE_MAX_SKIPS', 3)
+    monkeypatch.setattr(warm_pool, 'WARM_POOL_ENABLED', False)
+    monkeypatch.setattr(JobQueue, '_jobs', {})
+    monkeypatch.setattr(GangScheduler, '_wakeup', type(GangScheduler._wakeup)())
+
+    launches = []
+    monkeypatch.setattr(GangScheduler, '_launch_fn',
+                        staticmethod(lambda job, node_names, inst_ids: launches.append((job.queue_id, node_names))))
+    node_manager.launches = launches
+    return node_manager
+
+
+def enqueue(*sizes):
+    ## ids sort in submission order, as enqueued_at may repeat within a microsecond
+    return [JobQueue.enqueue(f"job-{i}", num_nodes, {'num_nodes': num_nodes}) for i, num_nodes in enumerate(sizes)]
+
+
+def test_jobs_that_fit_go_out_in_fifo_order(cluster):
+    enqueue(2, 1, 1)
+    assert GangScheduler.schedule_once() == ['job-0', 'job-1', 'job-2']
+    assert [node_names for _, node_names in cluster.launches] == [['node00', 'node01'], ['node02'], ['node03']]
+    assert JobQueue.get_queued() == []
+
+
+def test_smaller_jobs_are_backfilled_past_a_blocked_head(cluster):
+    head, *_ = enqueue(8, 2, 3, 2)
+    assert GangScheduler.schedule_once() == ['job-1', 'job-3']
+    assert head.skip_count == 2
+    assert [job.queue_id for job in JobQueue.get_queued()] == ['job-0', 'job-2']
+
+
+def test_head_skipped_too_often_holds_the_nodes(cluster):
+    head, *_ = enqueue(8, 1, 1)
+    head.skip_count = job_queue.JOB_QUEUE_MAX_SKIPS
+    assert GangScheduler.schedule_once() == []
+    assert cluster.launches == []
+
+    ## the held nodes accumulate until the head fits
+    cluster.free.update(cluster.node_names[4:8])
+    assert GangScheduler.schedule_once() == ['job-0']
+    assert head.queue_status == 'DISPATCHED'
+
+
+def test_head_reaches_the_skip_limit_within_one_pass(cluster):
+    head, *_ = enqueue(8, 1, 1, 1, 1)
+    head.skip_count = job_queue.JOB_QUEUE_MAX_SKIPS - 1
+    assert GangScheduler.schedule_once() == ['job-1']
+    assert head.skip_count == job_queue.JOB_QUEUE_MAX_SKIPS
+
+
+def test_failed_launch_marks_the_job_failed(cluster, monkeypatch):
+    def launch(job, node_names, inst_ids):
+        raise RuntimeError('register failed')
+
+    monkeypatch.setattr(GangScheduler, '_launch_fn', staticmethod(launch))
+    job, = enqueue(2)
+    assert GangScheduler.schedule_once() == []
+    assert (job.queue_status, job.reason) == ('FAILED', 'register failed')
+    assert JobQueue.get_queued() == []
+
+
+def test_submit_rejects_jobs_larger_than_the_cluster(cluster):
+    with pytest.raises(ValueError):
+        GangScheduler.submit('too-big', 17, {})
+    assert GangScheduler.submit('fits-later', 16, {}) == 1
@@ -0,0 +1,87 @@
+import pytest
+
+from health_log import parse_health_log
+
+## lines exactly as PortalScripts/healthCheckMain.sh and healthCheckWorker.sh echo them,
+## with some of the command output printed around them
+PREAMBLE = [
+    'sshd is already running',
+    '-rw-r--r-- 1 root root 64 Feb 22 12:05 /healthcheck/my_hosts',
+]
+FSX_OK = ['AWS Fsx connection health']
+FSX_FAIL = ['ls: cannot access \'/healthcheck/my_hosts\': No such file or directory', 'fail on AWS Fsx connection']
+TCP_OK = ['Connection to baidu.com 443 port [tcp/https] open', 'health:tcp ping check on public internet.']
+## the tcp failure branch prints the ping failure line too, before it exits
+TCP_FAIL = ['fail on tcp ping check on public internet.', 'fail on ping check on public internet.']
+PING_OK = ['64 bytes from 110.242.68.66: icmp_seq=1 ttl=49 time=27.1 ms', 'health:ping check on public internet.']
+PING_FAIL = ['fail on ping check on public internet.']
+DCGM_HEALTH_OK = ['| Overall Health            | Healthy                                      |', 'dcgmi health success']
+DCGM_HEALTH_FAIL_FIRST = ['fail on dcgm health check', 'the parameter is None', 'GPU failure on first time']
+DCGM_HEALTH_FAIL_SECOND = ['fail on dcgm health check', 'the parameter is 1', 'GPU failure on continuously second time']
+DCGM_DIAG_OK = ['dcgmi diag health']
+DCGM_DIAG_FAIL_FIRST = ['|  GPU Memory              | Fail - All                                |',
+                        'fail on dcgm diag check', 'GPU failure on first time']
+DCGM_DIAG_FAIL_SECOND = ['|  GPU Memory              | Fail - All                                |',
+                         'fail on dcgm diag check', 'GPU failure on second time']
+NCCL_OK = ['#  Avg bus bandwidth    : 182.413', 'NCCL health']
+NCCL_FAIL = ['primary job  terminated normally, but 1 process returned', 'fail on multiple host NCCL check']
+MAIN_DONE = ['The heath check has been finished in the master node.']
+WORKER_DONE = ["Waiting for the 'finish' file to be created...", 'The health check has been finised in the slave nodes.']
+
+ALL_PASS = {'fsx': 'PASS', 'tcp': 'PASS', 'ping': 'PASS', 'dcgm': 'PASS', 'nccl': 'PASS'}
+
+
+def log(*steps):
+    return '\n'.join(PREAMBLE + [line for step in steps for line in step])
+
+
+def test_all_checks_pass_on_main():
+    results = parse_health_log(log(FSX_OK, TCP_OK, PING_OK, DCGM_HEALTH_OK, DCGM_DIAG_OK, NCCL_OK, MAIN_DONE),
+                               is_main=True)
+    assert results == ALL_PASS
+
+
+def test_workers_do_not_run_nccl():
+    results = parse_health_log(log(FSX_OK, TCP_OK, PING_OK, DCGM_HEALTH_OK, DCGM_DIAG_OK, WORKER_DONE),
+                               is_main=False)
+    assert results == dict(ALL_PASS, nccl='NOT_RUN')
+
+
+@pytest.mark.parametrize('is_main', [True, False])
+@pytest.mark.parametrize('steps, failed', [
+    ((FSX_FAIL,), 'fsx'),
+    ((FSX_OK, TCP_FAIL), 'tcp'),
+    ((FSX_OK, TCP_OK, PING_FAIL), 'ping'),
+    ((FSX_OK, TCP_OK, PING_OK, DCGM_HEALTH_FAIL_FIRST), 'dcgm'),
+    ((FSX_OK, TCP_OK, PING_OK, DCGM_HEALTH_FAIL_SECOND), 'dcgm'),
+], ids=['fsx', 'tcp', 'ping', 'dcgm-health-first', 'dcgm-health-second'])
+def test_failed_check_ends_the_script(steps, failed, is_main):
+    results = parse_health_log(log(*steps), is_main=is_main)
+    checks = list(ALL_PASS)
+    expected = {check: 'PASS' for check in checks[:checks.index(failed)]}
+    expected[failed] = 'FAIL'
+    expected.update({check: 'NOT_RUN' for check in checks[checks.index(failed) + 1:]})
+    assert results == expected
+
+
+@pytest.mark.parametrize('diag_fail', [DCGM_DIAG_FAIL_FIRST, DCGM_DIAG_FAIL_SECOND], ids=['first', 'second'])
+@pytest.mark.parametrize('nccl, nccl_result', [(NCCL_OK, 'PASS'), (NCCL_FAIL, 'FAIL')], ids=['nccl-ok', 'nccl-fail'])
+def test_failed_dcgm_diag_goes_on_to_nccl(diag_fail, nccl, nccl_result):
+    results = parse_health_log(log(FSX_OK, TCP_OK, PING_OK, DCGM_HEALTH_OK, diag_fail, nccl), is_main=True)
+    assert results == dict(ALL_PASS, dcgm='FAIL', nccl=nccl_result)
+
+
+def test_failed_dcgm_diag_on_worker():
+    results = parse_health_log(log(FSX_OK, TCP_OK, PING_OK, DCGM_HEALTH_OK, DCGM_DIAG_FAIL_FIRST, WORKER_DONE),
+                               is_main=False)
+    assert results == dict(ALL_PASS, dcgm='FAIL', nccl='NOT_RUN')
+
+
+def test_failed_nccl_on_main():
+    results = parse_health_log(log(FSX_OK, TCP_OK, PING_OK, DCGM_HEALTH_OK, DCGM_DIAG_OK, NCCL_FAIL), is_main=True)
+    assert results == dict(ALL_PASS, nccl='FAIL')
+
+
+def test_truncated_log_leaves_missing_checks_not_run():
+    results = parse_health_log(log(FSX_OK, TCP_OK, PING_OK, DCGM_HEALTH_OK), is_main=True)
+    assert results == {'fsx': 'PASS', 'tcp': 'PASS', 'ping': 'PASS', 'dcgm': 'NOT_RUN', 'nccl': 'NOT_RUN'}
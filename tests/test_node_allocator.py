@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+import node_allocator
+from node_allocator import NodeTopology, OrderedAllocator, TopologyAllocator, build_allocator, load_topology
+
+
+def topology_of(**group_sizes):
+    """Groups named by keyword, with nodes `<group>-00`, `<group>-01`, ..."""
+    return NodeTopology(groups={
+        f"{group}-{i:02d}": group for group, size in group_sizes.items() for i in range(size)
+    })
+
+
+def groups_spanned(nodes, topology):
+    return len({topology.group_of(node_name) for node_name in nodes})
+
+
+def test_job_that_fits_takes_the_smallest_fitting_group():
+    topology = topology_of(big=8, small=4)
+    chosen = TopologyAllocator().allocate(list(topology.groups), 3, topology)
+    assert chosen == ['small-00', 'small-01', 'small-02']
+
+
+def test_job_larger_than_any_group_fills_the_largest_groups_first():
+    topology = topology_of(a=3, b=8, c=5)
+    chosen = TopologyAllocator().allocate(list(topology.groups), 12, topology)
+    assert len(chosen) == 12 and len(set(chosen)) == 12
+    assert groups_spanned(chosen, topology) == 2
+    assert sum(topology.group_of(node_name) == 'b' for node_name in chosen) == 8
+
+
+def test_placement_does_not_depend_on_free_list_order():
+    topology = topology_of(a=6, b=6, c=6)
+    free_nodes = list(topology.groups)
+    expected = TopologyAllocator().allocate(free_nodes, 9, topology)
+    for seed in range(5):
+        random.Random(seed).shuffle(free_nodes)
+        assert TopologyAllocator().allocate(free_nodes, 9, topology) == expected
+
+
+def test_ranks_follow_rank0_group_first():
+    topology = topology_of(a=2, b=4)
+    chosen = TopologyAllocator().allocate(list(topology.groups), 5, topology)
+    assert chosen == ['b-00', 'b-01', 'b-02', 'b-03', 'a-00']
+
+
+def test_measured_bandwidth_picks_the_best_connected_nodes():
+    topology = topology_of(a=4)
+    topology.bandwidth = {
+        'a-00': {'a-01': 10.0, 'a-02': 10.0, 'a-03': 10.0},
+        'a-01': {'a-02': 100.0, 'a-03': 90.0},
+        'a-02': {'a-03': 90.0},
+    }
+    chosen = TopologyAllocator().allocate(list(topology.groups), 3, topology)
+    assert chosen[0] == 'a-01' and sorted(chosen) == ['a-01', 'a-02', 'a-03']
+
+
+@pytest.mark.parametrize('allocator', [OrderedAllocator(), TopologyAllocator()])
+def test_more_nodes_than_free_raises(allocator):
+    topology = topology_of(a=2)
+    with pytest.raises(ValueError):
+        allocator.allocate(list(topology.groups), 3, topology)
+
+
+def test_ordered_allocator_takes_names_in_order():
+    topology = topology_of(b=2, a=2)
+    assert OrderedAllocator().allocate(['b-01', 'a-01', 'b-00'], 2, topology) == ['a-01', 'b-00']
+
+
+def test_build_allocator_follows_setting(monkeypatch):
+    monkeypatch.setattr(node_allocator, 'NODE_ALLOCATOR', 'ordered')
+    assert isinstance(build_allocator(), OrderedAllocator)
+    monkeypatch.setattr(node_allocator, 'NODE_ALLOCATOR', 'topology')
+    assert isinstance(build_allocator(), TopologyAllocator)
+
+
+def test_topology_sources_in_precedence_order(tmp_path, monkeypatch):
+    mapping = tmp_path / 'node_mapping_info.yaml'
+    mapping.write_text(
+        "node-switch:\n  switch: leaf-1\n  ip: 10.0.9.1\n"
+        "node-yaml-ip:\n  ip: 10.0.7.5\n"
+    )
+    monkeypatch.setattr(node_allocator, 'NODE_MAPPING_PATH', str(mapping))
+
+    topology = load_topology(
+        node_addresses={
+            'node-switch': '10.0.1.1', 'node-attr': '10.0.1.2', 'node-yaml-ip': '10.0.1.3', 'node-name': '10.0.2.4',
+        },
+        node_attribute_groups={'node-switch': 'pg-a', 'node-attr': 'pg-b', 'node-yaml-ip': ''},
+    )
+    assert topology.groups == {
+        'node-switch': 'leaf-1',
+        'node-attr': 'pg-b',
+        'node-yaml-ip': '10.0.7.0/24',
+        'node-name': '10.0.2.0/24',
+    }
@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+import precheck_watcher
+from precheck_watcher import PrecheckWatch, PrecheckWatcher
+
+
+def status(stop_status, exit_code=None, reason=''):
+    return {'stop_status': stop_status, 'exit_codes': {'c': exit_code}, 'stopped_reason': reason}
+
+
+@pytest.fixture
+def outcomes(monkeypatch):
+    monkeypatch.setattr(PrecheckWatcher, '_watches', {})
+    done = threading.Event()
+    results = []
+
+    def record(outcome):
+        results.append(outcome)
+        done.set()
+
+    def watch(task_statuses, deadline=float('inf')):
+        monkeypatch.setattr(precheck_watcher.TaskManager, 'get_tasks_status',
+                            staticmethod(lambda task_ids: {task_id: task_statuses[task_id] for task_id in task_ids}))
+        precheck_watch = PrecheckWatch('job-precheck', list(task_statuses), lambda: record('success'),
+                                       lambda reason: record(reason), deadline)
+        PrecheckWatcher._watches[precheck_watch.precheck_job_id] = precheck_watch
+        changed = PrecheckWatcher._poll_once([precheck_watch])
+        if precheck_watch.precheck_job_id not in PrecheckWatcher._watches:
+            assert done.wait(5)
+        return changed
+
+    watch.results = results
+    return watch
+
+
+def test_all_tasks_succeeded(outcomes):
+    assert outcomes({'t1': status('SUCCESS', 0), 't2': status('SUCCESS', 0)})
+    assert outcomes.results == ['success']
+    assert PrecheckWatcher._watches == {}
+
+
+def test_failed_task_fails_the_precheck(outcomes):
+    assert outcomes({'t1': status('SUCCESS', 0), 't2': status('FAIL', 1, 'Essential container exited')})
+    assert len(outcomes.results) == 1 and 'task t2 failed' in outcomes.results[0]
+
+
+def test_task_unknown_to_ecs_fails_the_precheck(outcomes):
+    assert outcomes({'t1': status('RUNNING'), 't2': status('NO_TASK', reason='MISSING')})
+    assert outcomes.results == ['task t2 is no longer known to ECS (MISSING)']
+
+
+def test_running_tasks_keep_being_watched(outcomes):
+    ## t2 finishing counts as progress, so the next poll comes sooner
+    assert outcomes({'t1': status('RUNNING'), 't2': status('SUCCESS', 0)})
+    assert outcomes.results == [] and 'job-precheck' in PrecheckWatcher._watches
@@ -0,0 +1,177 @@
+import json
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+
+import task_def_cache
+from task_def_cache import TaskDefCache, canonical_task_def_hash
+from task_manager import _is_stale_task_def_error
+
+
+TASK_DEF = {
+    'family': 'TrainingTask',
+    'containerDefinitions': [{'name': 'trainer', 'image': 'trainer:1', 'command': ['python', 'train.py']}],
+}
+
+
+@pytest.fixture(autouse=True)
+def cache_file(tmp_path, monkeypatch):
+    path = tmp_path / 'task_def_cache.json'
+    monkeypatch.setattr(task_def_cache, 'TASK_DEF_CACHE_PATH', str(path))
+    monkeypatch.setattr(TaskDefCache, '_entries', None)
+    return path
+
+
+class Registrar:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, task_def):
+        self.calls += 1
+        return f"arn:aws:ecs:us-east-1:000000000000:task-definition/{task_def['family']}:{self.calls}"
+
+
+def test_hash_ignores_key_order():
+    reordered = {'containerDefinitions': TASK_DEF['containerDefinitions'], 'family': TASK_DEF['family']}
+    assert canonical_task_def_hash(reordered) == canonical_task_def_hash(TASK_DEF)
+    assert canonical_task_def_hash(dict(TASK_DEF, cpu='1024')) != canonical_task_def_hash(TASK_DEF)
+
+
+def test_same_content_reuses_the_registered_arn():
+    register = Registrar()
+    arn, reused = TaskDefCache.register(TASK_DEF, register)
+    assert arn.endswith('TrainingTask:1') and not reused
+
+    assert TaskDefCache.register(dict(TASK_DEF), register) == (arn, True)
+    assert register.calls == 1
+
+
+def test_cache_survives_a_restart(cache_file):
+    arn, _ = TaskDefCache.register(TASK_DEF, Registrar())
+    assert cache_file.exists()
+
+    TaskDefCache._entries = None
+    register = Registrar()
+    assert TaskDefCache.register(TASK_DEF, register) == (arn, True)
+    assert register.calls == 0
+
+
+def test_invalidate_registers_a_new_revision():
+    register = Registrar()
+    first_arn, _ = TaskDefCache.register(TASK_DEF, register)
+
+    TaskDefCache.invalidate(TASK_DEF)
+    second_arn, reused = TaskDefCache.register(TASK_DEF, register)
+    assert not reused and second_arn != first_arn
+    assert register.calls == 2
+
+
+def test_expired_entry_is_verified_and_dropped_when_inactive(monkeypatch):
+    register = Registrar()
+    arn, _ = TaskDefCache.register(TASK_DEF, register)
+    monkeypatch.setattr(time, 'time', lambda: TaskDefCache._entries[canonical_task_def_hash(TASK_DEF)]['verified_at']
+                        + task_def_cache.TASK_DEF_CACHE_VERIFY_TTL + 1)
+
+    checked = []
+    monkeypatch.setattr(TaskDefCache, '_is_active', staticmethod(lambda task_def_arn: checked.append(task_def_arn)))
+    assert TaskDefCache.lookup(canonical_task_def_hash(TASK_DEF)) is None
+    assert checked == [arn]
+    assert canonical_task_def_hash(TASK_DEF) not in TaskDefCache._entries
+
+
+def _client_error(code, message):
+    return ClientError({'Error': {'Code': code, 'Message': message}}, 'RunTask')
+
+
+@pytest.mark.parametrize('error, stale', [
+    (_client_error('ClientException', 'TaskDefinition is inactive'), True),
+    (_client_error('ClientException', 'Unable to describe task definition.'), True),
+    (_client_error('ClientException', 'No Container Instances were found in your cluster.'), False),
+    (_client_error('ThrottlingException', 'Rate exceeded for task definition'), False),
+    (RuntimeError('TaskDefinition is inactive'), False),
+])
+def test_stale_task_def_error(error, stale):
+    assert _is_stale_task_def_error(error) is stale
+
+
+class FakeNode:
+    def __init__(self, container_inst_id):
+        self.container_inst_id = container_inst_id
+
+
+class FakeNodeManager:
+    node_names = ['node00', 'node01']
+    nodes = {name: FakeNode(f"inst-{name}") for name in node_names}
+
+    def get_physical_available_node_names(self):
+        return list(self.node_names)
+
+    def fetch_node_name(self, container_inst_id):
+        return container_inst_id[len('inst-'):]
+
+    def invalidate_inventory(self):
+        pass
+
+
+class FakeEcs:
+    """ECS of the launch path: revisions registered here are ACTIVE, any other ARN is deregistered."""
+    ARN = 'arn:aws:ecs:us-east-1:000000000000:task-definition/TrainingTask:{}'
+
+    def __init__(self):
+        self.active = set()
+        self.calls = []
+        self.placed = 0
+
+    def __call__(self, cmd, operation, **kwargs):
+        self.calls.append(operation)
+        if operation == 'register_task_definition':
+            task_def_arn = self.ARN.format(len(self.active) + 2)
+            self.active.add(task_def_arn)
+            return {'taskDefinition': {'taskDefinitionArn': task_def_arn}}
+        if operation == 'stop_task':
+            return {}
+        if kwargs['taskDefinition'] not in self.active:
+            raise _client_error('ClientException', 'TaskDefinition is inactive')
+        inst_ids = kwargs.get('containerInstances') or \
+            [f"inst-node{self.placed + i:02d}" for i in range(kwargs['count'])]
+        self.placed += len(inst_ids)
+        return {'tasks': [{
+            'taskArn': f"arn:aws:ecs:us-east-1:000000000000:task/test-cluster/task-{inst_id}",
+            'clusterArn': 'arn:aws:ecs:us-east-1:000000000000:cluster/test-cluster',
+            'containerInstanceArn': f"arn:aws:ecs:us-east-1:000000000000:container-instance/test-cluster/{inst_id}",
+        } for inst_id in inst_ids], 'failures': []}
+
+
+@pytest.mark.parametrize('launch_mode', ['batched', 'fanout'])
+def test_launch_with_deregistered_cached_revision_registers_a_new_one(tmp_path, monkeypatch, launch_mode):
+    import task_manager
+    from task_manager import TaskManager
+
+    ecs = FakeEcs()
+    monkeypatch.setattr(task_manager, '_run_ecs_api', ecs)
+    monkeypatch.setattr(task_manager, 'NodeManager', FakeNodeManager)
+    monkeypatch.setattr(task_manager, 'TASK_LAUNCH_MODE', launch_mode)
+    monkeypatch.setattr(task_manager, '_launch_type', 'EC2')
+
+    task_def_path = tmp_path / 'task_def.json'
+    task_def_path.write_text(json.dumps(
+        {'family': 'TrainingTask', 'containerDefinitions': [{'name': 'TrainingContainer', 'image': 'trainer:1'}]}
+    ))
+    deregistered_arn = FakeEcs.ARN.format(1)
+    TaskDefCache.store(canonical_task_def_hash(json.loads(task_def_path.read_text())), deregistered_arn, 'TrainingTask')
+
+    invalidated = []
+    invalidate = TaskDefCache.invalidate
+    monkeypatch.setattr(TaskDefCache, 'invalidate',
+                        staticmethod(lambda task_def: (invalidated.append(task_def['family']), invalidate(task_def))))
+
+    ecs_task_ids, node_names, _, _, launch_report = TaskManager.register_task_and_run_all(
+        'job-1', '20260101-000000', 2, str(task_def_path), str(tmp_path / 'history')
+    )
+
+    assert invalidated == ['TrainingTask']
+    assert ecs.calls.count('register_task_definition') == 1
+    assert node_names == ['node00', 'node01'] and len(ecs_task_ids) == 2
+    assert {record['task_def_arn'] for record in launch_report.task_records} == {FakeEcs.ARN.format(2)}
+    assert TaskDefCache.lookup(canonical_task_def_hash(json.loads(task_def_path.read_text()))) == FakeEcs.ARN.format(2)